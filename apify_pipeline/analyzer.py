@@ -1,41 +1,18 @@
 import importlib.util
+import io
 import os
-import re
+import shutil
+import tempfile
+import time
 from collections import Counter, defaultdict
 from datetime import datetime, timezone
-from typing import Dict, Iterable, List, Optional, Sequence, Union
-
-STOPWORDS = {
-    "the",
-    "and",
-    "of",
-    "a",
-    "to",
-    "in",
-    "for",
-    "on",
-    "is",
-    "are",
-    "it",
-    "this",
-    "that",
-    "with",
-    "at",
-    "we",
-    "you",
-    "i",
-    "our",
-    "by",
-    "from",
-    "as",
-    "be",
-    "an",
-    "or",
-    "was",
-    "were",
-    "has",
-    "have",
-}
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional, Sequence, TextIO, Tuple, Union
+
+from apify_pipeline.keywords import KeywordEngine, default_engine
+from apify_pipeline.llm_cache import LLMCache
+from apify_pipeline.models import Post, PostLike, as_post
+from apify_pipeline.prompt_packer import PackedPrompt, estimate_tokens, fit_texts, pack_posts
 
 
 def parse_timestamp(value: str) -> datetime:
@@ -43,27 +20,30 @@ def parse_timestamp(value: str) -> datetime:
 
 
 def normalize_text(text: str) -> List[str]:
-    tokens = re.findall(r"[A-Za-z\d_]+", text.lower())
-    return [t for t in tokens if t not in STOPWORDS and len(t) > 2]
+    """Single-term tokens (words, $cashtags, #hashtags, CJK bigrams) without stopwords."""
+    return default_engine().tokenize(text, ngrams=False)
 
 
-def extract_keywords(posts: Iterable[Dict], top_n: int = 10) -> List[str]:
-    counter: Counter = Counter()
-    for post in posts:
-        for token in normalize_text(post.get("text", "")):
-            counter[token] += 1
-    return [word for word, _ in counter.most_common(top_n)]
+def extract_keywords(
+    posts: Iterable[PostLike],
+    top_n: int = 10,
+    background: Sequence[str] = (),
+    engine: Optional[KeywordEngine] = None,
+) -> List[str]:
+    """Most distinctive terms and phrases of `posts` by TF-IDF against `background` texts."""
+    texts = [post.get("text") or "" for post in posts]
+    return [term for term, _ in (engine or default_engine()).distinctive_terms(texts, background, top_n)]
 
 
-def split_by_author(posts: Iterable[Dict]) -> Dict[str, List[Dict]]:
-    buckets: Dict[str, List[Dict]] = defaultdict(list)
+def split_by_author(posts: Iterable[PostLike]) -> Dict[str, List[PostLike]]:
+    buckets: Dict[str, List[PostLike]] = defaultdict(list)
     for post in posts:
         buckets[post.get("author", "").lower()].append(post)
     return buckets
 
 
-def split_by_category(posts: Iterable[Dict], category_map: Dict[str, str]) -> Dict[str, List[Dict]]:
-    buckets: Dict[str, List[Dict]] = defaultdict(list)
+def split_by_category(posts: Iterable[PostLike], category_map: Dict[str, str]) -> Dict[str, List[PostLike]]:
+    buckets: Dict[str, List[PostLike]] = defaultdict(list)
     for post in posts:
         author = post.get("author", "").lower()
         category = category_map.get(author, "Uncategorized")
@@ -71,129 +51,227 @@ def split_by_category(posts: Iterable[Dict], category_map: Dict[str, str]) -> Di
     return buckets
 
 
-def format_post(post: Dict) -> str:
-    created_at = parse_timestamp(post["created_at"]).strftime("%Y-%m-%d %H:%M UTC")
-    text = post.get("text", "").strip().replace("\n", " ")
-    return f"- {created_at} — {text} ({post.get('url', '')})"
+def format_post(post: PostLike) -> str:
+    post = as_post(post)
+    if post.created_ts is not None:
+        created_at = time.strftime("%Y-%m-%d %H:%M UTC", time.gmtime(post.created_ts))
+    else:
+        created_at = post.created_at or "unknown time"
+    text = (post.text or "").strip().replace("\n", " ")
+    if len(post.thread_ids) > 1:
+        text = f"[thread, {len(post.thread_ids)} posts] {text}"
+    if post.duplicate_ids:
+        text = f"{text} (+{post.duplicate_count} near-duplicates)"
+    return f"- {created_at} — {text} ({post.url or ''})"
+
+
+def summary_section(category: str, text: str) -> str:
+    """One category's block under "Sector Summaries", exactly as the report writes it."""
+    return f"### {category}\n\n{text.strip()}\n"
 
 
 def build_report(
-    posts: List[Dict],
+    posts: List[PostLike],
     window_label: str,
     summary: Optional[Union[str, Dict[str, str]]] = None,
     category_map: Optional[Dict[str, str]] = None,
     report_type: str = "daily",
 ) -> str:
-    report_title = "Daily digest" if report_type == "daily" else "Weekly digest"
-    if not posts:
-        return f"## {report_title} ({window_label})\n\nNo new posts found in this window."
+    def category_of(post: Post) -> str:
+        if not category_map:
+            return "All"
+        return category_map.get(post.author, "Uncategorized")
+
+    # Order posts the way the streaming writer expects: category, author, created_at
+    ordered = sorted(
+        (post.replace(category=category_of(post)) for post in map(as_post, posts)),
+        key=lambda p: (p.category == "Uncategorized", p.category, p.author, p.sort_key),
+    )
+    buffer = io.StringIO()
+    write_report(buffer, ordered, window_label, summary=summary, report_type=report_type)
+    return buffer.getvalue()
 
-    keywords = extract_keywords(posts, top_n=12)
-    
-    # Organize posts
-    if category_map:
-        by_category = split_by_category(posts, category_map)
-    else:
-        by_category = {"All": posts}
-
-    lines = [f"## {report_title} ({window_label})\n"]
-    lines.append(f"Total new posts: **{len(posts)}**. Top keywords: {', '.join(keywords) if keywords else 'N/A'}.\n")
-
-    # Handle summaries (Global or Per-Category)
-    if summary:
-        if isinstance(summary, dict):
-            # Per-category summary
-            lines.append("## Sector Summaries\n")
-            for cat, text in summary.items():
-                lines.append(f"### {cat}\n")
-                lines.append(text.strip())
+
+def write_report(
+    out: TextIO,
+    posts: Iterable[Post],
+    window_label: str,
+    summary: Optional[Union[str, Dict[str, str]]] = None,
+    report_type: str = "daily",
+    keywords: Optional[Sequence[str]] = None,
+    highlights: Optional[Sequence[str]] = None,
+    themes: Optional[Sequence[str]] = None,
+) -> int:
+    """
+    Stream a Markdown report to `out` and return the number of posts written.
+
+    `posts` must already be ordered by category, author and created_at, and each
+    post must have its `category` set (as yielded by the SQL cursor loader). Only one
+    author's posts are held in memory at a time; the post sections are spooled to a
+    temporary file so the header (totals, keywords) can be written first.
+
+    `keywords` (e.g. from the rollup tables) replace counting terms over `posts`, and
+    `highlights` are extra header lines written after them. `themes` (distinctive terms
+    from `extract_keywords`) fill the closing "Quick themes" list, which otherwise
+    repeats the keywords.
+    """
+    report_title = "Daily digest" if report_type == "daily" else "Weekly digest"
+    counter: Counter = Counter()
+    total = 0
+
+    with tempfile.SpooledTemporaryFile(max_size=1 << 20, mode="w+", encoding="utf-8") as body:
+        for category, cat_posts in groupby(posts, key=lambda p: p.category):
+            body.write(f"### {category}\n\n")
+            for author, author_iter in groupby(cat_posts, key=lambda p: p.author):
+                author_posts = list(author_iter)
+                # Collapsed threads count every post they contain
+                post_count = sum(len(post.thread_ids) or 1 for post in author_posts)
+                total += post_count
+                body.write(f"**@{author}** — {post_count} posts\n")
+                for post in author_posts:
+                    if keywords is None:
+                        counter.update(normalize_text(post.text or ""))
+                    body.write(format_post(post) + "\n")
+                body.write("\n")
+
+        if not total:
+            out.write(f"## {report_title} ({window_label})\n\nNo new posts found in this window.")
+            return 0
+
+        if keywords is None:
+            keywords = [word for word, _ in counter.most_common(12)]
+        lines = [f"## {report_title} ({window_label})\n"]
+        lines.append(f"Total new posts: **{total}**. Top keywords: {', '.join(keywords) if keywords else 'N/A'}.\n")
+        for highlight in highlights or []:
+            lines.append(f"{highlight}\n")
+
+        # Handle summaries (Global or Per-Category)
+        if summary:
+            if isinstance(summary, dict):
+                # Per-category summary
+                lines.append("## Sector Summaries\n")
+                for cat, text in summary.items():
+                    lines.append(summary_section(cat, text))
+            else:
+                # Global summary
+                lines.append("### LLM summary\n")
+                lines.append(summary.strip())
                 lines.append("")
-        else:
-            # Global summary
-            lines.append("### LLM summary\n")
-            lines.append(summary.strip())
-            lines.append("")
 
-    lines.append("## Posts by Category\n")
-    
-    # Sort categories: specific ones first, "Uncategorized" last
-    sorted_cats = sorted(by_category.keys(), key=lambda x: (x == "Uncategorized", x))
-    
-    for category in sorted_cats:
-        cat_posts = by_category[category]
-        if not cat_posts:
-            continue
-            
-        lines.append(f"### {category}\n")
-        
-        by_author = split_by_author(cat_posts)
-        for author, author_posts in sorted(by_author.items()):
-            lines.append(f"**@{author}** — {len(author_posts)} posts")
-            for post in sorted(author_posts, key=lambda p: p.get("created_at", "")):
-                lines.append(format_post(post))
-            lines.append("")
-            
-    lines.append("### Quick themes (frequency only)\n")
-    for kw in keywords:
-        lines.append(f"- {kw}")
+        lines.append("## Posts by Category\n")
+        out.write("\n".join(lines) + "\n")
+
+        body.seek(0)
+        shutil.copyfileobj(body, out)
 
+    if themes:
+        lines = ["### Quick themes (distinctive terms)\n"]
+        lines.extend(f"- {theme}" for theme in themes)
+    else:
+        lines = ["### Quick themes (frequency only)\n"]
+        lines.extend(f"- {kw}" for kw in keywords)
     lines.append(
         "\n_This report was generated via an automated crawl + lightweight keyword stats. Consider layering an LLM for richer summaries when volume warrants it._"
     )
-    return "\n".join(lines)
+    out.write("\n".join(lines))
+    return total
 
 
 def summarize_posts(
-    posts: Sequence[Dict],
+    posts: Sequence[PostLike],
     model: str = "deepseek-reasoner",
     api_key: Optional[str] = None,
     base_url: Optional[str] = None,
     max_posts: int = 30,
     category: Optional[str] = None,
+    cache: Optional[LLMCache] = None,
+    cache_scope: Optional[str] = None,
+    token_budget: Optional[int] = None,
+    packed: Optional[PackedPrompt] = None,
 ) -> str:
     """
     Summarize a set of posts with an LLM.
 
     Args:
-        posts: Iterable of post dictionaries with at least author/text/url keys.
+        posts: Posts (or legacy post dicts) with at least author/text/url.
         model: OpenAI chat model to use.
         api_key: OpenAI API key. Falls back to OPENAI_API_KEY env var.
         max_posts: Maximum number of posts to include in the prompt.
         category: Optional category name to contextualize the summary.
+        cache: Optional LLM response cache; identical requests are answered from it.
+        cache_scope: Optional label (e.g. window + category) under which a completed
+            summary is reused on reruns even if the prompt changed slightly.
+        token_budget: Optional prompt size in estimated tokens. When set, posts are
+            packed by novelty into the budget instead of taking the newest `max_posts`
+            (which then only caps the count).
+        packed: Material already packed with `pack_daily_posts` (overrides the above).
     """
     material = list(posts)
     if not material:
         return "No posts available to summarize."
 
-    key = api_key or os.environ.get("OPENAI_API_KEY") or os.environ.get("DEEPSEEK_API_KEY")
-    if not key:
-        raise RuntimeError("Provide OPENAI_API_KEY or DEEPSEEK_API_KEY (or use --summary-api-key) to summarize posts")
+    if packed is None and token_budget:
+        packed = pack_daily_posts(material, token_budget, max_posts=max_posts, category=category)
+    prompt = build_daily_prompt(material, max_posts=max_posts, category=category, packed=packed)
+    return _chat_completion(
+        prompt,
+        model=model,
+        api_key=api_key,
+        base_url=base_url,
+        timeout=180,  # Explicit 3-minute timeout
+        label="summary",
+        cache=cache,
+        cache_scope=cache_scope,
+    )
 
-    if importlib.util.find_spec("openai") is None:
-        raise RuntimeError("Install the 'openai' package to enable LLM summarization")
 
-    base_url = base_url or os.environ.get("OPENAI_BASE_URL") or os.environ.get("DEEPSEEK_API_BASE")
+def select_prompt_posts(posts: Sequence[PostLike], max_posts: int) -> List[PostLike]:
+    """The posts a summary prompt includes: the newest `max_posts` (all when <= 0)."""
+    sorted_posts = sorted(posts, key=lambda p: p.get("created_at") or "", reverse=True)
+    return sorted_posts[: max_posts if max_posts and max_posts > 0 else len(sorted_posts)]
 
-    from openai import OpenAI
 
-    client = OpenAI(api_key=key, base_url=base_url)
+def pack_daily_posts(
+    posts: Sequence[PostLike], token_budget: int, max_posts: int = 0, category: Optional[str] = None
+) -> PackedPrompt:
+    """Pack daily prompt material into `token_budget` (instructions included)."""
+    reserved = estimate_tokens(SYSTEM_PROMPT + _daily_instructions(category) + DAILY_MATERIAL_HEADER)
+    return pack_posts(posts, token_budget, _daily_line, max_posts=max_posts, reserved=reserved)
+
+
+def build_daily_prompt(
+    posts: Sequence[PostLike],
+    max_posts: int = 30,
+    category: Optional[str] = None,
+    packed: Optional[PackedPrompt] = None,
+) -> str:
+    if packed is not None:
+        lines = packed.lines
+    else:
+        lines = []
+        for post in select_prompt_posts(posts, max_posts):
+            text = (post.get("text") or "").strip().replace("\n", " ")
+            if len(text) > 400:
+                text = text[:400] + "..."
+            lines.append(_daily_line(post, text))
+
+    return _daily_instructions(category) + DAILY_MATERIAL_HEADER + "\n".join(lines)
+
+
+DAILY_MATERIAL_HEADER = "下面是内容：\n"
+
 
-    sorted_posts = sorted(material, key=lambda p: p.get("created_at") or "", reverse=True)
-    trimmed_posts = sorted_posts[: max_posts if max_posts and max_posts > 0 else len(sorted_posts)]
+def _daily_line(post: PostLike, text: str) -> str:
+    created_at = post.get("created_at") or ""
+    author = post.get("author", "")
+    url = post.get("url") or ""
+    return f"- [{created_at}] @{author}: {text} (link: {url})"
 
-    lines = []
-    for post in trimmed_posts:
-        created_at = post.get("created_at") or ""
-        author = post.get("author", "")
-        text = (post.get("text") or "").strip().replace("\n", " ")
-        if len(text) > 400:
-            text = text[:400] + "..."
-        url = post.get("url") or ""
-        lines.append(f"- [{created_at}] @{author}: {text} (link: {url})")
 
+def _daily_instructions(category: Optional[str] = None) -> str:
     context_str = f"“{category} 领域的”" if category else ""
     
-    prompt = (
+    return (
         f"你是一名 buy-side 投研助理，任务是把{context_str}“过去48小时的X(KOL)内容”提炼成可交易、可验证、可跟踪的情报简报。不要复述流水账；要提纯信号、指出关键变量与下一步动作。输出用中文，结论优先，少形容词。\n\n"
         "【总原则（必须遵守）】\n"
         "1) Signal > Noise：默认把“情绪宣泄/社交互动/明显玩笑或讽刺/无信息量转发”归为噪音，除非它引发了市场交易或提供了可核验事实。\n"
@@ -222,93 +300,123 @@ def summarize_posts(
         "- 如果某账号发了大量串推（如核燃料链条），要总结成“结构框架+变量”，不要逐条复述。\n"
         "- 如果出现明显虚构/讽刺（如夸张政治军事剧情），必须在D部分点名为“非事实信号”。\n"
         "- 如果出现具体数字（如发行份额、lbs、折溢价、NAV等），优先纳入证据与变量。\n\n"
-        "下面是内容：\n"
-        + "\n".join(lines)
     )
 
-    import time
-    from openai import APIConnectionError, APITimeoutError, InternalServerError
-
-    max_retries = 3
-    base_delay = 5
-    
-    for attempt in range(max_retries):
-        try:
-            response = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": "You are a professional buy-side investment research assistant. Output in Chinese."},
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.2,
-                timeout=180,  # Explicit 3-minute timeout
-            )
-            return (response.choices[0].message.content or "").strip()
-        except (APIConnectionError, APITimeoutError, InternalServerError) as e:
-            if attempt == max_retries - 1:
-                print(f"Failed to generate summary after {max_retries} attempts: {e}")
-                raise e
-            
-            delay = base_delay * (2 ** attempt)
-            print(f"LLM request failed ({e}). Retrying in {delay}s...")
-            time.sleep(delay)
-            
-    return ""
-
 
 def summarize_posts_weekly(
-    posts: Sequence[Dict],
+    posts: Sequence[PostLike],
     model: str = "deepseek-reasoner",
     api_key: Optional[str] = None,
     base_url: Optional[str] = None,
     max_posts: int = 150,
     category: Optional[str] = None,
+    cache: Optional[LLMCache] = None,
+    cache_scope: Optional[str] = None,
+    token_budget: Optional[int] = None,
+    packed: Optional[PackedPrompt] = None,
 ) -> str:
     """
     Generate a weekly summary of posts with an LLM.
 
     Args:
-        posts: Iterable of post dictionaries with at least author/text/url keys.
+        posts: Posts (or legacy post dicts) with at least author/text/url.
         model: OpenAI chat model to use.
         api_key: OpenAI API key. Falls back to OPENAI_API_KEY env var.
         max_posts: Maximum number of posts to include in prompt (default 150 for weekly).
         category: Optional category name to contextualize summary.
+        cache: Optional LLM response cache; identical requests are answered from it.
+        cache_scope: Optional label (e.g. week + category) under which a completed
+            summary is reused on reruns even if the prompt changed slightly.
+        token_budget: Optional prompt size in estimated tokens (see `summarize_posts`).
+        packed: Material already packed with `pack_weekly_posts`.
     """
     material = list(posts)
     if not material:
         return "No posts available to summarize."
 
-    key = api_key or os.environ.get("OPENAI_API_KEY") or os.environ.get("DEEPSEEK_API_KEY")
-    if not key:
-        raise RuntimeError("Provide OPENAI_API_KEY or DEEPSEEK_API_KEY (or use --summary-api-key) to summarize posts")
+    if packed is None and token_budget:
+        packed = pack_weekly_posts(material, token_budget, max_posts=max_posts, category=category)
+    prompt = build_weekly_prompt(material, max_posts=max_posts, category=category, packed=packed)
+    return _chat_completion(
+        prompt,
+        model=model,
+        api_key=api_key,
+        base_url=base_url,
+        timeout=240,  # 4-minute timeout for reasoning models
+        label="weekly summary",
+        cache=cache,
+        cache_scope=cache_scope,
+    )
 
-    if importlib.util.find_spec("openai") is None:
-        raise RuntimeError("Install the 'openai' package to enable LLM summarization")
 
-    base_url = base_url or os.environ.get("OPENAI_BASE_URL") or os.environ.get("DEEPSEEK_API_BASE")
+def pack_weekly_posts(
+    posts: Sequence[PostLike], token_budget: int, max_posts: int = 0, category: Optional[str] = None
+) -> PackedPrompt:
+    """Pack weekly prompt material into `token_budget` (instructions included)."""
+    reserved = estimate_tokens(SYSTEM_PROMPT + _weekly_instructions(category) + WEEKLY_MATERIAL_HEADER)
+    return pack_posts(posts, token_budget, _weekly_line, max_posts=max_posts, reserved=reserved)
 
-    from openai import OpenAI
 
-    client = OpenAI(api_key=key, base_url=base_url)
+def build_weekly_prompt(
+    posts: Sequence[PostLike],
+    max_posts: int = 150,
+    category: Optional[str] = None,
+    packed: Optional[PackedPrompt] = None,
+) -> str:
+    if packed is not None:
+        lines = packed.lines
+    else:
+        lines = []
+        for post in select_prompt_posts(posts, max_posts):
+            text = (post.get("text") or "").strip().replace("\n", " ")
+            if len(text) > 400:
+                text = text[:400] + "..."
+            lines.append(_weekly_line(post, text))
 
-    sorted_posts = sorted(material, key=lambda p: p.get("created_at") or "", reverse=True)
-    trimmed_posts = sorted_posts[: max_posts if max_posts and max_posts > 0 else len(sorted_posts)]
+    return _weekly_instructions(category) + WEEKLY_MATERIAL_HEADER + "\n".join(lines)
 
-    lines = []
-    for post in trimmed_posts:
-        created_at = post.get("created_at") or ""
-        author = post.get("author", "")
-        text = (post.get("text") or "").strip().replace("\n", " ")
-        if len(text) > 400:
-            text = text[:400] + "..."
-        # OPTIMIZATION: Do not include URL in the prompt to save tokens
-        lines.append(f"- [{created_at}] @{author}: {text}")
 
+WEEKLY_MATERIAL_HEADER = "下面是内容: \n"
+
+WEEKLY_REDUCE_HEADER = (
+    "下面是本周按时间排列的分段摘要 (每段是一个时间窗内内容的摘要). "
+    "请在这些摘要的基础上做跨时间窗的综合与去重, 不要逐段复述; 证据与链接沿用摘要中给出的. \n\n"
+)
+
+
+def _weekly_line(post: PostLike, text: str) -> str:
+    created_at = post.get("created_at") or ""
+    author = post.get("author", "")
+    # OPTIMIZATION: Do not include URL in the prompt to save tokens
+    return f"- [{created_at}] @{author}: {text}"
+
+
+def build_weekly_reduce_prompt(
+    partials: Sequence[Tuple[str, str]],
+    category: Optional[str] = None,
+    token_budget: Optional[int] = None,
+) -> str:
+    """
+    Weekly prompt whose material is (window label, summary) pairs instead of raw posts.
+    With a `token_budget`, every summary is shortened by the same cap until the prompt fits.
+    """
+    labels = [f"### [{label}]\n" for label, _ in partials]
+    texts = [text.strip() for _, text in partials]
+    if token_budget:
+        reserved = estimate_tokens(
+            SYSTEM_PROMPT + _weekly_instructions(category) + WEEKLY_REDUCE_HEADER + "\n\n".join(labels)
+        )
+        texts, _ = fit_texts(texts, token_budget, reserved=reserved)
+    blocks = [label + text for label, text in zip(labels, texts)]
+    return _weekly_instructions(category) + WEEKLY_REDUCE_HEADER + "\n\n".join(blocks)
+
+
+def _weekly_instructions(category: Optional[str] = None) -> str:
     context_str = f"「{category} 领域的」" if category else ""
     
     time_scope = f"{context_str}过去一周(7天)的X(KOL)内容" if context_str else "过去一周(7天)的X(KOL)内容"
     
-    prompt = (
+    return (
         f"你是一名 buy-side 投研助理,任务是把\"{time_scope}\"综合成一份高质量的周度研究报告. "
         "报告需要包含: 关键事件回顾、投研信号提炼、长期趋势分析三个核心维度. 输出用中文,结论优先,数据支撑. \n\n"
         "【总原则(必须遵守)】\n"
@@ -349,12 +457,80 @@ def summarize_posts_weekly(
         "- 如果出现具体数字(如发行份额、lbs、折溢价、NAV等),优先纳入证据与变量. \n"
         "- 关注7天内持续出现、逐渐发酵的信号,而不只是单日热点. \n"
         "- 识别情绪变化(如: 周一乐观->周三谨慎->周五恐慌),并在趋势分析中体现. \n\n"
-        "下面是内容: \n"
-        + "\n".join(lines)
     )
 
-    import time
-    from openai import APIConnectionError, APITimeoutError, InternalServerError
+
+def summarize_summaries_weekly(
+    partials: Sequence[Tuple[str, str]],
+    model: str = "deepseek-reasoner",
+    api_key: Optional[str] = None,
+    base_url: Optional[str] = None,
+    category: Optional[str] = None,
+    cache: Optional[LLMCache] = None,
+    cache_scope: Optional[str] = None,
+    token_budget: Optional[int] = None,
+) -> str:
+    """
+    Reduce step of hierarchical weekly summarization.
+
+    Args:
+        partials: (window label, summary) pairs in time order, e.g. the stored daily
+            summaries of a category plus summaries of posts no daily run covered.
+        Other arguments are as for `summarize_posts_weekly`.
+    """
+    if not partials:
+        return "No posts available to summarize."
+
+    prompt = build_weekly_reduce_prompt(partials, category=category, token_budget=token_budget)
+    return _chat_completion(
+        prompt,
+        model=model,
+        api_key=api_key,
+        base_url=base_url,
+        timeout=240,  # 4-minute timeout for reasoning models
+        label="weekly summary",
+        cache=cache,
+        cache_scope=cache_scope,
+    )
+
+
+SYSTEM_PROMPT = "You are a professional buy-side investment research assistant. Output in Chinese."
+
+
+def _chat_completion(
+    prompt: str,
+    model: str,
+    api_key: Optional[str],
+    base_url: Optional[str],
+    timeout: int,
+    label: str,
+    cache: Optional[LLMCache] = None,
+    cache_scope: Optional[str] = None,
+    temperature: float = 0.2,
+) -> str:
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt},
+    ]
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.make_key(model, messages, {"temperature": temperature})
+        cached = cache.lookup(cache_key, model, scope=cache_scope)
+        if cached is not None:
+            return cached
+
+    key = api_key or os.environ.get("OPENAI_API_KEY") or os.environ.get("DEEPSEEK_API_KEY")
+    if not key:
+        raise RuntimeError("Provide OPENAI_API_KEY or DEEPSEEK_API_KEY (or use --summary-api-key) to summarize posts")
+
+    if importlib.util.find_spec("openai") is None:
+        raise RuntimeError("Install the 'openai' package to enable LLM summarization")
+
+    base_url = base_url or os.environ.get("OPENAI_BASE_URL") or os.environ.get("DEEPSEEK_API_BASE")
+
+    from openai import APIConnectionError, APITimeoutError, InternalServerError, OpenAI
+
+    client = OpenAI(api_key=key, base_url=base_url)
 
     max_retries = 3
     base_delay = 5
@@ -363,22 +539,21 @@ def summarize_posts_weekly(
         try:
             response = client.chat.completions.create(
                 model=model,
-                messages=[
-                    {"role": "system", "content": "You are a professional buy-side investment research assistant. Output in Chinese."},
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.2,
-                timeout=240,  # 4-minute timeout for reasoning models
+                messages=messages,
+                temperature=temperature,
+                timeout=timeout,
             )
-            return (response.choices[0].message.content or "").strip()
+            content = (response.choices[0].message.content or "").strip()
+            if cache is not None and content:
+                cache.put(cache_key, model, content, scope=cache_scope)
+            return content
         except (APIConnectionError, APITimeoutError, InternalServerError) as e:
             if attempt == max_retries - 1:
-                print(f"Failed to generate weekly summary after {max_retries} attempts: {e}")
+                print(f"Failed to generate {label} after {max_retries} attempts: {e}")
                 raise e
-            
+
             delay = base_delay * (2 ** attempt)
-            print(f"Weekly LLM request failed ({e}). Retrying in {delay}s...")
+            print(f"LLM {label} request failed ({e}). Retrying in {delay}s...")
             time.sleep(delay)
-            
-    return ""
 
+    return ""
@@ -1,14 +1,65 @@
 import json
+import math
+import threading
 import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from copy import deepcopy
-from datetime import date, datetime, timedelta, timezone
+from datetime import datetime, timezone
 from email.utils import parsedate_to_datetime
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
 
 import requests
 
+from apify_pipeline.fetch_budget import FetchPlan
+from apify_pipeline.http_transport import HttpTransport
+from apify_pipeline.models import Post, normalize_handle
+from apify_pipeline.run_waiter import MAX_LONG_POLL_SECONDS, TERMINAL_STATES, RunWaiter
+from apify_pipeline.snowflake import IdLike, id_floor, is_snowflake, timestamp_ms, to_datetime, to_int
+
+# Called with a shard's handles and their new posts as soon as that shard's run finishes
+ShardCallback = Callable[[List[str], List[Post]], None]
+
+# Top-level item fields read by _normalize_item / _extract_media. Requesting only these
+# keeps dataset pages small; nested objects (author, user, entities) come back whole.
+DATASET_FIELDS = (
+    "id_str",
+    "id",
+    "tweetId",
+    "author",
+    "username",
+    "userName",
+    "user",
+    "created_at",
+    "createdAt",
+    "timestamp",
+    "date",
+    "full_text",
+    "text",
+    "tweet",
+    "url",
+    "media",
+    "attachments",
+    "extended_entities",
+    "conversationId",
+    "conversation_id_str",
+    "inReplyToId",
+    "in_reply_to_status_id_str",
+    "inReplyToUsername",
+    "inReplyToUser",
+    "in_reply_to_screen_name",
+    "isReply",
+)
+
+# Accounts without a stored timestamp are searched this far back
+DEFAULT_LOOKBACK_SECONDS = 2 * 86400
+# The search window reopens this long before the newest stored post, for tweets that
+# reach search late; posts already stored are dropped again by the since filter
+DEFAULT_SEARCH_OVERLAP_SECONDS = 120
+# `until_time:` sits this far past our clock in case the search side's clock is ahead
+UNTIL_SLACK_SECONDS = 300
+
 
 class ApifyTweetScraperClient:
     """
@@ -17,6 +68,24 @@ class ApifyTweetScraperClient:
     Modes:
     - "sample": load posts from a JSONL file for offline/local testing.
     - "apify": run the actor through the Apify REST API and read dataset items.
+
+    With `shard_count > 1` the handles are split into shards, each started as its own
+    actor run (at most `max_concurrent_runs` at a time, each with `shard_timeout_seconds`).
+    Shards that fail or time out are retried up to `shard_retries` times without
+    discarding the shards that already succeeded.
+
+    With a `FetchPlan`, every run's `maxItems` is the sum of its accounts' planned caps,
+    the run's memory and timeout are sized from that, search terms go quietest account
+    first, and up to the plan's `max_cap` posts are kept per account instead of `limit`.
+    After each fetch, `fetched_counts` holds how many posts each account had in its search
+    window (including the overlap, which may already be stored), and `capped_handles` the
+    accounts whose run returned `maxItems` items (so the actor may have stopped before
+    reaching them).
+
+    Search windows use second-precision `since_time:`/`until_time:` operators (plus
+    `since_id:`) starting `search_overlap_seconds` before each account's newest stored
+    post. `items_requested` (summed `maxItems`) and `items_returned` (dataset items)
+    describe the last fetch, for overfetch accounting.
     """
 
     def __init__(
@@ -29,6 +98,14 @@ class ApifyTweetScraperClient:
         input_template: Optional[Dict] = None,
         poll_interval: int = 5,
         timeout_seconds: int = 120,
+        run_waiter: Optional[RunWaiter] = None,
+        transport: Optional[HttpTransport] = None,
+        dataset_page_size: int = 1000,
+        shard_count: int = 1,
+        max_concurrent_runs: int = 4,
+        shard_timeout_seconds: Optional[int] = None,
+        shard_retries: int = 1,
+        search_overlap_seconds: int = DEFAULT_SEARCH_OVERLAP_SECONDS,
     ):
         self.token = token
         self.actor_id = actor_id
@@ -37,16 +114,49 @@ class ApifyTweetScraperClient:
         self.sample_file = sample_file or Path(__file__).parent / "sample_data" / "sample_tweets.jsonl"
         self.base_input = deepcopy(input_template) if input_template else {}
         self.poll_interval = poll_interval
+        self.http = transport or HttpTransport()
+        self.run_waiter = run_waiter or RunWaiter(
+            self.base_url,
+            token,
+            actor_id,
+            initial_backoff=poll_interval,
+            max_backoff=max(poll_interval * 8, 30),
+            http=self.http,
+        )
         self.timeout_seconds = timeout_seconds
+        self.dataset_page_size = max(dataset_page_size, 1)
+        self.shard_count = max(shard_count, 1)
+        self.max_concurrent_runs = max(max_concurrent_runs, 1)
+        self.shard_timeout_seconds = shard_timeout_seconds or timeout_seconds
+        self.shard_retries = max(shard_retries, 0)
+        self.search_overlap_seconds = max(search_overlap_seconds, 0)
+        self.fetched_counts: Dict[str, int] = {}
+        self.capped_handles: Set[str] = set()
+        self.items_requested = 0
+        self.items_returned = 0
+        self._lock = threading.Lock()
 
     def fetch_accounts(
         self,
         handles: List[str],
-        since_map: Dict[str, Optional[str]],
+        since_map: Dict[str, IdLike],
         since_ts_map: Dict[str, Optional[str]],
         limit: int = 50,
         max_total_limit: int = 500,
-    ) -> List[Dict]:
+        plan: Optional[FetchPlan] = None,
+        on_shard: Optional[ShardCallback] = None,
+    ) -> List[Post]:
+        """
+        New posts for `handles`, newest first per account. `on_shard`, if given, gets each
+        successful shard's handles and posts while the other shards are still running
+        (once with everything for an unsharded or sample run), so they can be stored early.
+        """
+        self.fetched_counts = {}
+        self.capped_handles = set()
+        self.items_requested = 0
+        self.items_returned = 0
+        if plan:
+            limit = plan.max_cap
         normalized_handles = [self._normalize_handle(h) for h in handles if h]
         since_map = {self._normalize_handle(k): v for k, v in since_map.items() if k}
         since_ts_map = {self._normalize_handle(k): v for k, v in since_ts_map.items() if k}
@@ -55,37 +165,42 @@ class ApifyTweetScraperClient:
             return []
 
         if self.mode == "sample":
-            return self._load_sample(normalized_handles, since_map, since_ts_map, limit)
+            posts = self._load_sample(normalized_handles, since_map, since_ts_map, limit)
+            if on_shard:
+                on_shard(normalized_handles, posts)
+            return posts
         if self.mode != "apify":
             raise ValueError(f"Unsupported mode: {self.mode}")
-        return self._run_actor(normalized_handles, since_map, since_ts_map, limit, max_total_limit)
+        return self._run_actor(normalized_handles, since_map, since_ts_map, limit, max_total_limit, plan, on_shard)
 
     def _load_sample(
         self,
         handles: List[str],
-        since_map: Dict[str, Optional[str]],
+        since_map: Dict[str, IdLike],
         since_ts_map: Dict[str, Optional[str]],
         limit: int,
-    ) -> List[Dict]:
+    ) -> List[Post]:
         if not self.sample_file.exists():
             return []
-        buckets: Dict[str, List[Dict]] = {h: [] for h in handles}
+        buckets: Dict[str, List[Post]] = {h: [] for h in handles}
         with self.sample_file.open("r", encoding="utf-8") as fh:
             for line in fh:
                 payload = json.loads(line)
                 author = self._normalize_handle(payload.get("author", ""))
                 if author not in buckets:
                     continue
-                tweet_id = str(payload.get("id"))
+                created = self._created(payload.get("created_at"), payload.get("id"))
                 buckets[author].append(
-                    {
-                        "id": tweet_id,
-                        "author": author,
-                        "created_at": self._coerce_timestamp(payload.get("created_at")),
-                        "text": payload.get("text", ""),
-                        "url": payload.get("url", ""),
-                        "media": payload.get("media") or [],
-                    }
+                    Post(
+                        id=str(payload.get("id")),
+                        author=author,
+                        created_at=created.isoformat() if created else "",
+                        created_ts=int(created.timestamp()) if created else None,
+                        text=payload.get("text") or "",
+                        url=payload.get("url") or "",
+                        media=payload.get("media") or (),
+                        **self._thread_fields(payload),
+                    )
                 )
 
         return self._collect_sorted_posts(handles, buckets, since_map, since_ts_map, limit)
@@ -93,55 +208,167 @@ class ApifyTweetScraperClient:
     def _run_actor(
         self,
         handles: List[str],
-        since_map: Dict[str, Optional[str]],
+        since_map: Dict[str, IdLike],
         since_ts_map: Dict[str, Optional[str]],
         limit: int,
         max_total_limit: int,
-    ) -> List[Dict]:
+        plan: Optional[FetchPlan] = None,
+        on_shard: Optional[ShardCallback] = None,
+    ) -> List[Post]:
         if not self.token:
             raise RuntimeError("Apify token is required in apify mode")
 
-        input_payload = self._build_input(handles, since_map, since_ts_map, limit, max_total_limit)
-        
-        run_data = self._start_run(input_payload)
-        if run_data.get("status") != "SUCCEEDED":
-            run_id = run_data.get("id")
-            print(f"Actor run started: {run_id}. Polling for completion...")
-            run_data = self._poll_run(run_id)
-            
+        shards = self._partition_handles(handles, self.shard_count)
+        if len(shards) == 1:
+            try:
+                buckets = self._run_shard(
+                    handles, since_map, since_ts_map, limit, max_total_limit, self.timeout_seconds, plan
+                )
+            except (RuntimeError, TimeoutError) as exc:
+                print(f"Run failed or timed out: {exc}")
+                return []
+            posts = self._collect_sorted_posts(handles, buckets, since_map, since_ts_map, limit)
+            if on_shard:
+                on_shard(handles, posts)
+            return posts
+
+        buckets: Dict[str, List[Post]] = {h: [] for h in handles}
+        pending = list(range(len(shards)))
+        for attempt in range(self.shard_retries + 1):
+            if not pending:
+                break
+            if attempt:
+                print(f"Retrying {len(pending)} failed shard(s) (attempt {attempt + 1}/{self.shard_retries + 1})...")
+            failed: List[int] = []
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrent_runs, len(pending))) as pool:
+                futures = {
+                    pool.submit(
+                        self._run_shard,
+                        shards[idx],
+                        since_map,
+                        since_ts_map,
+                        limit,
+                        self._shard_total_limit(len(shards[idx]), len(handles), max_total_limit),
+                        self.shard_timeout_seconds,
+                        plan,
+                    ): idx
+                    for idx in pending
+                }
+                for future in as_completed(futures):
+                    idx = futures[future]
+                    try:
+                        shard_buckets = future.result()
+                    except (RuntimeError, TimeoutError, requests.RequestException) as exc:
+                        print(f"Shard {idx + 1}/{len(shards)} failed: {exc}")
+                        failed.append(idx)
+                        continue
+                    for handle, posts in shard_buckets.items():
+                        buckets.setdefault(handle, []).extend(posts)
+                    if on_shard:
+                        on_shard(
+                            shards[idx],
+                            self._collect_sorted_posts(shards[idx], shard_buckets, since_map, since_ts_map, limit),
+                        )
+            pending = sorted(failed)
+
+        if pending:
+            skipped = [h for idx in pending for h in shards[idx]]
+            print(f"Giving up on {len(pending)} shard(s); skipped accounts: {', '.join(skipped)}")
+        posts = self._collect_sorted_posts(handles, buckets, since_map, since_ts_map, limit)
+        for idx in pending:
+            for handle in shards[idx]:
+                self.fetched_counts.pop(handle, None)
+        return posts
+
+    def _run_shard(
+        self,
+        handles: List[str],
+        since_map: Dict[str, IdLike],
+        since_ts_map: Dict[str, Optional[str]],
+        limit: int,
+        max_total_limit: int,
+        timeout_seconds: int,
+        plan: Optional[FetchPlan] = None,
+    ) -> Dict[str, List[Post]]:
+        """Run the actor for one group of handles and return the normalized posts bucketed by handle."""
+        input_payload = self._build_input(handles, since_map, since_ts_map, limit, max_total_limit, plan)
+        run_options = plan.run_options(input_payload["maxItems"]) if plan else None
+        if run_options:
+            # Wait at least as long as the actor is allowed to run
+            timeout_seconds = max(timeout_seconds, run_options["timeout"])
+
+        run_data = self._start_run(input_payload, timeout_seconds, run_options)
+        with self._lock:
+            self.items_requested += input_payload["maxItems"]
+        run_id = run_data.get("id")
+        if run_data.get("status") not in TERMINAL_STATES:
+            print(f"Actor run started: {run_id}. Waiting for completion...")
+        try:
+            run_data = self._poll_run(run_data, timeout_seconds)
+        except TimeoutError:
+            self._abort_run(run_id)
+            raise
+
         if run_data.get("status") != "SUCCEEDED":
-            print(f"Run failed or timed out: {run_data.get('status')}")
-            return []
+            raise RuntimeError(f"Actor run {run_id} ended with status {run_data.get('status')}")
 
         dataset_id = run_data.get("defaultDatasetId")
         if not dataset_id:
-            return []
-        items = self._fetch_dataset_items(dataset_id)
-        return self._normalize_items(items, handles, since_map, since_ts_map, limit)
+            return {h: [] for h in handles}
+        returned = 0
+
+        def counted_items() -> Iterator[Dict]:
+            nonlocal returned
+            for item in self._iter_dataset_items(dataset_id):
+                returned += 1
+                yield item
+
+        buckets = self._bucket_items(counted_items(), handles)
+        with self._lock:
+            self.items_returned += returned
+            if returned >= input_payload["maxItems"]:
+                self.capped_handles.update(handles)
+        if returned >= input_payload["maxItems"]:
+            print(f"Actor run {run_id} returned maxItems={input_payload['maxItems']} items; later accounts may be cut off")
+        return buckets
+
+    @staticmethod
+    def _partition_handles(handles: List[str], shard_count: int) -> List[List[str]]:
+        shard_count = max(1, min(shard_count, len(handles)))
+        size = math.ceil(len(handles) / shard_count)
+        return [handles[start : start + size] for start in range(0, len(handles), size)]
+
+    @staticmethod
+    def _shard_total_limit(shard_size: int, total_handles: int, max_total_limit: int) -> int:
+        return max(1, math.ceil(max_total_limit * shard_size / max(total_handles, 1)))
 
     def _build_input(
         self,
         handles: List[str],
-        since_map: Dict[str, Optional[str]],
+        since_map: Dict[str, IdLike],
         since_ts_map: Dict[str, Optional[str]],
         per_account_limit: int,
         max_total_limit: int,
+        plan: Optional[FetchPlan] = None,
     ) -> Dict:
         payload = deepcopy(self.base_input)
         per_account_limit = max(per_account_limit, 1)
-        total_limit = min(max(per_account_limit * max(len(handles), 1), 1), max_total_limit)
+        if plan:
+            total_limit = plan.max_items(handles, max_total_limit)
+        else:
+            total_limit = min(max(per_account_limit * max(len(handles), 1), 1), max_total_limit)
         
         # apidojo/twitter-scraper-lite uses 'searchTerms'
         search_terms = []
-        now_date = datetime.now(timezone.utc).date()
-        for handle in handles:
+        now = int(time.time())
+        for handle in plan.ordered(handles) if plan else handles:
             query_parts = [f"from:{handle}"]
             since_ts = since_ts_map.get(handle)
-            since_date = self._coerce_to_date(since_ts, fallback_days=2)
-            if since_date:
-                query_parts.append(f"since:{since_date.isoformat()}")
-                until_date = max(since_date, now_date)
-                query_parts.append(f"until:{(until_date + timedelta(days=3)).isoformat()}")
+            since_id = self._since_id_cutoff(since_map.get(handle), since_ts)
+            if since_id is not None:
+                query_parts.append(f"since_id:{since_id}")
+            query_parts.append(f"since_time:{self._since_time(since_ts, now)}")
+            query_parts.append(f"until_time:{now + UNTIL_SLACK_SECONDS}")
             search_terms.append(" ".join(query_parts))
             
         payload["searchTerms"] = search_terms
@@ -153,75 +380,103 @@ class ApifyTweetScraperClient:
             
         return payload
 
-    def _start_run(self, input_payload: Dict) -> Dict:
+    def _since_id_cutoff(self, since_id: IdLike, since_ts: Optional[str]) -> Optional[int]:
+        """
+        ID for the `since_id:` operator, so the actor only returns tweets newer than the
+        last crawl (less the search overlap). Falls back to the ID range that starts
+        after `latest_timestamp` when no snowflake `since_id` is stored.
+        """
+        overlap = self.search_overlap_seconds
+        if is_snowflake(since_id):
+            if not overlap:
+                return to_int(since_id)
+            return id_floor(timestamp_ms(since_id) / 1000 - overlap) - 1
+        since_dt = self._parse_timestamp(since_ts)
+        if since_dt is None:
+            return None
+        # Everything up to the end of the last seen second was already collected
+        return id_floor(since_dt.timestamp() + 1 - overlap) - 1
+
+    def _since_time(self, since_ts: Optional[str], now: int) -> int:
+        """Epoch seconds for `since_time:`: the newest stored post less the overlap, or the default lookback."""
+        since_dt = self._parse_timestamp(since_ts)
+        if since_dt is None:
+            return now - DEFAULT_LOOKBACK_SECONDS
+        # Inclusive, so other posts from the newest post's second are not missed
+        return int(since_dt.timestamp()) - self.search_overlap_seconds
+
+    def _start_run(
+        self,
+        input_payload: Dict,
+        timeout_seconds: Optional[int] = None,
+        run_options: Optional[Dict[str, int]] = None,
+    ) -> Dict:
+        """Start an actor run; `run_options` are Apify run options such as `memory` (MB) and `timeout` (s)."""
+        wait_for = min(timeout_seconds or self.timeout_seconds, MAX_LONG_POLL_SECONDS)
         url = (
             f"{self.base_url}/acts/{urllib.parse.quote(self.actor_id)}/runs"
-            f"?token={urllib.parse.quote(self.token or '')}&waitForFinish={self.timeout_seconds}"
+            f"?token={urllib.parse.quote(self.token or '')}&waitForFinish={wait_for}"
         )
-        response = requests.post(url, json=input_payload, headers={"Content-Type": "application/json"})
+        if run_options:
+            url += "&" + urllib.parse.urlencode(run_options)
+        # Not retried on 5xx: a retry could start a duplicate run
+        response = self.http.post(url, json=input_payload, headers={"Content-Type": "application/json"})
         response.raise_for_status()
         body = response.json()
         return body.get("data") or {}
 
-    def _poll_run(self, run_id: Optional[str]) -> Dict:
-        if not run_id:
-            raise RuntimeError("Missing run id when polling Apify")
-        deadline = time.time() + self.timeout_seconds
-        status_url = f"{self.base_url}/runs/{urllib.parse.quote(run_id)}?token={urllib.parse.quote(self.token or '')}"
-        terminal_states = {"SUCCEEDED", "FAILED", "TIMED_OUT", "ABORTED", "CANCELLED"}
+    def _poll_run(self, run_data: Dict, timeout_seconds: Optional[int] = None) -> Dict:
+        return self.run_waiter.wait(run_data, timeout_seconds or self.timeout_seconds)
 
-        while time.time() < deadline:
-            response = requests.get(status_url)
+    def _abort_run(self, run_id: Optional[str]) -> None:
+        if not run_id:
+            return
+        url = f"{self.base_url}/actor-runs/{urllib.parse.quote(run_id)}/abort?token={urllib.parse.quote(self.token or '')}"
+        try:
+            self.http.post(url, retry_unsafe=True).raise_for_status()
+        except requests.RequestException as exc:
+            print(f"Warning: failed to abort Apify run {run_id}: {exc}")
+
+    def _iter_dataset_items(self, dataset_id: str) -> Iterator[Dict]:
+        """
+        Page through a dataset with offset/limit, yielding items one page at a time.
+
+        Only the fields the normalizer reads are requested (`fields`, `clean`), so both the
+        transfer size and peak memory are bounded by a single page.
+        """
+        url = f"{self.base_url}/datasets/{urllib.parse.quote(dataset_id)}/items"
+        offset = 0
+        while True:
+            params = {
+                "token": self.token or "",
+                "format": "json",
+                "clean": "true",
+                "fields": ",".join(DATASET_FIELDS),
+                "offset": offset,
+                "limit": self.dataset_page_size,
+            }
+            response = self.http.get(url, params=params)
             response.raise_for_status()
-            body = response.json()
-            data = body.get("data") or {}
-            if data.get("status") in terminal_states:
-                return data
-            time.sleep(self.poll_interval)
-
-        raise TimeoutError(f"Apify run {run_id} did not finish in {self.timeout_seconds} seconds")
+            page = response.json()
+            if not page:
+                return
+            yield from page
+            offset += len(page)
 
-    def _fetch_dataset_items(self, dataset_id: str) -> List[Dict]:
-        url = (
-            f"{self.base_url}/datasets/{urllib.parse.quote(dataset_id)}/items"
-            f"?token={urllib.parse.quote(self.token or '')}&format=json"
-        )
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
+            total = response.headers.get("X-Apify-Pagination-Total")
+            if len(page) < self.dataset_page_size or (total and total.isdigit() and offset >= int(total)):
+                return
 
-    def _normalize_items(
-        self,
-        items: Iterable[Dict],
-        handles: List[str],
-        since_map: Dict[str, Optional[str]],
-        since_ts_map: Dict[str, Optional[str]],
-        limit: int,
-    ) -> List[Dict]:
-        buckets: Dict[str, List[Dict]] = {h: [] for h in handles}
-        handle_set = set(handles)
+    def _bucket_items(self, items: Iterable[Dict], handles: List[str]) -> Dict[str, List[Post]]:
+        buckets: Dict[str, List[Post]] = {h: [] for h in handles}
 
         for raw in items:
             post = self._normalize_item(raw)
-            if not post:
-                continue
-            author = self._normalize_handle(post["author"])
-            if author not in handle_set:
-                continue
-            buckets[author].append(
-                {
-                    "id": str(post["id"]),
-                    "author": author,
-                    "created_at": post["created_at"],
-                    "text": post["text"],
-                    "url": post["url"],
-                    "media": post.get("media") or [],
-                }
-            )
-
-        return self._collect_sorted_posts(handles, buckets, since_map, since_ts_map, limit)
+            if post and post.author in buckets:
+                buckets[post.author].append(post)
+        return buckets
 
-    def _normalize_item(self, raw: Dict) -> Optional[Dict]:
+    def _normalize_item(self, raw: Dict) -> Optional[Post]:
         tweet_id = raw.get("id_str") or raw.get("id") or raw.get("tweetId")
         if tweet_id is None:
             return None
@@ -245,7 +500,7 @@ class ApifyTweetScraperClient:
             or raw.get("timestamp")
             or raw.get("date")
         )
-        created_iso = self._coerce_timestamp(created_at)
+        created = self._created(created_at, tweet_id)
 
         text = raw.get("full_text") or raw.get("text") or raw.get("tweet") or ""
         url = raw.get("url")
@@ -254,41 +509,68 @@ class ApifyTweetScraperClient:
 
         media = self._extract_media(raw, str(tweet_id))
 
+        return Post(
+            id=str(tweet_id),
+            author=self._normalize_handle(author),
+            created_at=created.isoformat() if created else "",
+            created_ts=int(created.timestamp()) if created else None,
+            text=text,
+            url=url or "",
+            media=media or (),
+            **self._thread_fields(raw),
+        )
+
+    def _thread_fields(self, raw: Dict) -> Dict:
+        """Reply/conversation fields used to stitch self-threads back together."""
+        conversation_id = raw.get("conversationId") or raw.get("conversation_id_str") or raw.get("conversation_id")
+        in_reply_to_id = (
+            raw.get("inReplyToId")
+            or raw.get("in_reply_to_status_id_str")
+            or raw.get("in_reply_to_status_id")
+        )
+        in_reply_to_user = raw.get("inReplyToUsername") or raw.get("in_reply_to_screen_name") or raw.get("inReplyToUser")
+        if isinstance(in_reply_to_user, dict):
+            in_reply_to_user = in_reply_to_user.get("userName") or in_reply_to_user.get("username") or in_reply_to_user.get("screen_name")
+        is_reply = raw.get("isReply")
         return {
-            "id": str(tweet_id),
-            "author": self._normalize_handle(author),
-            "created_at": created_iso or "",
-            "text": text,
-            "url": url or "",
-            "media": media,
+            "conversation_id": str(conversation_id) if conversation_id else None,
+            "in_reply_to_id": str(in_reply_to_id) if in_reply_to_id else None,
+            "in_reply_to_user": self._normalize_handle(in_reply_to_user) if in_reply_to_user else None,
+            "is_reply": bool(is_reply) if is_reply is not None else bool(in_reply_to_id),
         }
 
+    @classmethod
+    def _created(cls, raw, tweet_id) -> Optional[datetime]:
+        """The item's creation time, read from the snowflake ID when the date is missing or unparseable."""
+        return cls._coerce_datetime(raw) or to_datetime(tweet_id)
+
     @staticmethod
-    def _coerce_timestamp(raw: Optional[str]) -> Optional[str]:
+    def _coerce_datetime(raw) -> Optional[datetime]:
+        """Parse the actor's timestamp formats (ISO, RFC 2822, epoch seconds) into an aware UTC datetime."""
         if not raw:
             return None
         if isinstance(raw, (int, float)):
-            return datetime.fromtimestamp(float(raw), tz=timezone.utc).isoformat()
+            return datetime.fromtimestamp(float(raw), tz=timezone.utc)
         if isinstance(raw, datetime):
-            return raw.astimezone(timezone.utc).isoformat()
+            return raw.astimezone(timezone.utc)
         text = str(raw)
         for candidate in (text, text.replace("Z", "+00:00")):
             try:
                 dt = datetime.fromisoformat(candidate)
-                return dt.astimezone(timezone.utc).isoformat()
+                return dt.astimezone(timezone.utc)
             except Exception:
                 continue
         try:
             dt = parsedate_to_datetime(text)
             if not dt.tzinfo:
                 dt = dt.replace(tzinfo=timezone.utc)
-            return dt.astimezone(timezone.utc).isoformat()
+            return dt.astimezone(timezone.utc)
         except Exception:
             return None
 
     @staticmethod
     def _normalize_handle(handle: str) -> str:
-        return handle.lower().lstrip("@").strip()
+        return normalize_handle(handle)
 
     @staticmethod
     def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
@@ -302,39 +584,44 @@ class ApifyTweetScraperClient:
     def _collect_sorted_posts(
         self,
         handles: List[str],
-        buckets: Dict[str, List[Dict]],
-        since_map: Dict[str, Optional[str]],
+        buckets: Dict[str, List[Post]],
+        since_map: Dict[str, IdLike],
         since_ts_map: Dict[str, Optional[str]],
         limit: int,
-    ) -> List[Dict]:
-        posts: List[Dict] = []
+    ) -> List[Post]:
+        """
+        Newest posts per handle inside its search window, at most `limit` each. The
+        window starts `search_overlap_seconds` before the handle's since state, like the
+        search terms, so tweets that reached search late are kept; posts in the overlap
+        that are already stored are dropped at ingest. Records each handle's uncapped
+        count in `fetched_counts`, overlap included.
+        """
+        posts: List[Post] = []
         for handle in handles:
-            author_posts = buckets.get(handle, [])
-            sorted_posts = sorted(
-                author_posts,
-                key=lambda p: (
-                    self._parse_timestamp(p.get("created_at")) or datetime.min.replace(tzinfo=timezone.utc),
-                    str(p.get("id", "")),
-                ),
-                reverse=True,
-            )
+            # Timestamps were parsed once when the posts were built
+            sorted_posts = sorted(buckets.get(handle, []), key=lambda p: p.sort_key, reverse=True)
             since_id = since_map.get(handle)
-            since_ts = self._parse_timestamp(since_ts_map.get(handle))
-            appended = 0
+            since_ts = since_ts_map.get(handle)
+            # Pre-snowflake IDs carry no time, so they can only be compared as they are
+            id_cutoff = self._since_id_cutoff(since_id, since_ts) if is_snowflake(since_id) else to_int(since_id)
+            since_dt = self._parse_timestamp(since_ts)
+            # Inclusive, as in `_since_time`
+            since_time = int(since_dt.timestamp()) - self.search_overlap_seconds if since_dt else None
+            new_count = 0
 
             for post in sorted_posts:
-                tweet_id = str(post.get("id"))
-                created_ts = self._parse_timestamp(post.get("created_at"))
-
-                if since_id and tweet_id <= str(since_id):
+                post_id = to_int(post.id)
+                if id_cutoff is not None and post_id is not None and post_id <= id_cutoff:
                     break
-                if since_ts and created_ts and created_ts <= since_ts:
+                if since_time is not None and post.created_ts is not None and post.created_ts < since_time:
                     break
 
-                posts.append(post)
-                appended += 1
-                if appended >= limit:
-                    break
+                # Keep counting past the cap so truncated accounts can be spotted
+                if new_count < limit:
+                    posts.append(post)
+                new_count += 1
+            if handle in buckets:
+                self.fetched_counts[handle] = new_count
         return posts
 
     def _extract_media(self, raw: Dict, tweet_id: str) -> List[Dict]:
@@ -382,9 +669,3 @@ class ApifyTweetScraperClient:
                 }
             )
         return media_items
-
-    def _coerce_to_date(self, timestamp: Optional[str], fallback_days: int = 1) -> Optional[date]:
-        dt = self._parse_timestamp(timestamp)
-        if not dt:
-            dt = datetime.now(timezone.utc)
-        return (dt - timedelta(days=fallback_days)).date()
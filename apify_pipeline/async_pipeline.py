@@ -0,0 +1,660 @@
+"""
+Staged asyncio runner behind `pipeline.run_pipeline`.
+
+The run is four stages connected by bounded queues, so each stage starts on its input
+as soon as it exists instead of waiting for the previous stage to finish:
+
+    fetch --shards--> store --categories--> summarize --sections--> Feishu
+
+- fetch: the Apify client runs in a worker thread and hands over every finished shard
+  (`on_shard`). A full queue blocks the fetch thread until the store stage catches up.
+- store: ingests each shard and advances the crawl state. Once every account of a
+  category has been stored, the category is queued for summarization.
+- summarize: loads one category's posts at a time and summarizes them on the LLM
+  thread pool (`summarize_categories_async`).
+- Feishu: converts each finished summary section to docx blocks while the rest of the
+  run continues, so publishing the report only converts the remaining sections.
+
+The report is written once all summaries are in, with the same content and order as a
+sequential run.
+"""
+import asyncio
+import json
+import sqlite3
+import sys
+import traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from apify_pipeline.analyzer import (
+    pack_daily_posts,
+    pack_weekly_posts,
+    select_prompt_posts,
+    summarize_posts,
+    summarize_posts_weekly,
+    summarize_summaries_weekly,
+    summary_section,
+    write_report,
+)
+from apify_pipeline.apify_client import DEFAULT_SEARCH_OVERLAP_SECONDS, ApifyTweetScraperClient
+from apify_pipeline.crawl_state import CrawlStateRepository
+from apify_pipeline.feishu_client import FeishuDocumentRepository, FeishuReportPublisher
+from apify_pipeline.fetch_budget import FetchBudgetPlanner, FetchPlan, FetchRun, FetchRunRepository
+from apify_pipeline.http_transport import HttpTransport, LatencyStats
+from apify_pipeline.keywords import KeywordEngine, load_stopwords
+from apify_pipeline.llm_cache import LLMCache
+from apify_pipeline.models import Post, normalize_handle
+from apify_pipeline.near_duplicates import backfill_fingerprints
+from apify_pipeline.pipeline import ensure_accounts, iter_category_batches, iter_posts_since, read_accounts, window_themes
+from apify_pipeline.prompt_packer import PackedPrompt, prompt_budget
+from apify_pipeline.rollups import RollupRepository, backfill_rollups
+from apify_pipeline.run_waiter import RunWaiter
+from apify_pipeline.snowflake import is_newer
+from apify_pipeline.storage import IngestResult, PostStore, mark_summarized
+from apify_pipeline.summarize_executor import (
+    CategorySummaries,
+    ProviderRateLimits,
+    RateLimiter,
+    estimate_prompt_tokens,
+    estimate_text_tokens,
+    provider_for,
+    summarize_categories_async,
+)
+from apify_pipeline.summary_store import SummaryRepository
+from apify_pipeline.threads import collapse_threads, member_ids
+
+# Bounded queues between the stages; a producer waits while its queue is full
+SHARD_QUEUE_SIZE = 2
+CATEGORY_QUEUE_SIZE = 4
+SECTION_QUEUE_SIZE = 4
+# Worker threads besides the summaries: fetch, store, category loading and Feishu conversion
+STAGE_THREADS = 4
+
+
+def category_order(category: str) -> Tuple[bool, str]:
+    """Sort key matching the report's category order ("Uncategorized" last)."""
+    return category == "Uncategorized", category
+
+
+class CategoryProgress:
+    """Accounts of each configured category that are not stored yet."""
+
+    def __init__(self, accounts: Iterable[str], category_map: Dict[str, str]):
+        self.pending: Dict[str, Set[str]] = {}
+        for handle in accounts:
+            handle = normalize_handle(handle)
+            self.pending.setdefault(category_map.get(handle, "Uncategorized"), set()).add(handle)
+        self.released: Set[str] = set()
+
+    def stored(self, handles: Iterable[str]) -> List[str]:
+        """Mark `handles` as stored and return the categories that just became complete."""
+        handles = {normalize_handle(h) for h in handles}
+        ready = []
+        for category, pending in self.pending.items():
+            if category in self.released or not pending & handles:
+                continue
+            pending -= handles
+            if not pending:
+                ready.append(category)
+        self.released.update(ready)
+        return ready
+
+    def release(self, categories: Iterable[str]) -> List[str]:
+        """The given categories that were not released yet, now marked as released."""
+        ready = sorted(set(categories) - self.released, key=category_order)
+        self.released.update(ready)
+        return ready
+
+
+def window_categories(conn: sqlite3.Connection, cutoff: datetime, unsummarized_only: bool = False) -> List[str]:
+    """Categories with posts created at or after `cutoff`, named as `iter_posts_since` names them."""
+    query = """
+        SELECT DISTINCT COALESCE(a.category, 'Uncategorized') FROM posts p
+        LEFT JOIN accounts a ON a.handle = p.author
+        WHERE p.created_ts >= ?
+    """
+    if unsummarized_only:
+        query += " AND p.is_summarized = 0"
+    return [row[0] for row in conn.execute(query, (int(cutoff.timestamp()),))]
+
+
+async def drain(queue: asyncio.Queue) -> None:
+    """Discard items up to the `None` sentinel, so the producer never blocks on a full queue."""
+    while await queue.get() is not None:
+        pass
+
+
+async def run_pipeline_async(
+    mode: str,
+    token: Optional[str],
+    actor_id: str,
+    input_template: Optional[Path],
+    config_path: Path,
+    db_path: Path,
+    sample_file: Optional[Path],
+    report_path: Path,
+    window_hours: int,
+    limit: int,
+    max_total_limit: int,
+    base_url: str,
+    summary_model: Optional[str] = None,
+    summary_api_key: Optional[str] = None,
+    summary_base_url: Optional[str] = None,
+    summary_max_posts: int = 0,
+    weekly_model: Optional[str] = None,
+    weekly_max_posts: int = 0,
+    sqlite_pragmas: Optional[Dict[str, str]] = None,
+    shards: int = 1,
+    max_concurrent_runs: int = 4,
+    shard_timeout: Optional[int] = None,
+    shard_retries: int = 1,
+    http_pool_sizes: Optional[Dict[str, int]] = None,
+    summary_concurrency: int = 3,
+    llm_requests_per_minute: Optional[float] = None,
+    llm_tokens_per_minute: Optional[float] = None,
+    llm_cache_ttl_hours: Optional[float] = 168,
+    llm_cache_max_entries: int = 2000,
+    weekly_strategy: str = "posts",
+    summary_token_budget: Optional[int] = None,
+    weekly_token_budget: Optional[int] = None,
+    thread_collapse: bool = True,
+    near_dup_collapse: bool = True,
+    stopword_files: Optional[List[Path]] = None,
+    fetch_budget: bool = True,
+    max_account_limit: Optional[int] = None,
+    search_overlap_seconds: int = DEFAULT_SEARCH_OVERLAP_SECONDS,
+    feishu_incremental: bool = False,
+) -> str:
+    loop = asyncio.get_running_loop()
+    # Every stage holds a thread at times; sized so summaries never wait on them
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=max(summary_concurrency, 1) + STAGE_THREADS))
+
+    accounts_list, category_map = read_accounts(config_path)
+
+    store = PostStore(db_path, pragmas=sqlite_pragmas)
+    conn = store.conn
+    ensure_accounts(conn, accounts_list, category_map)
+
+    template_data: Optional[Dict] = None
+    if input_template and input_template.exists():
+        template_data = json.loads(input_template.read_text(encoding="utf-8"))
+
+    # For weekly mode, we still want to fetch data using 'apify' mode
+    client_mode = "apify" if mode == "weekly" else mode
+
+    # One pooled keep-alive transport shared by the Apify and Feishu clients
+    transport = HttpTransport(pool_sizes=http_pool_sizes)
+    http_stats = LatencyStats()
+    transport.add_latency_hook(http_stats)
+    # Run history is written from the fetch threads while shards are being stored,
+    # so the waiter gets its own connection
+    run_waiter = RunWaiter(base_url, token, actor_id, conn=store.connect(), http=transport)
+    client = ApifyTweetScraperClient(
+        token=token,
+        actor_id=actor_id,
+        base_url=base_url,
+        mode=client_mode,
+        sample_file=sample_file,
+        input_template=template_data,
+        shard_count=shards,
+        max_concurrent_runs=max_concurrent_runs,
+        shard_timeout_seconds=shard_timeout,
+        shard_retries=shard_retries,
+        run_waiter=run_waiter,
+        transport=transport,
+        search_overlap_seconds=search_overlap_seconds,
+    )
+
+    crawl_state = CrawlStateRepository(conn)
+    since_map, since_ts_map = crawl_state.since_maps(accounts_list)
+    planner: Optional[FetchBudgetPlanner] = None
+    plan: Optional[FetchPlan] = None
+    if fetch_budget and client_mode == "apify":
+        planner = FetchBudgetPlanner(conn)
+        plan = planner.plan(accounts_list, since_ts_map, limit, max_total_limit, max_cap=max_account_limit)
+        print(plan.describe())
+
+    # The window is fixed before fetching, since categories are summarized while later
+    # shards are still arriving
+    now = datetime.now(timezone.utc)
+    # Posts stored before the rollup tables and fingerprinting existed are caught up on first use
+    with store.transaction() as tx:
+        rolled_up = backfill_rollups(tx)
+        fingerprinted = 0
+        if near_dup_collapse:
+            backfill_since = now - max(timedelta(hours=window_hours), timedelta(days=7))
+            fingerprinted = backfill_fingerprints(tx, int(backfill_since.timestamp()))
+    if rolled_up:
+        print(f"Added {rolled_up} earlier posts to the keyword/author rollups.")
+    if fingerprinted:
+        print(f"Fingerprinted {fingerprinted} earlier posts for near-duplicate detection.")
+
+    summary_result: Optional[Dict[str, str]] = None
+    summarized_ids: List[str] = []
+    # (kind, category, model, post ids) of summaries to persist once the report is written
+    new_summaries: List[Tuple[str, str, str, List[str]]] = []
+    rate_limits = ProviderRateLimits(llm_requests_per_minute, llm_tokens_per_minute)
+    # Summaries are written from worker threads while the main thread may still be
+    # reading posts, so the cache gets its own connection
+    llm_cache: Optional[LLMCache] = None
+    if llm_cache_ttl_hours:
+        llm_cache = LLMCache(
+            store.connect(),
+            ttl_seconds=llm_cache_ttl_hours * 3600,
+            max_entries=llm_cache_max_entries,
+        )
+
+    # Estimated prompt-token budgets per call type (None = legacy newest-N selection)
+    daily_budget = prompt_budget(summary_model, "daily", summary_token_budget)
+    weekly_budget = prompt_budget(weekly_model, "weekly", weekly_token_budget)
+
+    def report_failure(cat: str, exc: BaseException) -> None:
+        traceback.print_exception(type(exc), exc, exc.__traceback__)
+        print(f"LLM summarization failed for category {cat}: {exc}", file=sys.stderr)
+
+    # Set below for the selected mode; no summaries when `summarize_category` stays None
+    summarize_category: Optional[Callable[[str, List[Post]], str]] = None
+    summary_kind = ""
+    summary_limiter: Optional[RateLimiter] = None
+    estimate_tokens: Callable[[List[Post]], int] = lambda cat_posts: estimate_prompt_tokens(cat_posts, 0)
+    # Posts each daily prompt actually included; only these count as covered by the
+    # stored daily summary, the rest are left to the weekly remainder
+    prompt_post_ids: Dict[str, List[str]] = {}
+
+    if mode == "weekly":
+        # Weekly mode: load past 7 days of posts (all, not just unsummarized)
+        cutoff = now - timedelta(days=7)
+        window_label = f"week ending {now.strftime('%Y-%m-%d')}"
+        unsummarized_only = False
+
+        if weekly_model and weekly_strategy == "hierarchical":
+            # Map-reduce: reuse the stored daily summaries of the week and summarize only
+            # the posts no daily prompt included, then reduce everything per category
+            cutoff_ts = int(cutoff.timestamp())
+            summary_repo = SummaryRepository(conn)
+            daily_summaries = summary_repo.covering_posts_since("daily", cutoff_ts)
+            covered_ids = summary_repo.covered_post_ids("daily", cutoff_ts)
+            map_model = summary_model or weekly_model
+            map_limiter = rate_limits.for_provider(provider_for(map_model, summary_base_url))
+            map_budget = prompt_budget(map_model, "daily", summary_token_budget)
+            chunk_size = summary_max_posts if summary_max_posts and summary_max_posts > 0 else 30
+
+            def next_chunk(remainder: List[Post], cat: str) -> Tuple[List[Post], List[Post], Optional[PackedPrompt]]:
+                if not map_budget:
+                    return remainder[:chunk_size], remainder[chunk_size:], None
+                packed = pack_daily_posts(remainder, map_budget, summary_max_posts, cat)
+                packed_ids = set(packed.post_ids)
+                chunk = [p for p in remainder if p.id in packed_ids]
+                return chunk, [p for p in remainder if p.id not in packed_ids], packed
+
+            def summarize_hierarchical(cat: str, cat_posts: List[Post]) -> str:
+                partials = [(stored.window_end, stored.label, stored.summary) for stored in daily_summaries.get(cat, [])]
+                remainder = sorted((p for p in cat_posts if p.id not in covered_ids), key=lambda p: p.created_ts or 0)
+                print(
+                    f"Generating weekly summary for category {cat}: {len(partials)} daily summaries "
+                    f"+ {len(remainder)} of {len(cat_posts)} posts not covered by them..."
+                )
+                while remainder:
+                    chunk, remainder, packed = next_chunk(remainder, cat)
+                    map_limiter.acquire(estimate_prompt_tokens(chunk, len(chunk), map_budget))
+                    text = summarize_posts(
+                        chunk,
+                        model=map_model,
+                        api_key=summary_api_key,
+                        base_url=summary_base_url,
+                        max_posts=len(chunk),
+                        category=cat,
+                        cache=llm_cache,
+                        packed=packed,
+                    )
+                    label = f"{chunk[0].created_at} ~ {chunk[-1].created_at}, {len(chunk)} posts"
+                    partials.append((chunk[-1].created_ts or 0, label, text))
+                partials.sort(key=lambda item: item[0])
+                return summarize_summaries_weekly(
+                    [(label, text) for _, label, text in partials],
+                    model=weekly_model,
+                    api_key=summary_api_key,
+                    base_url=summary_base_url,
+                    category=cat,
+                    cache=llm_cache,
+                    cache_scope=f"weekly:hierarchical:{now:%Y-%m-%d}:{cat}",
+                    token_budget=weekly_budget,
+                )
+
+            def estimate_reduce_tokens(cat_posts: List[Post]) -> int:
+                cat = cat_posts[0].category if cat_posts else None
+                estimate = estimate_text_tokens(stored.summary for stored in daily_summaries.get(cat, []))
+                return min(estimate, weekly_budget) if weekly_budget else estimate
+
+            summarize_category, summary_kind = summarize_hierarchical, "weekly"
+            summary_limiter = rate_limits.for_provider(provider_for(weekly_model, summary_base_url))
+            estimate_tokens = estimate_reduce_tokens
+        elif weekly_model:
+            def summarize_weekly(cat: str, cat_posts: List[Post]) -> str:
+                packed = None
+                if weekly_budget:
+                    packed = pack_weekly_posts(cat_posts, weekly_budget, weekly_max_posts, cat)
+                    print(f"Generating weekly summary for category {cat}: packed {packed.describe()}...")
+                else:
+                    print(f"Generating weekly summary for {len(cat_posts)} posts in category: {cat}...")
+                return summarize_posts_weekly(
+                    cat_posts,
+                    model=weekly_model,
+                    api_key=summary_api_key,
+                    base_url=summary_base_url,
+                    max_posts=weekly_max_posts,
+                    category=cat,
+                    cache=llm_cache,
+                    packed=packed,
+                    # A rerun on the same day reuses finished categories even if a few
+                    # posts arrived in between
+                    cache_scope=f"weekly:{now:%Y-%m-%d}:{cat}",
+                )
+
+            summarize_category, summary_kind = summarize_weekly, "weekly"
+            summary_limiter = rate_limits.for_provider(provider_for(weekly_model, summary_base_url))
+            estimate_tokens = lambda cat_posts: estimate_prompt_tokens(cat_posts, weekly_max_posts, weekly_budget)
+        else:
+            print("Warning: Weekly mode requires --weekly-model to generate summaries.")
+    else:
+        # Daily mode: load posts in window and filter unsummarized
+        cutoff = now - timedelta(hours=window_hours)
+        window_label = f"past {window_hours}h ending {now.strftime('%Y-%m-%d %H:%M UTC')}"
+        # With a summary model, the report only lists posts that were not summarized before this run
+        unsummarized_only = bool(summary_model)
+
+        if summary_model:
+            def summarize_daily(cat: str, cat_posts: List[Post]) -> str:
+                packed = None
+                if daily_budget:
+                    packed = pack_daily_posts(cat_posts, daily_budget, summary_max_posts, cat)
+                    by_id = {p.id: p for p in cat_posts}
+                    prompt_post_ids[cat] = [pid for root in packed.post_ids for pid in member_ids(by_id[root])]
+                    print(f"Summarizing category {cat}: packed {packed.describe()}...")
+                else:
+                    prompt_post_ids[cat] = [
+                        pid for p in select_prompt_posts(cat_posts, summary_max_posts) for pid in member_ids(p)
+                    ]
+                    print(f"Summarizing {len(cat_posts)} posts for category: {cat}...")
+                return summarize_posts(
+                    cat_posts,
+                    model=summary_model,
+                    api_key=summary_api_key,
+                    base_url=summary_base_url,
+                    max_posts=summary_max_posts,
+                    category=cat,
+                    cache=llm_cache,
+                    packed=packed,
+                )
+
+            summarize_category, summary_kind = summarize_daily, "daily"
+            summary_limiter = rate_limits.for_provider(provider_for(summary_model, summary_base_url))
+            estimate_tokens = lambda cat_posts: estimate_prompt_tokens(cat_posts, summary_max_posts, daily_budget)
+
+    documents = FeishuDocumentRepository(conn) if feishu_incremental else None
+    publisher = FeishuReportPublisher(mode, transport=transport, documents=documents)
+
+    shard_queue: "asyncio.Queue[Optional[Tuple[List[str], List[Post]]]]" = asyncio.Queue(SHARD_QUEUE_SIZE)
+    category_queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue(CATEGORY_QUEUE_SIZE)
+    section_queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue(SECTION_QUEUE_SIZE)
+
+    async def fetch() -> None:
+        def on_shard(handles: List[str], shard_posts: List[Post]) -> None:
+            # Blocks this fetch thread while the store stage is behind
+            asyncio.run_coroutine_threadsafe(shard_queue.put((handles, shard_posts)), loop).result()
+
+        try:
+            await asyncio.to_thread(
+                client.fetch_accounts,
+                accounts_list,
+                since_map,
+                since_ts_map,
+                limit=limit,
+                max_total_limit=max_total_limit,
+                plan=plan,
+                on_shard=on_shard,
+            )
+        finally:
+            await shard_queue.put(None)
+
+    # Posts per account that were already stored (the search overlap re-fetches some)
+    already_stored: Counter = Counter()
+
+    def store_shard(shard_posts: List[Post]) -> IngestResult:
+        ingest = store.ingest(shard_posts)
+        inserted = set(ingest.inserted)
+        latest_per_author: Dict[str, Post] = {}
+        for post in shard_posts:
+            if not post.id:
+                continue
+            if post.id not in inserted:
+                already_stored[post.author] += 1
+                continue
+            existing = latest_per_author.get(post.author)
+            if existing is None or (
+                post.created_ts is not None
+                and (existing.created_ts is None or existing.created_ts < post.created_ts)
+            ):
+                latest_per_author[post.author] = post
+            elif existing.created_ts is None and is_newer(post.id, existing.id):
+                # Fallback to id ordering if timestamp is missing
+                latest_per_author[post.author] = post
+        for author, post in latest_per_author.items():
+            crawl_state.update(author, since_id=post.id, latest_timestamp=post.created_at)
+        crawl_state.flush()
+        return ingest
+
+    def record_fetch(new_posts: int) -> None:
+        if planner and plan and client.fetched_counts:
+            fetched = {
+                handle: max(count - already_stored[handle], 0) for handle, count in client.fetched_counts.items()
+            }
+            with conn:
+                truncated = planner.record(plan, fetched, client.capped_handles)
+            if truncated:
+                print(f"Fetch budget: {len(truncated)} account(s) may have been truncated and get more next run: {', '.join(truncated)}")
+        wait_metrics = run_waiter.metrics
+        if wait_metrics.runs:
+            print(
+                f"Apify wait: {wait_metrics.runs} run(s), {wait_metrics.status_calls} status call(s), "
+                f"{wait_metrics.wait_seconds:.1f}s waited, {wait_metrics.outliers} outlier(s)"
+            )
+        if client.items_requested:
+            fetch_run = FetchRun(
+                accounts=len(accounts_list),
+                max_items=client.items_requested,
+                items_returned=client.items_returned,
+                new_posts=new_posts,
+                overlap_seconds=search_overlap_seconds,
+            )
+            fetch_runs = FetchRunRepository(conn)
+            with conn:
+                fetch_runs.record(fetch_run)
+            recent = fetch_runs.overfetch_ratio()
+            print(fetch_run.describe() + (f"; last 10 runs: {recent:.2f}x" if recent is not None else ""))
+
+    async def store_shards() -> None:
+        progress = CategoryProgress(accounts_list, category_map)
+        shards_done = False
+        try:
+            stored = duplicates = 0
+            received = False
+            while (item := await shard_queue.get()) is not None:
+                handles, shard_posts = item
+                if shard_posts:
+                    ingest = await asyncio.to_thread(store_shard, shard_posts)
+                    stored += ingest.inserted_count
+                    duplicates += ingest.duplicate_count
+                    received = True
+                for category in progress.stored(handles):
+                    await category_queue.put(category)
+            shards_done = True
+            if received:
+                print(f"Stored {stored} new posts ({duplicates} already stored).")
+            await asyncio.to_thread(record_fetch, stored)
+            # Categories of failed shards, and of posts stored by earlier runs, go last
+            remaining = list(progress.pending) + window_categories(conn, cutoff, unsummarized_only)
+            for category in progress.release(remaining):
+                await category_queue.put(category)
+        except BaseException:
+            # Keep taking shards so the fetch thread is not left blocked on a full queue
+            if not shards_done:
+                await drain(shard_queue)
+            raise
+        finally:
+            await category_queue.put(None)
+
+    def load_category(category: str) -> List[Tuple[str, List[Post]]]:
+        # Per-thread reader, so loading never waits on the store stage's transactions
+        return list(
+            iter_category_batches(
+                store.reader(),
+                cutoff,
+                unsummarized_only=unsummarized_only,
+                collapse=thread_collapse,
+                collapse_duplicates=near_dup_collapse,
+                category=category,
+            )
+        )
+
+    async def summarize() -> Optional[CategorySummaries]:
+        if summarize_category is None:
+            await drain(category_queue)
+            await section_queue.put(None)
+            return None
+        jobs_done = False
+
+        async def jobs() -> AsyncIterator[Tuple[str, List[Post]]]:
+            nonlocal jobs_done
+            while (category := await category_queue.get()) is not None:
+                for batch in await asyncio.to_thread(load_category, category):
+                    yield batch
+            jobs_done = True
+
+        async def on_summary(cat: str, text: str) -> None:
+            await section_queue.put(summary_section(cat, text))
+
+        try:
+            return await summarize_categories_async(
+                jobs(),
+                summarize_category,
+                max_concurrency=summary_concurrency,
+                limiter=summary_limiter,
+                estimate_tokens=estimate_tokens,
+                on_result=on_summary,
+                on_error=report_failure,
+            )
+        finally:
+            if not jobs_done:
+                await drain(category_queue)
+            await section_queue.put(None)
+
+    async def preconvert_sections() -> None:
+        # Conversion ahead of time is only a head start; on failure publishing converts everything
+        failed = not publisher.enabled
+        if not failed:
+            try:
+                await asyncio.to_thread(publisher.start)
+            except Exception as exc:
+                print(f"Feishu warm-up failed: {exc}", file=sys.stderr)
+                failed = True
+        while (section := await section_queue.get()) is not None:
+            if failed:
+                continue
+            try:
+                await asyncio.to_thread(publisher.add_section, section)
+            except Exception as exc:
+                print(f"Feishu section conversion failed: {exc}", file=sys.stderr)
+                failed = True
+
+    # Close the pooled connections and database handles even when a stage fails
+    try:
+        _, _, outcome, _ = await asyncio.gather(fetch(), store_shards(), summarize(), preconvert_sections())
+
+        if outcome is not None:
+            # Summaries finish in any order; the report lists categories in its usual order
+            summary_result = {cat: outcome.results[cat] for cat in sorted(outcome.results, key=category_order)}
+            if summary_kind == "daily":
+                # Only categories whose summary succeeded are marked as summarized
+                for cat_ids in outcome.post_ids.values():
+                    summarized_ids.extend(cat_ids)
+                new_summaries.extend(("daily", cat, summary_model, prompt_post_ids[cat]) for cat in summary_result)
+            else:
+                new_summaries.extend(("weekly", cat, weekly_model, outcome.post_ids[cat]) for cat in summary_result)
+
+        if llm_cache is not None and summary_result is not None:
+            stats = llm_cache.stats()
+            print(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses")
+
+        # Header stats come from the daily rollups instead of re-tokenizing the window's posts. Only
+        # a partial day with posts outside the window, or a report limited to unsummarized posts,
+        # is counted from the posts themselves.
+        extra_stopwords = load_stopwords(stopword_files or [])
+        rollups = RollupRepository(conn)
+        keywords = [
+            term
+            for term, _ in rollups.top_terms(cutoff, now, exclude=extra_stopwords, unsummarized_only=unsummarized_only)
+        ]
+        themes = window_themes(conn, cutoff, KeywordEngine(extra_stopword_files=stopword_files or []))
+        highlights: List[str] = []
+        if mode == "weekly":
+            rising = rollups.term_deltas(cutoff, now, exclude=extra_stopwords)
+            if rising:
+                highlights.append(
+                    "Rising vs. previous week: "
+                    + ", ".join(f"{term} (+{current - previous})" for term, current, previous in rising)
+                    + "."
+                )
+            active = rollups.author_counts(cutoff, now)
+            if active:
+                highlights.append("Most active accounts: " + ", ".join(f"@{author} ({count})" for author, count in active) + ".")
+
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        report_posts = iter_posts_since(
+            conn,
+            cutoff,
+            unsummarized_only=unsummarized_only,
+            by_category=bool(category_map),
+            collapse_duplicates=near_dup_collapse,
+        )
+        if thread_collapse:
+            report_posts = collapse_threads(report_posts)
+        with report_path.open("w", encoding="utf-8") as fh:
+            write_report(
+                fh,
+                report_posts,
+                window_label=window_label,
+                summary=summary_result,
+                report_type="daily" if mode != "weekly" else "weekly",
+                keywords=keywords,
+                highlights=highlights,
+                themes=themes,
+            )
+        # Mark after the report is written, since the report selects the still-unsummarized rows.
+        # Summaries are stored in the same transaction, so a post is marked exactly when a
+        # stored summary accounts for it.
+        if new_summaries or summarized_ids:
+            with store.transaction() as tx:
+                summary_repo = SummaryRepository(tx)
+                for kind, cat, model, post_ids in new_summaries:
+                    summary_repo.add(
+                        kind, cat, model, int(cutoff.timestamp()), int(now.timestamp()), summary_result[cat], post_ids
+                    )
+                mark_summarized(tx, summarized_ids)
+        report_body = report_path.read_text(encoding="utf-8")
+
+        try:
+            doc_url = await asyncio.to_thread(publisher.publish, report_body)
+            if doc_url:
+                print(f"Feishu doc created: {doc_url}")
+        except Exception as exc:
+            print(f"Feishu notification failed: {exc}", file=sys.stderr)
+        return report_body
+    finally:
+        for line in http_stats.describe():
+            print(line)
+        transport.close()
+        store.close()
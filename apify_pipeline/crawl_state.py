@@ -0,0 +1,75 @@
+import sqlite3
+from typing import Dict, Iterable, Optional, Tuple
+
+from apify_pipeline.snowflake import IdLike, to_int
+
+# (since_id, latest_timestamp)
+CrawlState = Tuple[Optional[int], Optional[str]]
+
+
+class CrawlStateRepository:
+    """
+    Per-account crawl state (`since_id`, `latest_timestamp`) stored on the `accounts` table.
+    `since_id` is the integer tweet ID of the newest post seen for the account.
+
+    State for every account is read with a single query, updates are buffered in memory
+    during the run, and `flush` writes them in one transaction with `executemany`.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self._pending: Dict[str, CrawlState] = {}
+
+    def load(self, accounts: Optional[Iterable[str]] = None) -> Dict[str, CrawlState]:
+        cur = self.conn.execute("SELECT handle, since_id, latest_timestamp FROM accounts")
+        state = {row[0]: (row[1], row[2]) for row in cur}
+        if accounts is None:
+            return state
+        return {account: state.get(self._normalize(account), (None, None)) for account in accounts}
+
+    def since_maps(
+        self, accounts: Iterable[str]
+    ) -> Tuple[Dict[str, Optional[int]], Dict[str, Optional[str]]]:
+        state = self.load(accounts)
+        since_map = {account: since_id for account, (since_id, _) in state.items()}
+        since_ts_map = {account: latest_ts for account, (_, latest_ts) in state.items()}
+        return since_map, since_ts_map
+
+    def update(
+        self,
+        account: str,
+        since_id: IdLike = None,
+        latest_timestamp: Optional[str] = None,
+    ) -> None:
+        since_id = to_int(since_id)
+        if since_id is None and latest_timestamp is None:
+            return
+        normalized = self._normalize(account)
+        prev_since_id, prev_latest_ts = self._pending.get(normalized, (None, None))
+        self._pending[normalized] = (
+            since_id if since_id is not None else prev_since_id,
+            latest_timestamp if latest_timestamp is not None else prev_latest_ts,
+        )
+
+    def flush(self) -> int:
+        if not self._pending:
+            return 0
+        rows = [(handle, since_id, latest_ts) for handle, (since_id, latest_ts) in self._pending.items()]
+        with self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO accounts(handle, platform, since_id, latest_timestamp, updated_at)
+                VALUES(?, 'x', ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(handle) DO UPDATE SET
+                    since_id = COALESCE(excluded.since_id, accounts.since_id),
+                    latest_timestamp = COALESCE(excluded.latest_timestamp, accounts.latest_timestamp),
+                    updated_at = CURRENT_TIMESTAMP
+                """,
+                rows,
+            )
+        self._pending.clear()
+        return len(rows)
+
+    @staticmethod
+    def _normalize(account: str) -> str:
+        return account.lower().lstrip("@").strip()
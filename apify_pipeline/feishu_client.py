@@ -1,8 +1,12 @@
+import json
 import os
+import sqlite3
 import sys
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional, Set, Tuple
 
 try:
     from dotenv import load_dotenv
@@ -16,7 +20,103 @@ FEISHU_LIB_PATH = ROOT / "feishu_connector" / "src"
 if str(FEISHU_LIB_PATH) not in sys.path:
     sys.path.insert(0, str(FEISHU_LIB_PATH))
 
-from feishu_connector import FeishuClient, FeishuConfig
+from feishu_connector import BlockCache, DocumentState, FeishuClient, FeishuConfig, MemoryBlockCache, SectionBlocks
+
+# 滚动文档记录与段落块缓存的保留天数
+DOCUMENT_RETENTION_DAYS = 60
+BLOCK_CACHE_RETENTION_DAYS = 14
+
+
+class FeishuDocumentRepository:
+    """
+    增量发布用的滚动文档记录 (`feishu_documents`，每个周期一篇) 与按段落哈希缓存的
+    转换结果 (`feishu_block_cache`)。实现 feishu_connector 的 BlockCache 接口。
+    与其他 Repository 一样不提交事务。
+
+    发布过程中 `get_blocks`/`put_blocks` 只读数据库: 命中的哈希与新转换的块先记在内存里，
+    由 `save()` 在调用方的事务中一并写入，避免在共享连接上留下未提交的隐式事务。
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self._touched: Set[str] = set()
+        self._pending: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def load(self, period: str) -> Optional[DocumentState]:
+        row = self.conn.execute(
+            "SELECT document_id, url, title, sections FROM feishu_documents WHERE period = ?",
+            (period,),
+        ).fetchone()
+        if row is None:
+            return None
+        sections = [SectionBlocks(item["hash"], item["block_ids"]) for item in json.loads(row[3])]
+        return DocumentState(row[0], row[1] or "", row[2] or "", sections)
+
+    def save(self, period: str, state: DocumentState, now: Optional[float] = None) -> None:
+        now = int(time.time() if now is None else now)
+        sections = json.dumps([{"hash": s.hash, "block_ids": s.block_ids} for s in state.sections])
+        self.conn.execute(
+            """
+            INSERT INTO feishu_documents(period, document_id, url, title, sections, created_at, updated_at)
+            VALUES(?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(period) DO UPDATE SET
+                document_id = excluded.document_id,
+                url = excluded.url,
+                title = excluded.title,
+                sections = excluded.sections,
+                created_at = CASE WHEN feishu_documents.document_id = excluded.document_id
+                                  THEN feishu_documents.created_at ELSE excluded.created_at END,
+                updated_at = excluded.updated_at
+            """,
+            (period, state.document_id, state.url, state.title, sections, now, now),
+        )
+        self._flush_blocks(now)
+
+    def get_blocks(self, section_hash: str) -> Optional[list]:
+        with self._lock:
+            blocks = self._pending.get(section_hash)
+        if blocks is not None:
+            return blocks
+        row = self.conn.execute(
+            "SELECT blocks FROM feishu_block_cache WHERE section_hash = ?", (section_hash,)
+        ).fetchone()
+        if row is None:
+            return None
+        with self._lock:
+            self._touched.add(section_hash)
+        return json.loads(row[0])
+
+    def put_blocks(self, section_hash: str, blocks: list) -> None:
+        with self._lock:
+            self._pending[section_hash] = blocks
+
+    def _flush_blocks(self, now: int) -> None:
+        """写入本次发布新转换的块，并更新命中块的 `last_used_at`。"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            touched, self._touched = self._touched - pending.keys(), set()
+        self.conn.executemany(
+            """
+            INSERT OR REPLACE INTO feishu_block_cache(section_hash, blocks, created_at, last_used_at)
+            VALUES(?, ?, ?, ?)
+            """,
+            [(key, json.dumps(blocks, ensure_ascii=False), now, now) for key, blocks in pending.items()],
+        )
+        self.conn.executemany(
+            "UPDATE feishu_block_cache SET last_used_at = ? WHERE section_hash = ?",
+            [(now, key) for key in sorted(touched)],
+        )
+
+    def prune(self, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        self.conn.execute(
+            "DELETE FROM feishu_documents WHERE updated_at < ?", (int(now - DOCUMENT_RETENTION_DAYS * 86400),)
+        )
+        self.conn.execute(
+            "DELETE FROM feishu_block_cache WHERE last_used_at < ?",
+            (int(now - BLOCK_CACHE_RETENTION_DAYS * 86400),),
+        )
 
 
 def _load_feishu_config() -> Optional[FeishuConfig]:
@@ -50,18 +150,115 @@ def _default_title(report_mode: str) -> str:
     return f"行业专家报告_{date_str}"
 
 
-def send_report_to_feishu(markdown_content: str, report_mode: str) -> Optional[str]:
-    config = _load_feishu_config()
-    if not config:
-        print("Feishu config missing; skipping doc creation.")
-        return None
+def _rolling_period(report_mode: str, now: Optional[datetime] = None) -> Tuple[str, str]:
+    """滚动文档的周期键与标题: 周报每个 ISO 周一篇，其余每天一篇。"""
+    now = now or datetime.now()
+    if report_mode == "weekly":
+        year, week, _ = now.isocalendar()
+        monday = now - timedelta(days=now.weekday())
+        return f"weekly:{year}-W{week:02d}", f"行业专家周报_{monday:%Y%m%d}"
+    return f"daily:{now:%Y-%m-%d}", _default_title(report_mode)
+
+
+def _update_rolling_doc(
+    client: FeishuClient,
+    documents: FeishuDocumentRepository,
+    markdown_content: str,
+    report_mode: str,
+    block_cache: Optional[BlockCache] = None,
+) -> str:
+    period, title = _rolling_period(report_mode)
+    state = documents.load(period)
+    block_cache = block_cache or documents
+    try:
+        result = client.update_markdown(title, markdown_content, state, block_cache=block_cache)
+    except RuntimeError as exc:
+        if state is None:
+            raise
+        # 文档可能已被删除或无权访问，改为新建当期文档
+        print(f"Warning: updating Feishu doc {state.document_id} failed ({exc}); creating a new one")
+        result = client.update_markdown(title, markdown_content, None, block_cache=block_cache)
+
+    with documents.conn:
+        documents.save(period, result.state)
+        documents.prune()
+    print(result.describe())
+    # 只在当期文档新建时发送通知，后续更新不重复推送链接
+    if result.created:
+        client.send_text_message(result.state.url)
+    return result.state.url
+
+
+class FeishuReportPublisher:
+    """
+    分阶段发布报告: `start()` 预先获取 token，`add_section()` 在报告写完之前转换已完成的段落
+    (例如各分类摘要，与报告中的写法一致)，`publish()` 发布完整报告时只需转换其余段落。
+    传入 `documents` 时增量更新当期滚动文档，否则每次新建文档。未配置飞书时各方法不做任何事。
+
+    预先转换的块只保存在内存中: 流水线其他阶段仍在写数据库时不写 SQLite 缓存。
+    """
+
+    def __init__(
+        self,
+        report_mode: str,
+        transport=None,
+        documents: Optional[FeishuDocumentRepository] = None,
+    ) -> None:
+        self.report_mode = report_mode
+        self.documents = documents
+        self.sections = MemoryBlockCache()
+        self.client: Optional[FeishuClient] = None
+        config = _load_feishu_config()
+        if config:
+            # 默认在本地转换 Markdown；FEISHU_REMOTE_CONVERT=1 时改用飞书转换接口
+            remote_convert = os.getenv("FEISHU_REMOTE_CONVERT", "").strip().lower() in ("1", "true", "yes")
+            self.client = FeishuClient(config, session=transport, remote_convert=remote_convert)
+
+    @property
+    def enabled(self) -> bool:
+        return self.client is not None
+
+    def start(self) -> None:
+        if self.client is not None:
+            self.client.warm_up()
+
+    def add_section(self, markdown_content: str) -> int:
+        """预先转换一段已完成的报告内容，返回新转换的段数。"""
+        if self.client is None:
+            return 0
+        return self.client.preconvert(markdown_content, self.sections)
+
+    def publish(self, markdown_content: str) -> Optional[str]:
+        if self.client is None:
+            print("Feishu config missing; skipping doc creation.")
+            return None
+        if self.documents is not None:
+            # 预先转换过的段直接使用，其余的查 SQLite 缓存
+            self.sections.backing = self.documents
+            return _update_rolling_doc(
+                self.client, self.documents, markdown_content, self.report_mode, block_cache=self.sections
+            )
+        doc_title = _default_title(self.report_mode)
+
+        # 调用新库的方法创建文档 (大报告会拆分为多个子文档)
+        result = self.client.publish_markdown(
+            doc_title, markdown_content, block_cache=self.sections if len(self.sections) else None
+        )
+        if result.share_url:
+            print(f"Feishu share link: {result.share_url}")
+        if result.sub_documents:
+            print(f"Feishu report split into {len(result.urls)} documents")
+
+        # 发送通知
+        self.client.send_text_message("\n".join(result.urls))
+        return result.url
+
 
-    client = FeishuClient(config)
-    doc_title = _default_title(report_mode)
-    
-    # 调用新库的方法创建文档
-    doc_url = client.create_doc_from_markdown(doc_title, markdown_content)
-    
-    # 发送通知
-    client.send_text_message(doc_url)
-    return doc_url
+def send_report_to_feishu(
+    markdown_content: str,
+    report_mode: str,
+    transport=None,
+    documents: Optional[FeishuDocumentRepository] = None,
+) -> Optional[str]:
+    """传入 `documents` 时增量更新当期滚动文档，否则每次新建文档。"""
+    return FeishuReportPublisher(report_mode, transport=transport, documents=documents).publish(markdown_content)
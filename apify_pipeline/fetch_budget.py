@@ -0,0 +1,300 @@
+import math
+import sqlite3
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from apify_pipeline.models import iso_to_epoch, normalize_handle
+
+# Posting rates are measured over this many days of stored posts
+RATE_WINDOW_DAYS = 14
+# Shorter histories are stretched to a day so one early post does not look like a flood
+MIN_RATE_SPAN_HOURS = 24
+# Accounts without a latest_timestamp are searched this far back (the client's default lookback)
+DEFAULT_GAP_HOURS = 48
+# Room above the expected count for bursts
+HEADROOM = 1.5
+MIN_ACCOUNT_CAP = 3
+# A truncated account gets at least this multiple of its cap next run
+TRUNCATION_GROWTH = 2.0
+HISTORY_RETENTION_DAYS = 90
+
+# (max items in the run, actor memory in MB); bigger runs get MAX_MEMORY_MB
+MEMORY_TIERS = ((200, 512), (1000, 1024), (5000, 2048))
+MAX_MEMORY_MB = 4096
+# Actor startup plus scraping throughput, used to size the run timeout
+RUN_BASE_SECONDS = 60
+ITEMS_PER_SECOND = 5.0
+MIN_RUN_TIMEOUT = 120
+MAX_RUN_TIMEOUT = 3600
+
+
+def actor_memory_mb(items: int) -> int:
+    for max_items, memory in MEMORY_TIERS:
+        if items <= max_items:
+            return memory
+    return MAX_MEMORY_MB
+
+
+def actor_timeout_seconds(items: int) -> int:
+    seconds = RUN_BASE_SECONDS + math.ceil(items / ITEMS_PER_SECOND)
+    return max(MIN_RUN_TIMEOUT, min(seconds, MAX_RUN_TIMEOUT))
+
+
+@dataclass
+class AccountBudget:
+    handle: str
+    cap: int
+    expected: Optional[float] = None  # None when the account has no history yet
+    raised: bool = False  # cap raised because the last run was truncated
+
+
+@dataclass
+class FetchPlan:
+    """
+    Per-account item caps for one crawl. Accounts not in the plan get `default_cap`.
+    `max_items` and `run_options` size an actor run for any subset of the handles, so
+    shards are sized from their own accounts.
+
+    The actor only takes a global `maxItems`, so it can return more than an account's
+    cap. Those items are already paid for, so the client keeps up to `max_cap` per
+    account; the caps size the run and tell whether an account was truncated.
+    """
+
+    accounts: Dict[str, AccountBudget]
+    default_cap: int
+    max_cap: int
+    max_total_limit: int
+
+    def cap(self, handle: str) -> int:
+        budget = self.accounts.get(handle)
+        return budget.cap if budget else self.default_cap
+
+    @property
+    def caps(self) -> Dict[str, int]:
+        return {handle: budget.cap for handle, budget in self.accounts.items()}
+
+    def ordered(self, handles: Iterable[str]) -> List[str]:
+        """`handles` by ascending cap, so a run that hits `maxItems` cuts the busiest accounts short."""
+        return sorted(handles, key=self.cap)
+
+    def max_items(self, handles: Optional[Iterable[str]] = None, max_total_limit: Optional[int] = None) -> int:
+        handles = self.accounts if handles is None else handles
+        limit = self.max_total_limit if max_total_limit is None else max_total_limit
+        return max(1, min(sum(self.cap(h) for h in handles), limit))
+
+    def run_options(self, items: int) -> Dict[str, int]:
+        """Apify run options (`memory` in MB, `timeout` in seconds) for a run of `items` posts."""
+        return {"memory": actor_memory_mb(items), "timeout": actor_timeout_seconds(items)}
+
+    def describe(self) -> str:
+        caps = sorted(self.caps.values()) or [self.default_cap]
+        items = self.max_items()
+        options = self.run_options(items)
+        raised = [b.handle for b in self.accounts.values() if b.raised]
+        text = (
+            f"Fetch budget: {len(self.accounts)} accounts, caps {caps[0]}-{caps[-1]} "
+            f"(median {statistics.median(caps):g}), maxItems {items}, "
+            f"{options['memory']} MB, timeout {options['timeout']}s"
+        )
+        if raised:
+            text += f"; raised after a truncated run: {', '.join(raised)}"
+        return text
+
+
+class FetchBudgetPlanner:
+    """
+    Plans per-account fetch caps from posting history instead of one `limit` for all.
+
+    Each account's expected number of new posts is its posting rate over the last
+    `rate_window_days` of stored posts times the hours since its newest stored post,
+    plus `headroom`. Accounts without any history get `default_cap`. `record` stores
+    how many new posts each account actually had against its cap in
+    `fetch_budget_history`. An account that filled its cap, or whose actor run stopped
+    at `maxItems`, was probably truncated, so its next cap grows by `TRUNCATION_GROWTH`.
+    When the caps add up to more than `max_total_limit` they are scaled down
+    proportionally.
+
+    Like the other repositories, `record` does not commit.
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        rate_window_days: int = RATE_WINDOW_DAYS,
+        headroom: float = HEADROOM,
+        min_cap: int = MIN_ACCOUNT_CAP,
+    ):
+        self.conn = conn
+        self.rate_window_days = rate_window_days
+        self.headroom = headroom
+        self.min_cap = max(min_cap, 1)
+
+    def posting_rates(self, now: Optional[float] = None) -> Dict[str, float]:
+        """Posts per hour for every account with posts in the rate window."""
+        now = time.time() if now is None else now
+        window_start = now - self.rate_window_days * 86400
+        added = {
+            handle: iso_to_epoch(created_at)
+            for handle, created_at in self.conn.execute("SELECT handle, created_at FROM accounts")
+        }
+        rates: Dict[str, float] = {}
+        rows = self.conn.execute(
+            """
+            SELECT author, COUNT(*), MIN(created_ts) FROM posts
+            WHERE created_ts >= ?
+            GROUP BY author
+            """,
+            (int(window_start),),
+        )
+        for author, count, first_ts in rows:
+            # Measured from when the account was added, or its first post if that is earlier
+            tracked_since = min(first_ts, added.get(author) or first_ts)
+            span_hours = max((now - max(tracked_since, window_start)) / 3600, MIN_RATE_SPAN_HOURS)
+            rates[author] = count / span_hours
+        return rates
+
+    def last_runs(self) -> Dict[str, Tuple[int, bool]]:
+        """`(cap, truncated)` of each account's most recent recorded fetch."""
+        rows = self.conn.execute(
+            """
+            SELECT h.handle, h.cap, h.fetched >= h.cap OR h.run_capped FROM fetch_budget_history h
+            JOIN (SELECT handle, MAX(run_at) AS run_at FROM fetch_budget_history GROUP BY handle) latest
+              ON latest.handle = h.handle AND latest.run_at = h.run_at
+            """
+        )
+        return {handle: (cap, bool(truncated)) for handle, cap, truncated in rows}
+
+    def plan(
+        self,
+        handles: Iterable[str],
+        since_ts_map: Mapping[str, Optional[str]],
+        default_cap: int,
+        max_total_limit: int,
+        max_cap: Optional[int] = None,
+        now: Optional[float] = None,
+    ) -> FetchPlan:
+        now = time.time() if now is None else now
+        default_cap = max(default_cap, 1)
+        max_cap = max(max_cap or default_cap * 3, self.min_cap)
+        rates = self.posting_rates(now)
+        history = self.last_runs()
+        since_ts_map = {normalize_handle(k): v for k, v in since_ts_map.items()}
+
+        accounts: Dict[str, AccountBudget] = {}
+        for handle in dict.fromkeys(normalize_handle(h) for h in handles if h):
+            rate = rates.get(handle)
+            last = history.get(handle)
+            latest_ts = iso_to_epoch(since_ts_map.get(handle))
+            if rate is None and last is None and latest_ts is None:
+                accounts[handle] = AccountBudget(handle, default_cap)
+                continue
+
+            gap_hours = (now - latest_ts) / 3600 if latest_ts is not None else DEFAULT_GAP_HOURS
+            expected = (rate or 0.0) * max(gap_hours, 0.0)
+            cap = math.ceil(expected * self.headroom)
+            raised = False
+            if last is not None and last[1]:
+                grown = math.ceil(last[0] * TRUNCATION_GROWTH)
+                if grown > cap:
+                    cap, raised = grown, True
+            cap = max(self.min_cap, min(cap, max_cap))
+            accounts[handle] = AccountBudget(handle, cap, expected, raised)
+
+        total = sum(b.cap for b in accounts.values())
+        if total > max_total_limit:
+            scale = max_total_limit / total
+            for budget in accounts.values():
+                budget.cap = max(self.min_cap, int(budget.cap * scale))
+        return FetchPlan(accounts, default_cap, max_cap, max_total_limit)
+
+    def record(
+        self,
+        plan: FetchPlan,
+        fetched: Mapping[str, int],
+        capped: Iterable[str] = (),
+        now: Optional[float] = None,
+    ) -> List[str]:
+        """
+        Store each account's cap and the new posts found for it; `capped` are the
+        accounts whose actor run stopped at `maxItems`. Accounts missing from `fetched`
+        (for example from a failed shard) are not recorded. Returns the accounts that
+        will get a bigger cap next run.
+        """
+        run_at = int(time.time() if now is None else now)
+        capped = set(capped)
+        rows = []
+        for handle, count in fetched.items():
+            budget = plan.accounts.get(handle)
+            expected = budget.expected if budget else None
+            rows.append((handle, run_at, plan.cap(handle), count, expected, int(handle in capped)))
+        self.conn.executemany(
+            """
+            INSERT OR REPLACE INTO fetch_budget_history(handle, run_at, cap, fetched, expected, run_capped)
+            VALUES(?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+        self.conn.execute(
+            "DELETE FROM fetch_budget_history WHERE run_at < ?",
+            (run_at - HISTORY_RETENTION_DAYS * 86400,),
+        )
+        return [handle for handle, _, cap, count, _, run_capped in rows if count >= cap or run_capped]
+
+
+@dataclass
+class FetchRun:
+    accounts: int
+    max_items: int
+    items_returned: int
+    new_posts: int
+    overlap_seconds: Optional[int] = None
+
+    @property
+    def overfetch_ratio(self) -> Optional[float]:
+        """Dataset items returned per new post (None when nothing new was found)."""
+        return self.items_returned / self.new_posts if self.new_posts else None
+
+    def describe(self) -> str:
+        ratio = self.overfetch_ratio
+        text = f"Overfetch: actor returned {self.items_returned} item(s) for {self.new_posts} new post(s)"
+        return text + (f" ({ratio:.2f}x)" if ratio is not None else "")
+
+
+class FetchRunRepository:
+    """
+    Per-run fetch accounting stored in `fetch_runs`, used to track the overfetch ratio
+    (items returned per new post) across runs. `record` does not commit.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def record(self, run: FetchRun, now: Optional[float] = None) -> None:
+        self.conn.execute(
+            """
+            INSERT INTO fetch_runs(run_at, accounts, max_items, items_returned, new_posts, overlap_seconds)
+            VALUES(?, ?, ?, ?, ?, ?)
+            """,
+            (
+                int(time.time() if now is None else now),
+                run.accounts,
+                run.max_items,
+                run.items_returned,
+                run.new_posts,
+                run.overlap_seconds,
+            ),
+        )
+
+    def overfetch_ratio(self, runs: int = 10) -> Optional[float]:
+        """Items returned per new post over the last `runs` runs."""
+        returned, new = self.conn.execute(
+            """
+            SELECT SUM(items_returned), SUM(new_posts) FROM (
+                SELECT items_returned, new_posts FROM fetch_runs ORDER BY run_at DESC, id DESC LIMIT ?
+            )
+            """,
+            (runs,),
+        ).fetchone()
+        return returned / new if new else None
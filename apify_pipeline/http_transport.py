@@ -0,0 +1,178 @@
+import random
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# hook(method, url_without_query, status_code_or_None, elapsed_seconds, attempt)
+LatencyHook = Callable[[str, str, Optional[int], float, int], None]
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class HostStats:
+    requests: int = 0
+    retries: int = 0
+    failures: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+
+class LatencyStats:
+    """
+    Latency hook that tallies attempts per host for the end-of-run summary. Retries
+    count as requests too; a failure is a connection error or a status of 400 or more.
+    """
+
+    def __init__(self):
+        self.hosts: Dict[str, HostStats] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, method: str, url: str, status: Optional[int], elapsed: float, attempt: int) -> None:
+        host = urllib.parse.urlsplit(url).netloc or url
+        with self._lock:
+            stats = self.hosts.setdefault(host, HostStats())
+            stats.requests += 1
+            stats.retries += attempt > 0
+            stats.failures += status is None or status >= 400
+            stats.total_seconds += elapsed
+            stats.max_seconds = max(stats.max_seconds, elapsed)
+
+    def describe(self) -> List[str]:
+        with self._lock:
+            hosts = sorted(self.hosts.items())
+        return [
+            f"HTTP {host}: {stats.requests} request(s), avg {stats.total_seconds / stats.requests * 1000:.0f} ms, "
+            f"max {stats.max_seconds * 1000:.0f} ms, {stats.retries} retried, {stats.failures} failed"
+            for host, stats in hosts
+        ]
+
+
+class HttpTransport:
+    """
+    Shared HTTP transport for the Apify and Feishu clients.
+
+    Wraps one `requests.Session` with keep-alive connection pools (sized per host),
+    gzip-compressed responses, and retries with exponential backoff on 429/5xx and
+    connection errors, honoring `Retry-After`. A 429 is always retried because the server
+    did not process the request. 5xx responses and connection errors are retried only for
+    idempotent methods, unless the caller passes `retry_unsafe=True`. Latency hooks are
+    called once per attempt. The URL they receive has its query string stripped, so
+    tokens are not leaked.
+
+    Exposes `request`/`get`/`post`/`patch` with the same signatures as `requests.Session`,
+    so it can be passed wherever a session is expected.
+    """
+
+    def __init__(
+        self,
+        pool_sizes: Optional[Dict[str, int]] = None,
+        default_pool_size: int = 10,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 30.0,
+        max_retry_after: float = 120.0,
+        default_timeout: float = 30.0,
+    ):
+        self.max_retries = max(max_retries, 0)
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.default_timeout = default_timeout
+        self._hooks: List[LatencyHook] = []
+        self._hooks_lock = threading.Lock()
+
+        self.session = requests.Session()
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+        default_adapter = HTTPAdapter(pool_connections=default_pool_size, pool_maxsize=default_pool_size)
+        self.session.mount("https://", default_adapter)
+        self.session.mount("http://", default_adapter)
+        for host, size in (pool_sizes or {}).items():
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(size, 1))
+            self.session.mount(f"https://{host}", adapter)
+            self.session.mount(f"http://{host}", adapter)
+
+    def add_latency_hook(self, hook: LatencyHook) -> None:
+        with self._hooks_lock:
+            self._hooks.append(hook)
+
+    def request(self, method: str, url: str, retry_unsafe: bool = False, **kwargs) -> requests.Response:
+        method = method.upper()
+        kwargs.setdefault("timeout", self.default_timeout)
+        can_retry_errors = retry_unsafe or method in IDEMPOTENT_METHODS
+
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._emit(method, url, None, time.perf_counter() - started, attempt)
+                if not can_retry_errors or attempt == self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+
+            self._emit(method, url, response.status_code, time.perf_counter() - started, attempt)
+            retryable = response.status_code == 429 or (
+                response.status_code in RETRY_STATUSES and can_retry_errors
+            )
+            if not retryable or attempt == self.max_retries:
+                return response
+
+            delay = self._retry_after(response)
+            if delay is None:
+                delay = self._backoff(attempt)
+            response.close()
+            time.sleep(delay)
+
+        raise RuntimeError("unreachable")  # pragma: no cover
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PATCH", url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _backoff(self, attempt: int) -> float:
+        cap = min(self.max_backoff, self.backoff_factor * (2 ** attempt))
+        return random.uniform(cap / 2, cap)
+
+    def _retry_after(self, response: requests.Response) -> Optional[float]:
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                when = parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                return None
+            if not when.tzinfo:
+                when = when.replace(tzinfo=timezone.utc)
+            seconds = (when - datetime.now(timezone.utc)).total_seconds()
+        return min(max(seconds, 0.0), self.max_retry_after)
+
+    def _emit(self, method: str, url: str, status: Optional[int], elapsed: float, attempt: int) -> None:
+        with self._hooks_lock:
+            hooks = list(self._hooks)
+        bare_url = url.split("?", 1)[0]
+        for hook in hooks:
+            try:
+                hook(method, bare_url, status, elapsed, attempt)
+            except Exception as exc:
+                print(f"Warning: HTTP latency hook failed: {exc}")
@@ -0,0 +1,273 @@
+import hashlib
+import importlib.util
+import math
+import re
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+STOPWORDS_DIR = Path(__file__).parent / "stopwords"
+DEFAULT_STOPWORD_FILES = ("en.txt", "social.txt", "zh.txt")
+
+URL_RE = re.compile(r"https?://\S+|www\.\S+")
+MENTION_RE = re.compile(r"@\w+")
+# Latin words (with $cashtags, #hashtags and inner apostrophes/hyphens) or CJK runs
+TOKEN_RE = re.compile(
+    r"[$#]?[a-z0-9_]+(?:['\-][a-z0-9_]+)*"
+    r"|[぀-ヿ㐀-䶿一-鿿가-힯]+"
+)
+CJK_START = "぀"
+# Punctuation between two words that ends an n-gram run
+BREAK_RE = re.compile(r"[.!?,;:()\[\]\n。！？，；：、]")
+
+# A CJK bigram scoring at least this share of an overlapping chosen phrase extends it
+CJK_MERGE_RATIO = 0.8
+
+HAS_SCIPY = importlib.util.find_spec("numpy") is not None and importlib.util.find_spec("scipy") is not None
+
+
+def load_stopwords(paths: Iterable[Path]) -> Set[str]:
+    """Read stopword files: one term per line, `#` starts a comment line."""
+    words: Set[str] = set()
+    for path in paths:
+        for line in Path(path).read_text(encoding="utf-8").splitlines():
+            line = line.strip().lower()
+            if line and not line.startswith("#"):
+                words.add(line)
+    return words
+
+
+class KeywordEngine:
+    """
+    Multilingual tokenizer and TF-IDF keyword scorer.
+
+    Latin text yields lowercased words (length >= 2, not purely numeric) plus word
+    n-grams of adjacent non-stopwords; `$cashtags` and `#hashtags` keep their prefix.
+    CJK runs, which have no spaces, yield character bigrams. Stopwords of one CJK
+    character knock out every bigram containing it.
+    """
+
+    def __init__(
+        self,
+        stopwords: Optional[Set[str]] = None,
+        extra_stopword_files: Sequence[Path] = (),
+        max_ngram: int = 2,
+    ):
+        if stopwords is None:
+            stopwords = load_stopwords(STOPWORDS_DIR / name for name in DEFAULT_STOPWORD_FILES)
+        self.stopwords = stopwords | load_stopwords(extra_stopword_files)
+        self.stop_chars = {word for word in self.stopwords if len(word) == 1 and word >= CJK_START}
+        self.max_ngram = max(1, max_ngram)
+        self.signature = hashlib.sha256(
+            "\n".join([str(self.max_ngram)] + sorted(self.stopwords)).encode("utf-8")
+        ).hexdigest()[:16]
+
+    def tokenize(self, text: str, ngrams: bool = True) -> List[str]:
+        text = MENTION_RE.sub(" ", URL_RE.sub(" ", (text or "").lower()))
+        terms: List[str] = []
+        run: List[str] = []  # adjacent Latin words for n-grams
+        last_end = 0
+        for match in TOKEN_RE.finditer(text):
+            token = match.group()
+            if BREAK_RE.search(text, last_end, match.start()):
+                self._flush_ngrams(run, terms, ngrams)
+                run = []
+            last_end = match.end()
+            if token[0] >= CJK_START:
+                self._flush_ngrams(run, terms, ngrams)
+                run = []
+                terms.extend(self._cjk_terms(token))
+                continue
+            if len(token) < 2 or token in self.stopwords or token.isdigit():
+                self._flush_ngrams(run, terms, ngrams)
+                run = []
+                continue
+            terms.append(token)
+            run.append(token)
+        self._flush_ngrams(run, terms, ngrams)
+        return terms
+
+    def _flush_ngrams(self, run: List[str], terms: List[str], ngrams: bool) -> None:
+        if not ngrams:
+            return
+        for size in range(2, self.max_ngram + 1):
+            terms.extend(" ".join(run[i : i + size]) for i in range(len(run) - size + 1))
+
+    def _cjk_terms(self, run: str) -> List[str]:
+        if len(run) == 1:
+            return [] if run in self.stopwords else [run]
+        stop_chars = self.stop_chars
+        return [
+            gram
+            for gram in (run[i : i + 2] for i in range(len(run) - 1))
+            if gram not in self.stopwords and gram[0] not in stop_chars and gram[1] not in stop_chars
+        ]
+
+    def count_matrix(self, texts: Iterable[str]):
+        """
+        Document-term counts as `(matrix, vocabulary)`. The matrix is a scipy CSR matrix
+        when scipy is installed, otherwise a list of per-document Counters keyed by
+        term index.
+        """
+        vocabulary: Dict[str, int] = {}
+        if not HAS_SCIPY:
+            rows = []
+            for text in texts:
+                rows.append(Counter(vocabulary.setdefault(term, len(vocabulary)) for term in self.tokenize(text)))
+            return rows, vocabulary
+
+        import numpy as np
+        from scipy.sparse import csr_matrix
+
+        indices = array("i")
+        indptr = array("q", [0])
+        for text in texts:
+            indices.extend(vocabulary.setdefault(term, len(vocabulary)) for term in self.tokenize(text))
+            indptr.append(len(indices))
+        indices_np = np.frombuffer(indices, dtype=np.int32) if indices else np.zeros(0, dtype=np.int32)
+        matrix = csr_matrix(
+            (np.ones(len(indices_np), dtype=np.int32), indices_np, np.frombuffer(indptr, dtype=np.int64)),
+            shape=(len(indptr) - 1, len(vocabulary)),
+        )
+        matrix.sum_duplicates()
+        return matrix, vocabulary
+
+    def document_frequencies(self, texts: Iterable[str]) -> Counter:
+        """Number of `texts` each term occurs in."""
+        df: Counter = Counter()
+        for text in texts:
+            df.update(set(self.tokenize(text)))
+        return df
+
+    def distinctive_terms(
+        self,
+        texts: Sequence[str],
+        background: Sequence[str] = (),
+        top_n: int = 12,
+        background_df: Optional[Tuple[int, Dict[str, int]]] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Terms that characterize `texts` compared with the `background` corpus.
+
+        Score = (1 + ln tf) * idf. tf is the term's count in `texts`. idf is the smoothed
+        inverse document frequency in `background`, or in `texts` when there is no
+        background. `background_df` is `(documents, {term: df})` for a background that was
+        already counted (see `document_frequencies`) and replaces `background`. With 20 or
+        more texts, a term must occur in at least two of them. An n-gram replaces the
+        unigrams it contains, and overlapping CJK bigrams with close scores are merged
+        back into the longer word.
+        """
+        if not texts:
+            return []
+        if background_df is not None:
+            n_bg, frequencies = background_df
+            matrix, vocabulary = self.count_matrix(texts)
+        else:
+            n_bg = len(background)
+            matrix, vocabulary = self.count_matrix(list(texts) + list(background))
+        terms = [""] * len(vocabulary)
+        for term, idx in vocabulary.items():
+            terms[idx] = term
+        bg_df = [frequencies.get(term, 0) for term in terms] if background_df is not None and n_bg else None
+        n_fg = len(texts)
+        min_df = 2 if n_fg >= 20 else 1
+        # Extra candidates make up for unigrams skipped as covered by an n-gram
+        candidates = max(top_n * 5, 50)
+        if HAS_SCIPY:
+            ranked = self._rank_sparse(matrix, terms, n_fg, n_bg, min_df, candidates, bg_df)
+        else:
+            ranked = self._rank_counters(matrix, terms, n_fg, n_bg, min_df, bg_df)
+
+        chosen: Dict[str, float] = {}
+        for score, term in ranked:
+            if term[0] >= CJK_START and self._extend_cjk(chosen, term, score):
+                continue
+            if " " in term:
+                for word in term.split(" "):
+                    chosen.pop(word, None)
+            elif any(term in phrase.split(" ") for phrase in chosen):
+                continue
+            chosen[term] = score
+            if len(chosen) >= top_n:
+                break
+        return [(term, round(score, 4)) for term, score in chosen.items()]
+
+    @staticmethod
+    def _extend_cjk(chosen: Dict[str, float], gram: str, score: float) -> bool:
+        """
+        Glue a CJK bigram onto a chosen phrase it overlaps by one character (人工 + 工智
+        -> 人工智) when the scores are close, i.e. the two most likely come from the same
+        longer word. Returns whether the bigram was merged.
+        """
+        for phrase, phrase_score in chosen.items():
+            if phrase[0] < CJK_START or score < phrase_score * CJK_MERGE_RATIO:
+                continue
+            if phrase[-1] == gram[0]:
+                merged = phrase + gram[1:]
+            elif phrase[0] == gram[-1]:
+                merged = gram[:-1] + phrase
+            else:
+                continue
+            # Rebuild to keep the merged phrase at the original phrase's rank
+            items = [(merged if key == phrase else key, value) for key, value in chosen.items()]
+            chosen.clear()
+            chosen.update(items)
+            return True
+        return False
+
+    @staticmethod
+    def _rank_sparse(
+        matrix, terms: List[str], n_fg: int, n_bg: int, min_df: int, candidates: int, bg_df: Optional[List[int]] = None
+    ):
+        import numpy as np
+
+        foreground = matrix[:n_fg]
+        tf = np.asarray(foreground.sum(axis=0)).ravel()
+        fg_df = np.bincount(foreground.indices, minlength=matrix.shape[1])
+        if bg_df is not None:
+            idf_df = np.asarray(bg_df, dtype=np.int64)
+        else:
+            idf_df = np.bincount(matrix[n_fg:].indices, minlength=matrix.shape[1]) if n_bg else fg_df
+        idf = np.log((1 + (n_bg or n_fg)) / (1 + idf_df)) + 1
+        scores = np.where((tf > 0) & (fg_df >= min_df), (1 + np.log(np.maximum(tf, 1))) * idf, 0.0)
+        eligible = np.flatnonzero(scores)
+        if len(eligible) > candidates:
+            # Keep every term tied with the cutoff score so ties still break by term
+            cutoff = np.partition(scores[eligible], -candidates)[-candidates]
+            eligible = eligible[scores[eligible] >= cutoff]
+        return sorted(((float(scores[idx]), terms[idx]) for idx in eligible), key=lambda item: (-item[0], item[1]))
+
+    @staticmethod
+    def _rank_counters(
+        rows: List[Counter], terms: List[str], n_fg: int, n_bg: int, min_df: int, bg_df: Optional[List[int]] = None
+    ):
+        tf = [0] * len(terms)
+        fg_df = [0] * len(terms)
+        if bg_df is None:
+            bg_df = [0] * len(terms)
+        for doc, counts in enumerate(rows):
+            for idx, count in counts.items():
+                if doc < n_fg:
+                    tf[idx] += count
+                    fg_df[idx] += 1
+                else:
+                    bg_df[idx] += 1
+        idf_df = bg_df if n_bg else fg_df
+        n_idf = n_bg or n_fg
+        scored = [
+            ((1 + math.log(tf[idx])) * (math.log((1 + n_idf) / (1 + idf_df[idx])) + 1), terms[idx])
+            for idx in range(len(terms))
+            if tf[idx] and fg_df[idx] >= min_df
+        ]
+        return sorted(scored, key=lambda item: (-item[0], item[1]))
+
+
+_default_engine: Optional[KeywordEngine] = None
+
+
+def default_engine() -> KeywordEngine:
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = KeywordEngine()
+    return _default_engine
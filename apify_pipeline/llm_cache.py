@@ -0,0 +1,98 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+class LLMCache:
+    """
+    Content-addressed cache of LLM responses in the `llm_cache` table.
+
+    Keys are a SHA-256 of the model, messages and request parameters. Entries older than
+    `ttl_seconds` are ignored and evicted. Once the table holds more than `max_entries`,
+    the least recently used rows are dropped. An entry can also carry a `scope` (for
+    example the week and category), so a rerun in the same window can reuse a completed
+    summary even if a few new posts changed the prompt.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, ttl_seconds: float = 7 * 86400, max_entries: int = 2000):
+        self.conn = conn
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, messages: List[Dict], params: Optional[Dict] = None) -> str:
+        payload = json.dumps(
+            {"model": model, "messages": messages, "params": params or {}},
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def lookup(self, key: str, model: str, scope: Optional[str] = None) -> Optional[str]:
+        """Return the cached response for `key`, else the newest one for `scope`, else None."""
+        with self._lock:
+            cutoff = time.time() - self.ttl_seconds
+            row = self.conn.execute(
+                "SELECT key, response FROM llm_cache WHERE key = ? AND created_at >= ?",
+                (key, cutoff),
+            ).fetchone()
+            if row is None and scope:
+                row = self.conn.execute(
+                    """
+                    SELECT key, response FROM llm_cache
+                    WHERE scope = ? AND model = ? AND created_at >= ?
+                    ORDER BY created_at DESC
+                    LIMIT 1
+                    """,
+                    (scope, model, cutoff),
+                ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute(
+                "UPDATE llm_cache SET last_used_at = ?, hit_count = hit_count + 1 WHERE key = ?",
+                (time.time(), row[0]),
+            )
+            self.conn.commit()
+            return row[1]
+
+    def put(self, key: str, model: str, response: str, scope: Optional[str] = None) -> None:
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                """
+                INSERT INTO llm_cache(key, model, scope, response, created_at, last_used_at)
+                VALUES(?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    scope = COALESCE(excluded.scope, llm_cache.scope),
+                    response = excluded.response,
+                    created_at = excluded.created_at,
+                    last_used_at = excluded.last_used_at
+                """,
+                (key, model, scope, response, now, now),
+            )
+            self._evict(now)
+            self.conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def _evict(self, now: float) -> None:
+        self.conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        if self.max_entries and self.max_entries > 0:
+            self.conn.execute(
+                """
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
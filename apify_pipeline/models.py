@@ -0,0 +1,176 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Mapping, Optional, Sequence, Union
+
+from apify_pipeline.snowflake import id_key
+
+
+def normalize_handle(handle: Optional[str]) -> str:
+    return (handle or "").lower().lstrip("@").strip()
+
+
+def iso_to_epoch(value: Optional[str]) -> Optional[int]:
+    """Epoch seconds of an ISO-8601 timestamp (naive means UTC), or None if it cannot be parsed."""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+class Post:
+    """
+    One crawled or stored post.
+
+    `created_ts` is the UTC epoch of `created_at`, parsed once when the post is built,
+    so sorting and window checks never re-parse the ISO string. `author` is the
+    normalized handle (lowercase, no `@`). `category` is set by the SQL loaders.
+    `thread_ids` and `duplicate_ids` are filled when self-threads or near-duplicate
+    clusters are collapsed into this post.
+
+    Instances are slotted to keep 100k-post windows small. For code written against
+    the old dict posts, `post["text"]`, `post.get("url")`, `"media" in post` and
+    `to_dict()` / `Post.from_dict()` still work.
+    """
+
+    __slots__ = (
+        "id",
+        "author",
+        "created_at",
+        "created_ts",
+        "text",
+        "url",
+        "media",
+        "conversation_id",
+        "in_reply_to_id",
+        "in_reply_to_user",
+        "is_reply",
+        "is_summarized",
+        "category",
+        "thread_ids",
+        "duplicate_ids",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        author: str,
+        created_at: str = "",
+        created_ts: Optional[int] = None,
+        text: str = "",
+        url: str = "",
+        media: Sequence[Dict] = (),
+        conversation_id: Optional[str] = None,
+        in_reply_to_id: Optional[str] = None,
+        in_reply_to_user: Optional[str] = None,
+        is_reply: bool = False,
+        is_summarized: bool = False,
+        category: Optional[str] = None,
+        thread_ids: Sequence[str] = (),
+        duplicate_ids: Sequence[str] = (),
+    ):
+        self.id = id
+        self.author = author
+        self.created_at = created_at
+        self.created_ts = created_ts
+        self.text = text
+        self.url = url
+        # Empty sequences share one tuple instead of allocating a list per post
+        self.media = media
+        self.conversation_id = conversation_id
+        self.in_reply_to_id = in_reply_to_id
+        self.in_reply_to_user = in_reply_to_user
+        self.is_reply = is_reply
+        self.is_summarized = is_summarized
+        self.category = category
+        self.thread_ids = thread_ids
+        self.duplicate_ids = duplicate_ids
+
+    @property
+    def duplicate_count(self) -> int:
+        return len(self.duplicate_ids)
+
+    @property
+    def sort_key(self):
+        """Chronological ordering key `(created_ts, numeric id)`, undated posts first."""
+        return (self.created_ts if self.created_ts is not None else -1, id_key(self.id))
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "Post":
+        created_at = data.get("created_at") or ""
+        created_ts = data.get("created_ts")
+        return cls(
+            id=str(data.get("id")),
+            author=normalize_handle(data.get("author")),
+            created_at=created_at,
+            created_ts=iso_to_epoch(created_at) if created_ts is None else int(created_ts),
+            text=data.get("text") or "",
+            url=data.get("url") or "",
+            media=data.get("media") or (),
+            conversation_id=data.get("conversation_id"),
+            in_reply_to_id=data.get("in_reply_to_id"),
+            in_reply_to_user=data.get("in_reply_to_user"),
+            is_reply=bool(data.get("is_reply")),
+            is_summarized=bool(data.get("is_summarized")),
+            category=data.get("category"),
+            thread_ids=data.get("thread_ids") or (),
+            duplicate_ids=data.get("duplicate_ids") or (),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {name: getattr(self, name) for name in self.__slots__}
+        data["media"] = list(self.media)
+        data["thread_ids"] = list(self.thread_ids)
+        data["duplicate_ids"] = list(self.duplicate_ids)
+        data["duplicate_count"] = self.duplicate_count
+        return data
+
+    def replace(self, **changes: Any) -> "Post":
+        """Copy with some fields changed (like `dataclasses.replace`)."""
+        copy = Post.__new__(Post)
+        for name in self.__slots__:
+            setattr(copy, name, changes.pop(name) if name in changes else getattr(self, name))
+        if changes:
+            raise TypeError(f"Unknown Post fields: {', '.join(changes)}")
+        return copy
+
+    # Read-only mapping adapter for callers that still treat posts as dicts
+    def __getitem__(self, key: str) -> Any:
+        if key in _KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in _KEYS:
+            value = getattr(self, key)
+            return default if value is None else value
+        return default
+
+    def __contains__(self, key: object) -> bool:
+        return key in _KEYS
+
+    def keys(self) -> Iterator[str]:
+        return iter(self.__slots__ + ("duplicate_count",))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Post):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None  # mutable
+
+    def __repr__(self) -> str:
+        return f"Post(id={self.id!r}, author={self.author!r}, created_at={self.created_at!r})"
+
+
+_KEYS = frozenset(Post.__slots__) | {"duplicate_count"}
+
+PostLike = Union[Post, Mapping[str, Any]]
+
+
+def as_post(post: PostLike) -> Post:
+    """`post` itself if it already is a Post, otherwise a Post built from a legacy dict."""
+    return post if isinstance(post, Post) else Post.from_dict(post)
@@ -0,0 +1,246 @@
+import hashlib
+import re
+import sqlite3
+import sys
+from array import array
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+SIMHASH_BITS = 64
+# Six 10-bit bands (the top 4 bits are unused): two signatures within Hamming distance 5
+# share at least one band exactly (pigeonhole), so a band lookup finds every candidate
+# at that distance. A one-word edit of a tweet typically moves its SimHash by 2-6 bits.
+BAND_COUNT = 6
+BAND_BITS = SIMHASH_BITS // BAND_COUNT
+MAX_DISTANCE = BAND_COUNT - 1
+
+DEFAULT_DISTANCE = MAX_DISTANCE
+# Only posts this close in time are compared. Reposts of a story cluster within hours;
+# a post chained to a near-duplicate a few days later still joins its cluster.
+DEFAULT_WINDOW_SECONDS = 3 * 86400
+# Texts with fewer features (about six words) are too short to fingerprint reliably:
+# one changed word in "gm frens" or a templated one-liner moves most of the signature
+MIN_FEATURES = 12
+# Representatives kept per LSH bucket, newest first. Templated posts that are not
+# near-duplicates of each other (distance > MAX_DISTANCE) still share most bands, so an
+# uncapped bucket grows with the window and every post would be compared with all of it.
+# A real near-duplicate shares several bands with its cluster, so a cluster pushed out of
+# one bucket is usually still found through another.
+MAX_BUCKET_CANDIDATES = 8
+# Band keys per lookup query (5 bound values each, under the 999-variable limit)
+LOOKUP_CHUNK_SIZE = 150
+
+URL_RE = re.compile(r"https?://\S+")
+RT_PREFIX_RE = re.compile(r"^rt @\w+:?\s*")
+WORD_RE = re.compile(r"[$#]?[a-z0-9_]+")
+CJK_RUN_RE = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]+")
+
+# Lane trick for fast pure-Python SimHash: every bit of a 64-bit hash gets its own
+# 16-bit little-endian lane in one big integer, so a feature's contribution to all 64
+# counters is a single multiply-add, and the counters are read back with one to_bytes().
+# _BYTE_LANES[b] holds the 8 lanes of byte value b.
+_LANE_BYTES = 2
+_BYTE_LANES = [bytes(v for i in range(8) for v in ((b >> i) & 1, 0)) for b in range(256)]
+
+
+@dataclass
+class Fingerprint:
+    post_id: str
+    simhash: int
+    created_ts: int
+    cluster_id: str
+
+
+def features(text: str) -> Dict[str, int]:
+    """Normalized word unigrams/bigrams plus CJK character bigrams, with counts."""
+    lowered = RT_PREFIX_RE.sub("", URL_RE.sub(" ", (text or "").lower()))
+    feats: Dict[str, int] = {}
+    words = WORD_RE.findall(lowered)
+    for word in words:
+        feats[word] = feats.get(word, 0) + 1
+    for first, second in zip(words, words[1:]):
+        key = f"{first} {second}"
+        feats[key] = feats.get(key, 0) + 1
+    for run in CJK_RUN_RE.findall(lowered):
+        grams = [run] if len(run) == 1 else [run[i : i + 2] for i in range(len(run) - 1)]
+        for gram in grams:
+            feats[gram] = feats.get(gram, 0) + 1
+    return feats
+
+
+@lru_cache(maxsize=1 << 18)
+def _feature_lanes(feature: str) -> int:
+    """The feature's 64-bit hash with each bit spread into its own lane."""
+    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(b"".join(map(_BYTE_LANES.__getitem__, digest)), "little")
+
+
+def simhash(text: str) -> Optional[int]:
+    """64-bit SimHash of `text`, or None when it has too few features to be meaningful."""
+    feats = features(text)
+    if len(feats) < MIN_FEATURES:
+        return None
+    total = sum(feats.values())
+    lanes = sum(_feature_lanes(feature) * weight for feature, weight in feats.items())
+    counts = array("H", lanes.to_bytes(SIMHASH_BITS * _LANE_BYTES, "little"))
+    if sys.byteorder == "big":
+        counts.byteswap()
+    # Bit set when more than half of the weight had it set
+    bits = "".join("1" if count * 2 > total else "0" for count in reversed(counts))
+    return int(bits, 2)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def bands(signature: int) -> List[Tuple[int, int]]:
+    mask = (1 << BAND_BITS) - 1
+    return [(band, (signature >> (band * BAND_BITS)) & mask) for band in range(BAND_COUNT)]
+
+
+def to_signed(value: int) -> int:
+    """SQLite INTEGER is signed 64-bit."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+def fingerprint_posts(
+    conn: sqlite3.Connection,
+    posts: Iterable[Tuple[str, Optional[str], Optional[int]]],
+    max_distance: int = DEFAULT_DISTANCE,
+    window_seconds: int = DEFAULT_WINDOW_SECONDS,
+) -> List[Fingerprint]:
+    """
+    Fingerprint `(post_id, text, created_ts)` rows and assign near-duplicate clusters.
+
+    Only the post that starts a cluster (its representative) is added to the band
+    index, so a post is compared with one signature per cluster rather than with every
+    member; on templated text a cluster can have thousands of members in the window.
+    Representatives sharing an LSH band with the batch are fetched in a few queries,
+    then each post joins the cluster of the closest representative (stored or in this
+    batch) within `max_distance` bits and `window_seconds`, or starts its own cluster.
+    Writes are not committed. Posts too short to fingerprint are recorded as their own
+    cluster.
+    """
+    max_distance = max(0, min(max_distance, MAX_DISTANCE))
+    signed = [(post_id, simhash(text or ""), created_ts or 0) for post_id, text, created_ts in posts]
+    if not signed:
+        return []
+
+    index = _stored_band_index(
+        conn,
+        {key for _, signature, _ in signed if signature is not None for key in bands(signature)},
+        min(row[2] for row in signed) - window_seconds,
+        max(row[2] for row in signed) + window_seconds,
+    )
+    fingerprints: List[Fingerprint] = []
+    fingerprint_rows = []
+    band_rows = []
+    for post_id, signature, created_ts in signed:
+        if signature is None:
+            fingerprint_rows.append((post_id, None, created_ts, post_id))
+            continue
+
+        post_bands = bands(signature)
+        best: Optional[Tuple[int, str]] = None
+        # A representative sharing several bands with the post is compared once
+        seen: Set[str] = set()
+        for key in post_bands:
+            for candidate in index.get(key, ()):
+                if candidate.post_id in seen or candidate.post_id == post_id:
+                    continue
+                seen.add(candidate.post_id)
+                if abs(candidate.created_ts - created_ts) > window_seconds:
+                    continue
+                distance = hamming(signature, candidate.simhash)
+                if distance <= max_distance and (best is None or distance < best[0]):
+                    best = (distance, candidate.cluster_id)
+
+        fingerprint = Fingerprint(post_id, signature, created_ts, best[1] if best else post_id)
+        fingerprints.append(fingerprint)
+        fingerprint_rows.append((post_id, to_signed(signature), created_ts, fingerprint.cluster_id))
+        if best is not None:
+            continue
+        for key in post_bands:
+            bucket = index.setdefault(key, [])
+            bucket.append(fingerprint)
+            if len(bucket) > MAX_BUCKET_CANDIDATES:
+                del bucket[0]
+            band_rows.append((key[0], key[1], created_ts, post_id))
+
+    conn.executemany(
+        """
+        INSERT OR REPLACE INTO post_fingerprints(post_id, simhash, created_ts, cluster_id)
+        VALUES(?, ?, ?, ?)
+        """,
+        fingerprint_rows,
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO post_simhash_bands(band, bucket, created_ts, post_id) VALUES(?, ?, ?, ?)",
+        band_rows,
+    )
+    return fingerprints
+
+
+def _stored_band_index(
+    conn: sqlite3.Connection, keys: Set[Tuple[int, int]], start_ts: int, end_ts: int
+) -> Dict[Tuple[int, int], List[Fingerprint]]:
+    """
+    Stored fingerprints created in [start_ts, end_ts] that share one of the band `keys`.
+    Since only representatives are banded, that is one per cluster (band rows written
+    before that are still read until they age out of the window). Each bucket keeps its
+    newest `MAX_BUCKET_CANDIDATES`, oldest first.
+    """
+    index: Dict[Tuple[int, int], List[Fingerprint]] = {}
+    ordered = sorted(keys)
+    # One LIMITed range scan of the primary key per bucket, so a lookup reads at most
+    # MAX_BUCKET_CANDIDATES rows per key however many posts the window holds
+    arm = """
+        SELECT * FROM (
+            SELECT band, bucket, post_id FROM post_simhash_bands
+            WHERE band = ? AND bucket = ? AND created_ts BETWEEN ? AND ?
+            ORDER BY created_ts DESC LIMIT ?
+        )
+    """
+    for start in range(0, len(ordered), LOOKUP_CHUNK_SIZE):
+        chunk = ordered[start : start + LOOKUP_CHUNK_SIZE]
+        rows = conn.execute(
+            f"""
+            SELECT b.band, b.bucket, f.post_id, f.simhash, f.created_ts, f.cluster_id
+            FROM ({" UNION ALL ".join([arm] * len(chunk))}) b
+            JOIN post_fingerprints f ON f.post_id = b.post_id
+            ORDER BY f.created_ts, f.post_id
+            """,
+            [value for band, bucket in chunk for value in (band, bucket, start_ts, end_ts, MAX_BUCKET_CANDIDATES)],
+        )
+        for band, bucket, post_id, signature, created_ts, cluster_id in rows:
+            index.setdefault((band, bucket), []).append(
+                Fingerprint(post_id, to_unsigned(signature), created_ts, cluster_id)
+            )
+    return index
+
+
+def backfill_fingerprints(
+    conn: sqlite3.Connection,
+    since_ts: int,
+    max_distance: int = DEFAULT_DISTANCE,
+    window_seconds: int = DEFAULT_WINDOW_SECONDS,
+) -> int:
+    """Fingerprint posts created at or after `since_ts` that predate fingerprinting. Returns the count."""
+    rows = conn.execute(
+        """
+        SELECT p.id, p.text, p.created_ts FROM posts p
+        LEFT JOIN post_fingerprints f ON f.post_id = p.id
+        WHERE p.created_ts >= ? AND f.post_id IS NULL
+        ORDER BY p.created_ts, p.id
+        """,
+        (since_ts,),
+    ).fetchall()
+    if rows:
+        fingerprint_posts(conn, rows, max_distance=max_distance, window_seconds=window_seconds)
+    return len(rows)
@@ -1,78 +1,32 @@
 import argparse
+import asyncio
 import json
 import os
 import sqlite3
 import sys
-from collections import defaultdict
 from datetime import datetime, timedelta, timezone
+from itertools import groupby
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Set, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 ROOT = Path(__file__).resolve().parent.parent
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from apify_pipeline.analyzer import build_report, parse_timestamp, summarize_posts, summarize_posts_weekly
-from apify_pipeline.apify_client import ApifyTweetScraperClient
-from apify_pipeline.feishu_client import send_report_to_feishu
-
-
-def init_db(db_path: Path) -> sqlite3.Connection:
-    db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(db_path)
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS posts (
-            id TEXT PRIMARY KEY,
-            author TEXT,
-            created_at TEXT,
-            text TEXT,
-            url TEXT
-        )
-        """
-    )
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS since_ids (
-            account TEXT PRIMARY KEY,
-            since_id TEXT
-        )
-        """
-    )
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS latest_timestamps (
-            account TEXT PRIMARY KEY,
-            latest_timestamp TEXT
-        )
-        """
-    )
-    apply_sql_migrations(conn, Path(__file__).parent / "sql")
-    conn.commit()
-    return conn
-
-
-def apply_sql_migrations(conn: sqlite3.Connection, migrations_dir: Path) -> None:
-    migrations_dir.mkdir(parents=True, exist_ok=True)
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS schema_migrations (
-            name TEXT PRIMARY KEY,
-            applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
-        )
-        """
-    )
-    conn.commit()
-
-    applied = {row[0] for row in conn.execute("SELECT name FROM schema_migrations")}
-    for path in sorted(migrations_dir.glob("*.sql")):
-        name = path.name
-        if name in applied:
-            continue
-        sql = path.read_text(encoding="utf-8")
-        conn.executescript(sql)
-        conn.execute("INSERT INTO schema_migrations(name) VALUES (?)", (name,))
-    conn.commit()
+from apify_pipeline.analyzer import parse_timestamp
+from apify_pipeline.apify_client import DEFAULT_SEARCH_OVERLAP_SECONDS
+from apify_pipeline.crawl_state import CrawlStateRepository
+from apify_pipeline.models import Post
+from apify_pipeline.storage import (
+    IngestResult,
+    ingest_posts,
+    init_db,
+)
+from apify_pipeline.keywords import KeywordEngine
+from apify_pipeline.rollups import background_document_frequencies
+from apify_pipeline.search import search_posts
+from apify_pipeline.snowflake import IdLike
+from apify_pipeline.threads import collapse_threads
 
 
 def read_accounts(config_path: Path) -> Tuple[List[str], Dict[str, str]]:
@@ -174,12 +128,12 @@ def read_accounts(config_path: Path) -> Tuple[List[str], Dict[str, str]]:
     return accounts, category_map
 
 
-def get_since_id(conn: sqlite3.Connection, account: str) -> Optional[str]:
+def get_since_id(conn: sqlite3.Connection, account: str) -> Optional[int]:
     since_id, _ = get_since_state(conn, account)
     return since_id
 
 
-def set_since_id(conn: sqlite3.Connection, account: str, since_id: str, latest_timestamp: Optional[str] = None) -> None:
+def set_since_id(conn: sqlite3.Connection, account: str, since_id: IdLike, latest_timestamp: Optional[str] = None) -> None:
     set_since_state(conn, account, since_id=since_id, latest_timestamp=latest_timestamp)
 
 
@@ -192,124 +146,25 @@ def set_latest_timestamp(conn: sqlite3.Connection, account: str, latest_timestam
     set_since_state(conn, account, latest_timestamp=latest_timestamp)
 
 
-def get_since_state(conn: sqlite3.Connection, account: str) -> Tuple[Optional[str], Optional[str]]:
-    normalized = account.lower()
-    cur = conn.execute("SELECT since_id, latest_timestamp FROM accounts WHERE handle = ?", (normalized,))
-    account_row = cur.fetchone()
-    if account_row:
-        acc_since_id, acc_latest_ts = account_row
-    else:
-        acc_since_id, acc_latest_ts = None, None
-
-    cur = conn.execute("SELECT since_id FROM since_ids WHERE account = ?", (account,))
-    since_row = cur.fetchone()
-    cur = conn.execute("SELECT latest_timestamp FROM latest_timestamps WHERE account = ?", (account,))
-    ts_row = cur.fetchone()
-    since_id = since_row[0] if since_row else acc_since_id
-    latest_ts = ts_row[0] if ts_row else acc_latest_ts
-    return since_id, latest_ts
+def get_since_state(conn: sqlite3.Connection, account: str) -> Tuple[Optional[int], Optional[str]]:
+    return CrawlStateRepository(conn).load([account])[account]
 
 
 def set_since_state(
     conn: sqlite3.Connection,
     account: str,
-    since_id: Optional[str] = None,
+    since_id: IdLike = None,
     latest_timestamp: Optional[str] = None,
 ) -> None:
-    normalized = account.lower()
-    if since_id is not None or latest_timestamp is not None:
-        conn.execute(
-            """
-            INSERT INTO accounts(handle, platform, since_id, latest_timestamp, updated_at)
-            VALUES(?, 'x', ?, ?, CURRENT_TIMESTAMP)
-            ON CONFLICT(handle) DO UPDATE SET
-                since_id = COALESCE(excluded.since_id, accounts.since_id),
-                latest_timestamp = COALESCE(excluded.latest_timestamp, accounts.latest_timestamp),
-                updated_at = CURRENT_TIMESTAMP
-            """,
-            (normalized, since_id, latest_timestamp),
-        )
-    if since_id is not None:
-        conn.execute(
-            """
-            INSERT INTO since_ids(account, since_id)
-            VALUES(?, ?)
-            ON CONFLICT(account) DO UPDATE SET since_id = excluded.since_id
-            """,
-            (account, since_id),
-        )
-    if latest_timestamp is not None:
-        conn.execute(
-            """
-            INSERT INTO latest_timestamps(account, latest_timestamp)
-            VALUES(?, ?)
-            ON CONFLICT(account) DO UPDATE SET latest_timestamp = excluded.latest_timestamp
-            """,
-            (account, latest_timestamp),
-        )
-    conn.commit()
-
-
-def store_posts(conn: sqlite3.Connection, posts: Iterable[Dict]) -> None:
-    accounts: Set[str] = set()
-    media_rows = []
-    normalized_posts = []
+    repo = CrawlStateRepository(conn)
+    repo.update(account, since_id=since_id, latest_timestamp=latest_timestamp)
+    repo.flush()
 
-    for post in posts:
-        post_id = str(post.get("id"))
-        author = str(post.get("author", "")).lower()
-        normalized_posts.append(
-            {
-                "id": post_id,
-                "author": author,
-                "created_at": post.get("created_at"),
-                "text": post.get("text"),
-                "url": post.get("url"),
-            }
-        )
-        if author:
-            accounts.add(author)
-
-        media_items = post.get("media") or []
-        for idx, media in enumerate(media_items):
-            media_id = media.get("id") or media.get("media_key") or f"{post_id}-media-{idx}"
-            media_rows.append(
-                (
-                    str(media_id),
-                    post_id,
-                    media.get("type"),
-                    media.get("url"),
-                    media.get("preview_url"),
-                    media.get("width"),
-                    media.get("height"),
-                    media.get("description"),
-                )
-            )
 
-    if accounts:
-        conn.executemany(
-            """
-            INSERT INTO accounts(handle, platform)
-            VALUES(?, 'x')
-            ON CONFLICT(handle) DO NOTHING
-            """,
-            [(account,) for account in accounts],
-        )
-
-    conn.executemany(
-        "INSERT OR IGNORE INTO posts(id, author, created_at, text, url) VALUES(:id, :author, :created_at, :text, :url)",
-        normalized_posts,
-    )
-
-    if media_rows:
-        conn.executemany(
-            """
-            INSERT OR REPLACE INTO media(id, post_id, type, url, preview_url, width, height, description)
-            VALUES(?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            media_rows,
-        )
+def store_posts(conn: sqlite3.Connection, posts: Iterable[Post]) -> IngestResult:
+    result = ingest_posts(conn, posts)
     conn.commit()
+    return result
 
 
 def mark_posts_as_summarized(conn: sqlite3.Connection, post_ids: List[str]) -> None:
@@ -322,12 +177,47 @@ def mark_posts_as_summarized(conn: sqlite3.Connection, post_ids: List[str]) -> N
     conn.commit()
 
 
-def load_posts_in_window(conn: sqlite3.Connection, window_hours: int = 48) -> List[Dict]:
-    cutoff = datetime.now(timezone.utc) - timedelta(hours=window_hours)
-    cur = conn.execute("SELECT post_id, id, type, url, preview_url, width, height, description FROM media")
-    media_rows = cur.fetchall()
+# Quick themes compare the report window against this many preceding days of posts
+THEMES_BACKGROUND_DAYS = 28
+
+# Earliest post of each near-duplicate cluster created at or after the bound cutoff,
+# with `cluster_ids` listing every member. `{filter}` narrows the candidate posts.
+CLUSTER_REPRESENTATIVES_SQL = """
+    SELECT * FROM (
+        SELECT p.*,
+               ROW_NUMBER() OVER cluster AS dup_rank,
+               group_concat(p.id) OVER cluster_all AS cluster_ids
+        FROM posts p
+        LEFT JOIN post_fingerprints f ON f.post_id = p.id
+        WHERE p.created_ts >= ? {filter}
+        WINDOW cluster AS (PARTITION BY COALESCE(f.cluster_id, p.id) ORDER BY p.created_ts, p.id),
+               cluster_all AS (PARTITION BY COALESCE(f.cluster_id, p.id))
+    )
+    WHERE dup_rank = 1
+"""
+
+
+def load_posts_since(conn: sqlite3.Connection, cutoff: datetime, collapse_duplicates: bool = False) -> List[Post]:
+    """
+    Load posts created at or after `cutoff`, with their media attached.
+
+    The cutoff is applied in SQL on the indexed `created_ts` column, and media is
+    joined only for the selected posts (via idx_media_post_id). With
+    `collapse_duplicates`, each near-duplicate cluster is returned as its earliest
+    post, carrying `duplicate_ids` and `duplicate_count` for the rest.
+    """
+    cutoff_ts = int(cutoff.timestamp())
+    cur = conn.execute(
+        """
+        SELECT m.post_id, m.id, m.type, m.url, m.preview_url, m.width, m.height, m.description
+        FROM posts p
+        JOIN media m ON m.post_id = p.id
+        WHERE p.created_ts >= ?
+        """,
+        (cutoff_ts,),
+    )
     media_map: Dict[str, List[Dict]] = {}
-    for row in media_rows:
+    for row in cur:
         media_map.setdefault(row[0], []).append(
             {
                 "id": row[1],
@@ -340,78 +230,168 @@ def load_posts_in_window(conn: sqlite3.Connection, window_hours: int = 48) -> Li
             }
         )
 
-    try:
-        cur = conn.execute("SELECT id, author, created_at, text, url, is_summarized FROM posts")
-    except sqlite3.OperationalError:
-        cur = conn.execute("SELECT id, author, created_at, text, url, 0 as is_summarized FROM posts")
-        
-    rows = cur.fetchall()
-    posts: List[Dict] = []
-    for row in rows:
-        post = {
-            "id": row[0],
-            "author": row[1],
-            "created_at": row[2],
-            "text": row[3],
-            "url": row[4],
-            "is_summarized": bool(row[5]),
-            "media": media_map.get(row[0], []),
-        }
+    if collapse_duplicates:
+        cur = conn.execute(
+            f"""
+            SELECT id, author, created_at, created_ts, text, url, is_summarized, cluster_ids
+            FROM ({CLUSTER_REPRESENTATIVES_SQL.format(filter="")})
+            ORDER BY created_ts
+            """,
+            (cutoff_ts,),
+        )
+    else:
         try:
-            ts = parse_timestamp(post["created_at"])
-        except Exception:
-            continue
-        if ts >= cutoff:
-            posts.append(post)
-    return posts
+            cur = conn.execute(
+                "SELECT id, author, created_at, created_ts, text, url, is_summarized, NULL FROM posts WHERE created_ts >= ? ORDER BY created_ts",
+                (cutoff_ts,),
+            )
+        except sqlite3.OperationalError:
+            cur = conn.execute(
+                "SELECT id, author, created_at, created_ts, text, url, 0 as is_summarized, NULL FROM posts WHERE created_ts >= ? ORDER BY created_ts",
+                (cutoff_ts,),
+            )
 
+    return [
+        Post(
+            id=row[0],
+            author=row[1],
+            created_at=row[2],
+            created_ts=row[3],
+            text=row[4],
+            url=row[5],
+            is_summarized=bool(row[6]),
+            media=media_map.get(row[0], ()),
+            duplicate_ids=[pid for pid in row[7].split(",") if pid != row[0]] if row[7] else (),
+        )
+        for row in cur
+    ]
 
-def load_posts_for_weekly(conn: sqlite3.Connection, days: int = 7) -> List[Dict]:
-    """
-    Load posts from the past N days (default 7) for weekly summary.
-    Unlike daily mode, this does NOT filter by is_summarized status.
+
+def iter_posts_since(
+    conn: sqlite3.Connection,
+    cutoff: datetime,
+    unsummarized_only: bool = False,
+    by_category: bool = True,
+    collapse_duplicates: bool = False,
+    category: Optional[str] = None,
+) -> Iterator[Post]:
     """
-    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-    cur = conn.execute("SELECT post_id, id, type, url, preview_url, width, height, description FROM media")
-    media_rows = cur.fetchall()
-    media_map: Dict[str, List[Dict]] = {}
-    for row in media_rows:
-        media_map.setdefault(row[0], []).append(
-            {
-                "id": row[1],
-                "type": row[2],
-                "url": row[3],
-                "preview_url": row[4],
-                "width": row[5],
-                "height": row[6],
-                "description": row[7],
-            }
-        )
+    Yield posts created at or after `cutoff` straight from a SQL cursor.
+
+    Rows come ordered by category ("Uncategorized" last), author and created_ts, and
+    each post carries its `category` (from `accounts.category`, or "All" when
+    `by_category` is False). Media is LEFT JOINed so a post's attachments arrive on
+    consecutive rows and are folded into the post before it is yielded.
+
+    With `collapse_duplicates`, only the earliest post of each near-duplicate cluster
+    in the window is yielded. Its `duplicate_ids` list the others.
 
+    `category` restricts the posts to that one category.
+    """
+    cutoff_ts = int(cutoff.timestamp())
+    category_expr = "COALESCE(a.category, 'Uncategorized')" if by_category else "'All'"
+    category_filter = f"AND {category_expr} = ?" if category is not None else ""
+    if collapse_duplicates:
+        source = f"({CLUSTER_REPRESENTATIVES_SQL})"
+        cluster_ids = "p.cluster_ids"
+    else:
+        source = "posts"
+        cluster_ids = "NULL"
+    query = f"""
+        SELECT p.id, p.author, p.created_at, p.text, p.url, {{summarized}}, {category_expr} AS category,
+               p.conversation_id, p.in_reply_to_id, p.in_reply_to_user, p.is_reply, {cluster_ids}, p.created_ts,
+               m.id, m.type, m.url, m.preview_url, m.width, m.height, m.description
+        FROM {source} p
+        LEFT JOIN accounts a ON a.handle = p.author
+        LEFT JOIN media m ON m.post_id = p.id
+        WHERE p.created_ts >= ? {{filter}} {category_filter}
+        ORDER BY {category_expr} = 'Uncategorized', {category_expr}, p.author, p.created_ts, p.created_at, p.id
+    """
+    params = (cutoff_ts, cutoff_ts) if collapse_duplicates else (cutoff_ts,)
+    if category is not None:
+        params += (category,)
     try:
-        cur = conn.execute("SELECT id, author, created_at, text, url, is_summarized FROM posts")
+        cur = conn.execute(
+            query.format(summarized="p.is_summarized", filter="AND p.is_summarized = 0" if unsummarized_only else ""),
+            params,
+        )
     except sqlite3.OperationalError:
-        cur = conn.execute("SELECT id, author, created_at, text, url, 0 as is_summarized FROM posts")
-        
-    rows = cur.fetchall()
-    posts: List[Dict] = []
-    for row in rows:
-        post = {
-            "id": row[0],
-            "author": row[1],
-            "created_at": row[2],
-            "text": row[3],
-            "url": row[4],
-            "is_summarized": bool(row[5]),
-            "media": media_map.get(row[0], []),
-        }
-        try:
-            ts = parse_timestamp(post["created_at"])
-        except Exception:
-            continue
-        if ts >= cutoff:
-            posts.append(post)
-    return posts
+        cur = conn.execute(query.format(summarized="0", filter=""), params)
+
+    for _, rows in groupby(cur, key=lambda row: row[0]):
+        rows = list(rows)
+        first = rows[0]
+        yield Post(
+            id=first[0],
+            author=first[1],
+            created_at=first[2],
+            created_ts=first[12],
+            text=first[3],
+            url=first[4],
+            is_summarized=bool(first[5]),
+            category=first[6],
+            conversation_id=first[7],
+            in_reply_to_id=first[8],
+            in_reply_to_user=first[9],
+            is_reply=bool(first[10]),
+            duplicate_ids=[pid for pid in first[11].split(",") if pid and pid != first[0]] if first[11] else (),
+            media=[
+                {
+                    "id": row[13],
+                    "type": row[14],
+                    "url": row[15],
+                    "preview_url": row[16],
+                    "width": row[17],
+                    "height": row[18],
+                    "description": row[19],
+                }
+                for row in rows
+                if row[13] is not None
+            ],
+        )
+
+
+def iter_category_batches(
+    conn: sqlite3.Connection,
+    cutoff: datetime,
+    unsummarized_only: bool = False,
+    collapse: bool = False,
+    collapse_duplicates: bool = False,
+    category: Optional[str] = None,
+) -> Iterator[Tuple[str, List[Post]]]:
+    """
+    Yield (category, posts) one category at a time from the ordered post cursor, with
+    self-reply threads merged into single posts when `collapse` is set and near-duplicate
+    clusters reduced to one post when `collapse_duplicates` is set. With `category`,
+    only that category's batch (if it has posts) is yielded.
+    """
+    posts = iter_posts_since(
+        conn, cutoff, unsummarized_only, collapse_duplicates=collapse_duplicates, category=category
+    )
+    if collapse:
+        posts = collapse_threads(posts)
+    for category, cat_posts in groupby(posts, key=lambda p: p.category):
+        yield category, list(cat_posts)
+
+
+def window_themes(
+    conn: sqlite3.Connection,
+    cutoff: datetime,
+    engine: KeywordEngine,
+    background_days: int = THEMES_BACKGROUND_DAYS,
+    top_n: int = 12,
+) -> List[str]:
+    """
+    Distinctive terms of posts since `cutoff`, scored against the preceding `background_days`.
+    Only the window is tokenized; background document frequencies are cached per day.
+    """
+    cutoff_ts = int(cutoff.timestamp())
+    texts = [row[0] for row in conn.execute("SELECT text FROM posts WHERE created_ts >= ? AND text IS NOT NULL", (cutoff_ts,))]
+    if not texts:
+        return []
+    background = background_document_frequencies(conn, engine, cutoff_ts - background_days * 86400, cutoff_ts)
+    conn.commit()
+    return [term for term, _ in engine.distinctive_terms(texts, top_n=top_n, background_df=background)]
 
 
 def ensure_accounts(conn: sqlite3.Connection, accounts: Iterable[str], category_map: Optional[Dict[str, str]] = None) -> None:
@@ -461,173 +441,141 @@ def run_pipeline(
     summary_model: Optional[str] = None,
     summary_api_key: Optional[str] = None,
     summary_base_url: Optional[str] = None,
-    summary_max_posts: int = 30,
+    summary_max_posts: int = 0,
     weekly_model: Optional[str] = None,
-    weekly_max_posts: int = 150,
+    weekly_max_posts: int = 0,
+    sqlite_pragmas: Optional[Dict[str, str]] = None,
+    shards: int = 1,
+    max_concurrent_runs: int = 4,
+    shard_timeout: Optional[int] = None,
+    shard_retries: int = 1,
+    http_pool_sizes: Optional[Dict[str, int]] = None,
+    summary_concurrency: int = 3,
+    llm_requests_per_minute: Optional[float] = None,
+    llm_tokens_per_minute: Optional[float] = None,
+    llm_cache_ttl_hours: Optional[float] = 168,
+    llm_cache_max_entries: int = 2000,
+    weekly_strategy: str = "posts",
+    summary_token_budget: Optional[int] = None,
+    weekly_token_budget: Optional[int] = None,
+    thread_collapse: bool = True,
+    near_dup_collapse: bool = True,
+    stopword_files: Optional[List[Path]] = None,
+    fetch_budget: bool = True,
+    max_account_limit: Optional[int] = None,
+    search_overlap_seconds: int = DEFAULT_SEARCH_OVERLAP_SECONDS,
+    feishu_incremental: bool = False,
 ) -> str:
-    accounts_list, category_map = read_accounts(config_path)
-    
-    conn = init_db(db_path)
-    ensure_accounts(conn, accounts_list, category_map)
+    """
+    Fetch, store, summarize, report and publish. The stages run concurrently (see
+    `apify_pipeline.async_pipeline`); this is the blocking entry point for the CLI and scripts.
+    """
+    # Imported here since the staged runner builds on this module's helpers
+    from apify_pipeline.async_pipeline import run_pipeline_async
+
+    return asyncio.run(
+        run_pipeline_async(
+            mode=mode,
+            token=token,
+            actor_id=actor_id,
+            input_template=input_template,
+            config_path=config_path,
+            db_path=db_path,
+            sample_file=sample_file,
+            report_path=report_path,
+            window_hours=window_hours,
+            limit=limit,
+            max_total_limit=max_total_limit,
+            base_url=base_url,
+            summary_model=summary_model,
+            summary_api_key=summary_api_key,
+            summary_base_url=summary_base_url,
+            summary_max_posts=summary_max_posts,
+            weekly_model=weekly_model,
+            weekly_max_posts=weekly_max_posts,
+            sqlite_pragmas=sqlite_pragmas,
+            shards=shards,
+            max_concurrent_runs=max_concurrent_runs,
+            shard_timeout=shard_timeout,
+            shard_retries=shard_retries,
+            http_pool_sizes=http_pool_sizes,
+            summary_concurrency=summary_concurrency,
+            llm_requests_per_minute=llm_requests_per_minute,
+            llm_tokens_per_minute=llm_tokens_per_minute,
+            llm_cache_ttl_hours=llm_cache_ttl_hours,
+            llm_cache_max_entries=llm_cache_max_entries,
+            weekly_strategy=weekly_strategy,
+            summary_token_budget=summary_token_budget,
+            weekly_token_budget=weekly_token_budget,
+            thread_collapse=thread_collapse,
+            near_dup_collapse=near_dup_collapse,
+            stopword_files=stopword_files,
+            fetch_budget=fetch_budget,
+            max_account_limit=max_account_limit,
+            search_overlap_seconds=search_overlap_seconds,
+            feishu_incremental=feishu_incremental,
+        )
+    )
 
-    template_data: Optional[Dict] = None
-    if input_template and input_template.exists():
-        template_data = json.loads(input_template.read_text(encoding="utf-8"))
 
-    # For weekly mode, we still want to fetch data using 'apify' mode
-    client_mode = "apify" if mode == "weekly" else mode
-    
-    client = ApifyTweetScraperClient(
-        token=token,
-        actor_id=actor_id,
-        base_url=base_url,
-        mode=client_mode,
-        sample_file=sample_file,
-        input_template=template_data,
-    )
+def parse_date(value: str) -> datetime:
+    """CLI dates: YYYY-MM-DD (UTC midnight) or a full ISO timestamp."""
+    try:
+        return parse_timestamp(value if "T" in value else f"{value}T00:00:00+00:00")
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"invalid date {value!r}, expected YYYY-MM-DD") from exc
 
-    since_map = {account: get_since_id(conn, account) for account in accounts_list}
-    since_ts_map = {account: get_latest_timestamp(conn, account) for account in accounts_list}
-    posts = client.fetch_accounts(accounts_list, since_map, since_ts_map, limit=limit, max_total_limit=max_total_limit)
-    if posts:
-        store_posts(conn, posts)
-        latest_per_author: Dict[str, Dict[str, str]] = {}
-        for post in posts:
-            author = str(post.get("author", "")).lower()
-            tweet_id = str(post.get("id"))
-            created_at = post.get("created_at")
-            try:
-                created_ts = parse_timestamp(created_at) if created_at else None
-            except Exception:
-                created_ts = None
-            if not tweet_id:
-                continue
-            existing = latest_per_author.get(author)
-            try:
-                existing_ts = parse_timestamp(existing.get("created_at", "")) if existing and existing.get("created_at") else None
-            except Exception:
-                existing_ts = None
-            if not existing or (created_ts and (not existing_ts or existing_ts < created_ts)):
-                latest_per_author[author] = {"id": tweet_id, "created_at": created_at or ""}
-            elif not existing_ts and existing and existing.get("id", "") < tweet_id:
-                # Fallback to id ordering if timestamp is missing
-                latest_per_author[author] = {"id": tweet_id, "created_at": created_at or ""}
-        for author, data in latest_per_author.items():
-            set_since_id(conn, author, data["id"], latest_timestamp=data.get("created_at"))
-
-    if mode == "weekly":
-        # Weekly mode: load past 7 days of posts (all, not just unsummarized)
-        posts = load_posts_for_weekly(conn, days=7)
-        window_label = f"week ending {datetime.now(timezone.utc).strftime('%Y-%m-%d')}"
-        
-        summary_result: Optional[Dict[str, str]] = None
-        
-        if weekly_model:
-            summary_result = {}
-            # Group by category
-            by_category = defaultdict(list)
-            for p in posts:
-                author = p.get("author", "").lower()
-                cat = category_map.get(author, "Uncategorized")
-                by_category[cat].append(p)
-            
-            # Summarize each category using weekly function
-            for cat, cat_posts in by_category.items():
-                try:
-                    print(f"Generating weekly summary for {len(cat_posts)} posts in category: {cat}...")
-                    cat_summary = summarize_posts_weekly(
-                        cat_posts,
-                        model=weekly_model,
-                        api_key=summary_api_key,
-                        base_url=summary_base_url,
-                        max_posts=weekly_max_posts,
-                        category=cat
-                    )
-                    if cat_summary:
-                        summary_result[cat] = cat_summary
-                        
-                        # Save intermediate result
-                        safe_cat = "".join(c for c in cat if c.isalnum() or c in (' ', '_', '-')).strip().replace(' ', '_')
-                        intermediate_path = report_path.parent / f"partial_{safe_cat}_{datetime.now().strftime('%Y%m%d')}.md"
-                        intermediate_path.write_text(f"# {cat} Weekly Summary\n\n{cat_summary}", encoding="utf-8")
-                        print(f"Saved intermediate summary to {intermediate_path}")
-
-                except Exception as exc:
-                    import traceback
-                    traceback.print_exc()
-                    print(f"LLM summarization failed for category {cat}: {exc}", file=sys.stderr)
-                    # Continue to next category instead of crashing
-                    continue
-        else:
-            print("Warning: Weekly mode requires --weekly-model to generate summaries.")
-    else:
-        # Daily mode: load posts in window and filter unsummarized
-        posts = load_posts_in_window(conn, window_hours=window_hours)
-        window_label = f"past {window_hours}h ending {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M UTC')}"
-        
-        summary_result: Optional[Dict[str, str]] = None
-        final_posts_for_report = posts
 
-        if summary_model:
-            # Filter posts that haven't been summarized yet
-            posts_to_summarize = [p for p in posts if not p.get("is_summarized")]
-            final_posts_for_report = posts_to_summarize
-            
-            if not posts_to_summarize:
-                # No new posts, return empty dict or None. Analyzer handles it.
-                summary_result = None 
-            else:
-                summary_result = {}
-                # Group by category
-                by_category = defaultdict(list)
-                for p in posts_to_summarize:
-                    author = p.get("author", "").lower()
-                    cat = category_map.get(author, "Uncategorized")
-                    by_category[cat].append(p)
-                
-                # Summarize each category
-                for cat, cat_posts in by_category.items():
-                    try:
-                        print(f"Summarizing {len(cat_posts)} posts for category: {cat}...")
-                        cat_summary = summarize_posts(
-                            cat_posts,
-                            model=summary_model,
-                            api_key=summary_api_key,
-                            base_url=summary_base_url,
-                            max_posts=summary_max_posts,
-                            category=cat
-                        )
-                        if cat_summary:
-                            summary_result[cat] = cat_summary
-                            # Mark these posts as summarized
-                            mark_posts_as_summarized(conn, [p["id"] for p in cat_posts])
-                    except Exception as exc:
-                        import traceback
-                        traceback.print_exc()
-                        print(f"LLM summarization failed for category {cat}: {exc}", file=sys.stderr)
-        
-        posts = final_posts_for_report
-
-    report_body = build_report(
-        posts, 
-        window_label=window_label, 
-        summary=summary_result,
-        category_map=category_map,
-        report_type="daily" if mode != "weekly" else "weekly",
+def search_main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog="pipeline.py search", description="Full-text search over stored posts (BM25 ranked)"
     )
-
-    report_path.parent.mkdir(parents=True, exist_ok=True)
-    report_path.write_text(report_body, encoding="utf-8")
+    parser.add_argument("query", nargs="+", help="Terms that must all appear, or an FTS5 query (\"a b\", OR, NEAR, prefix*)")
+    parser.add_argument("--db", type=Path, default=Path(__file__).parent / "data" / "digests.db")
+    parser.add_argument("--author", type=str, default=None, help="Only posts by this handle")
+    parser.add_argument("--category", type=str, default=None, help="Only posts from accounts in this category")
+    parser.add_argument("--days", type=int, default=None, help="Only posts from the last N days")
+    parser.add_argument("--since", type=parse_date, default=None, help="Only posts on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--until", type=parse_date, default=None, help="Only posts before this date (YYYY-MM-DD)")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    since = args.since
+    if args.days:
+        since = max(filter(None, [since, datetime.now(timezone.utc) - timedelta(days=args.days)]))
+    conn = init_db(args.db)
     try:
-        doc_url = send_report_to_feishu(report_body, report_mode=mode)
-        if doc_url:
-            print(f"Feishu doc created: {doc_url}")
-    except Exception as exc:
-        print(f"Feishu notification failed: {exc}", file=sys.stderr)
-    return report_body
+        hits = search_posts(
+            conn,
+            " ".join(args.query),
+            author=args.author,
+            category=args.category,
+            since=since,
+            until=args.until,
+            limit=args.limit,
+        )
+    except ValueError as exc:
+        print(exc, file=sys.stderr)
+        return 2
+    finally:
+        conn.close()
+
+    if not hits:
+        print("No matching posts.")
+        return 0
+    for idx, hit in enumerate(hits, 1):
+        created_at = parse_timestamp(hit.created_at).strftime("%Y-%m-%d %H:%M UTC") if hit.created_at else "unknown time"
+        print(f"{idx}. {created_at} — @{hit.author} [{hit.category}]")
+        print(f"   {' '.join(hit.snippet.split())}")
+        if hit.url:
+            print(f"   {hit.url}")
+    return 0
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "search":
+        sys.exit(search_main(sys.argv[2:]))
+
     parser = argparse.ArgumentParser(description="Apify-based X digest (tweet-scraper actor)")
     parser.add_argument("--mode", choices=["sample", "apify", "weekly"], default="sample")
     parser.add_argument("--token", type=str, default=os.environ.get("APIFY_TOKEN"), help="Apify API token (required in apify mode)")
@@ -643,7 +591,29 @@ def main():
     parser.add_argument("--sample-file", type=Path, default=None)
     parser.add_argument("--report", type=Path, default=Path(__file__).parent.parent / "reports" / "apify-daily.md")
     parser.add_argument("--window-hours", type=int, default=48)
-    parser.add_argument("--limit", type=int, default=40, help="Max posts per account per run")
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=40,
+        help="Max posts per account per run; with the fetch budget, the cap for accounts without history",
+    )
+    parser.add_argument(
+        "--max-account-limit",
+        type=int,
+        default=None,
+        help="Highest per-account cap the fetch budget may plan (default: 3x --limit)",
+    )
+    parser.add_argument(
+        "--search-overlap-seconds",
+        type=int,
+        default=DEFAULT_SEARCH_OVERLAP_SECONDS,
+        help="Start each account's since_time: search this many seconds before its newest stored post",
+    )
+    parser.add_argument(
+        "--no-fetch-budget",
+        action="store_true",
+        help="Give every account the same --limit instead of caps planned from its posting history",
+    )
     parser.add_argument("--max-total-limit", type=int, default=400, help="Global cap across all accounts to avoid over-fetch")
     parser.add_argument("--base-url", type=str, default="https://api.apify.com/v2")
     parser.add_argument("--summary-model", type=str, default="deepseek-chat", help="Optional OpenAI model id to summarize posts")
@@ -654,11 +624,104 @@ def main():
         default=os.environ.get("OPENAI_BASE_URL") or os.environ.get("DEEPSEEK_API_BASE"),
         help="Override the OpenAI-compatible base URL (e.g., https://api.deepseek.com for DeepSeek)",
     )
-    parser.add_argument("--summary-max-posts", type=int, default=30, help="Max posts to pass to the LLM summarizer (daily mode)")
+    parser.add_argument(
+        "--summary-max-posts",
+        type=int,
+        default=0,
+        help="Max posts to pass to the LLM summarizer (daily mode; default 0 = as many as fit the token budget)",
+    )
     parser.add_argument("--weekly-model", type=str, default="deepseek-reasoner", help="LLM model for weekly summaries (default: deepseek-reasoner)")
-    parser.add_argument("--weekly-max-posts", type=int, default=150, help="Max posts to pass to LLM for weekly summarization (default: 150)")
+    parser.add_argument(
+        "--weekly-max-posts",
+        type=int,
+        default=0,
+        help="Max posts to pass to LLM for weekly summarization (default 0 = as many as fit the token budget)",
+    )
+    parser.add_argument(
+        "--summary-token-budget",
+        type=int,
+        default=None,
+        help="Estimated prompt tokens per daily summary call (default: per-model; 0 = newest --summary-max-posts posts)",
+    )
+    parser.add_argument(
+        "--weekly-token-budget",
+        type=int,
+        default=None,
+        help="Estimated prompt tokens per weekly summary call (default: per-model; 0 = newest --weekly-max-posts posts)",
+    )
+    parser.add_argument(
+        "--weekly-strategy",
+        choices=["posts", "hierarchical"],
+        default="posts",
+        help="Weekly input: the newest --weekly-max-posts posts, or a map-reduce over stored daily summaries plus uncovered posts",
+    )
+    parser.add_argument("--shards", type=int, default=1, help="Split accounts into N concurrent actor runs")
+    parser.add_argument("--max-concurrent-runs", type=int, default=4, help="Max actor runs in flight when sharding")
+    parser.add_argument("--shard-timeout", type=int, default=None, help="Per-shard run timeout in seconds")
+    parser.add_argument("--shard-retries", type=int, default=1, help="Retries for failed shards")
+    parser.add_argument("--summary-concurrency", type=int, default=3, help="Max categories summarized concurrently")
+    parser.add_argument("--llm-rpm", type=float, default=None, help="Per-provider LLM requests/min limit")
+    parser.add_argument("--llm-tpm", type=float, default=None, help="Per-provider LLM tokens/min limit (estimated)")
+    parser.add_argument(
+        "--stopwords",
+        type=Path,
+        action="append",
+        default=[],
+        help="Extra stopword file (one term per line) for keywords and quick themes (repeatable)",
+    )
+    parser.add_argument(
+        "--no-near-dup-collapse",
+        action="store_true",
+        help="Keep near-duplicate posts (reposts, light paraphrases) separate in prompts and reports",
+    )
+    parser.add_argument(
+        "--no-thread-collapse",
+        action="store_true",
+        help="Keep self-reply threads as separate posts in prompts and reports",
+    )
+    parser.add_argument(
+        "--llm-cache-ttl-hours",
+        type=float,
+        default=168,
+        help="Reuse cached LLM summaries younger than this (default: 168 = 7 days)",
+    )
+    parser.add_argument("--llm-cache-max-entries", type=int, default=2000, help="Max cached LLM responses kept (LRU)")
+    parser.add_argument("--no-llm-cache", action="store_true", help="Always call the LLM, bypassing the response cache")
+    parser.add_argument(
+        "--feishu-incremental",
+        action="store_true",
+        help="Keep one rolling Feishu doc per day (per ISO week for weekly) and rewrite only changed sections",
+    )
+    parser.add_argument(
+        "--http-pool",
+        action="append",
+        default=[],
+        metavar="HOST=SIZE",
+        help="Keep-alive connection pool size for a host (e.g. api.apify.com=8). Repeatable.",
+    )
+    parser.add_argument(
+        "--sqlite-pragma",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="Override a SQLite pragma (e.g. synchronous=FULL, cache_size=-131072, mmap_size=0). Repeatable.",
+    )
     args = parser.parse_args()
 
+    sqlite_pragmas: Dict[str, str] = {}
+    for item in args.sqlite_pragma:
+        name, sep, value = item.partition("=")
+        if not sep:
+            parser.error(f"--sqlite-pragma expects NAME=VALUE, got {item!r}")
+        sqlite_pragmas[name.strip().lower()] = value.strip()
+
+    http_pool_sizes: Dict[str, int] = {}
+    for item in args.http_pool:
+        host, sep, size = item.partition("=")
+        if not sep or not size.strip().isdigit():
+            parser.error(f"--http-pool expects HOST=SIZE, got {item!r}")
+        http_pool_sizes[host.strip().lower()] = int(size)
+
     report = run_pipeline(
         mode=args.mode,
         token=args.token,
@@ -678,6 +741,27 @@ def main():
         summary_max_posts=args.summary_max_posts,
         weekly_model=args.weekly_model,
         weekly_max_posts=args.weekly_max_posts,
+        sqlite_pragmas=sqlite_pragmas,
+        shards=args.shards,
+        max_concurrent_runs=args.max_concurrent_runs,
+        shard_timeout=args.shard_timeout,
+        shard_retries=args.shard_retries,
+        http_pool_sizes=http_pool_sizes,
+        summary_concurrency=args.summary_concurrency,
+        llm_requests_per_minute=args.llm_rpm,
+        llm_tokens_per_minute=args.llm_tpm,
+        llm_cache_ttl_hours=None if args.no_llm_cache else args.llm_cache_ttl_hours,
+        llm_cache_max_entries=args.llm_cache_max_entries,
+        weekly_strategy=args.weekly_strategy,
+        summary_token_budget=args.summary_token_budget,
+        weekly_token_budget=args.weekly_token_budget,
+        thread_collapse=not args.no_thread_collapse,
+        near_dup_collapse=not args.no_near_dup_collapse,
+        stopword_files=args.stopwords,
+        fetch_budget=not args.no_fetch_budget,
+        max_account_limit=args.max_account_limit,
+        search_overlap_seconds=args.search_overlap_seconds,
+        feishu_incremental=args.feishu_incremental,
     )
     print(report)
 
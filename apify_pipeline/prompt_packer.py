@@ -0,0 +1,196 @@
+import heapq
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")
+WORD_RE = re.compile(r"[$#]?[a-z0-9_]{3,}")
+CJK_RUN_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]+")
+
+# (context window, tokens held back for the completion). Reasoning models also spend
+# completion tokens on their chain of thought, so they keep more in reserve.
+MODEL_CONTEXT_TOKENS: Dict[str, Tuple[int, int]] = {
+    "deepseek-chat": (64000, 8000),
+    "deepseek-reasoner": (64000, 32000),
+    "gpt-4o": (128000, 16000),
+    "gpt-4o-mini": (128000, 16000),
+}
+DEFAULT_CONTEXT_TOKENS = (32000, 8000)
+
+# Prompt size targets per call type. These are kept well below the context windows so
+# that latency stays predictable.
+DEFAULT_PROMPT_BUDGETS = {"daily": 12000, "weekly": 24000}
+
+# Posts are never shortened below this many characters to make room for more posts.
+MIN_POST_CHARS = 160
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: ~1 token per CJK character, ~1 per 4 other characters."""
+    if not text:
+        return 0
+    cjk = len(CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def prompt_budget(model: Optional[str], kind: str, override: Optional[int] = None) -> Optional[int]:
+    """
+    Token budget for a whole prompt of `kind` ("daily" or "weekly") sent to `model`.
+
+    An explicit `override` wins; 0 disables packing (returns None). Otherwise the default
+    for `kind` is used, capped so that prompt plus completion reserve fit the model's
+    context window. Unknown models match on the longest known prefix.
+    """
+    if override is not None:
+        return override if override > 0 else None
+    name = (model or "").lower()
+    matches = [key for key in MODEL_CONTEXT_TOKENS if name.startswith(key)]
+    context, reserve = MODEL_CONTEXT_TOKENS[max(matches, key=len)] if matches else DEFAULT_CONTEXT_TOKENS
+    return min(DEFAULT_PROMPT_BUDGETS[kind], context - reserve)
+
+
+@dataclass
+class PackedPrompt:
+    lines: List[str] = field(default_factory=list)
+    post_ids: List[str] = field(default_factory=list)
+    budget: int = 0
+    tokens_used: int = 0
+    dropped: int = 0
+    shortened: int = 0
+
+    def describe(self) -> str:
+        return (
+            f"{len(self.post_ids)} posts, ~{self.tokens_used}/{self.budget} tokens, "
+            f"{self.dropped} dropped, {self.shortened} shortened"
+        )
+
+
+def shorten(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rstrip() + "..."
+
+
+def features(text: str) -> Set[str]:
+    """Words/tickers/hashtags plus CJK character bigrams, used to measure overlap between posts."""
+    lowered = text.lower()
+    found = set(WORD_RE.findall(lowered))
+    for run in CJK_RUN_RE.findall(lowered):
+        if len(run) == 1:
+            found.add(run)
+        found.update(run[i : i + 2] for i in range(len(run) - 1))
+    return found
+
+
+def rank_by_novelty(texts: Sequence[str]) -> List[int]:
+    """
+    Order texts so that each one adds as many not-yet-seen features as possible.
+
+    Greedy max coverage with lazy gain updates: a text's gain can only shrink as more are
+    picked, so a stale heap entry only needs rechecking when it reaches the top. Ties go
+    to the lower index (callers pass newest first).
+    """
+    feats = [features(text) for text in texts]
+    heap = [(-len(f), idx) for idx, f in enumerate(feats)]
+    heapq.heapify(heap)
+    covered: Set[str] = set()
+    order: List[int] = []
+    while heap:
+        _, idx = heapq.heappop(heap)
+        gain = len(feats[idx] - covered)
+        if heap and gain < -heap[0][0]:
+            heapq.heappush(heap, (-gain, idx))
+            continue
+        order.append(idx)
+        covered |= feats[idx]
+    return order
+
+
+def max_uniform_cap(
+    texts: Sequence[str], cost: Callable[[int, str], int], budget: int, lo: int = 1
+) -> Optional[int]:
+    """
+    Largest per-text character cap such that `sum(cost(i, shorten(text, cap)))` fits
+    `budget`. Returns None when even `lo` does not fit.
+    """
+    def total(cap: int) -> int:
+        return sum(cost(idx, shorten(text, cap)) for idx, text in enumerate(texts))
+
+    hi = max((len(text) for text in texts), default=0)
+    if total(hi) <= budget:
+        return hi
+    if lo > hi or total(lo) > budget:
+        return None
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if total(mid) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def pack_posts(
+    posts: Sequence[Dict],
+    budget: int,
+    format_line: Callable[[Dict, str], str],
+    max_posts: int = 0,
+    reserved: int = 0,
+    min_chars: int = MIN_POST_CHARS,
+) -> PackedPrompt:
+    """
+    Choose and format post lines for a prompt of at most `budget` tokens.
+
+    `reserved` tokens (instructions around the material) are counted as used. Posts are
+    taken in novelty order as long as they fit at `min_chars`. Then the largest uniform
+    length cap that keeps the chosen posts within budget is applied, so long posts are
+    shortened only as much as needed. At least one post is always included (shortened
+    further if it must be). Lines come out newest first; `max_posts` > 0 caps the count.
+    """
+    ordered = sorted(posts, key=lambda p: p.get("created_at") or "", reverse=True)
+    texts = [(p.get("text") or "").strip().replace("\n", " ") for p in ordered]
+    ranking = rank_by_novelty(texts)
+    if max_posts and max_posts > 0:
+        ranking = ranking[:max_posts]
+    available = max(budget - reserved, 0)
+
+    def line_cost(idx: int, text: str) -> int:
+        return estimate_tokens(format_line(ordered[idx], text)) + 1  # newline
+
+    chosen: List[int] = []
+    used = 0
+    for idx in ranking:
+        cost = line_cost(idx, shorten(texts[idx], min_chars))
+        if used + cost <= available:
+            chosen.append(idx)
+            used += cost
+    if not chosen and ranking:
+        chosen.append(ranking[0])
+
+    chosen.sort()
+    chosen_texts = [texts[idx] for idx in chosen]
+    cap = max_uniform_cap(chosen_texts, lambda pos, text: line_cost(chosen[pos], text), available, lo=1)
+    if cap is None:
+        cap = 1
+
+    packed = PackedPrompt(budget=budget, dropped=len(posts) - len(chosen))
+    packed.tokens_used = reserved
+    for idx in chosen:
+        text = shorten(texts[idx], cap)
+        if len(texts[idx]) > cap:
+            packed.shortened += 1
+        line = format_line(ordered[idx], text)
+        packed.lines.append(line)
+        packed.post_ids.append(ordered[idx].get("id"))
+        packed.tokens_used += estimate_tokens(line) + 1
+    return packed
+
+
+def fit_texts(texts: Sequence[str], budget: int, reserved: int = 0) -> Tuple[List[str], int]:
+    """
+    Shorten `texts` with one uniform cap so their estimated tokens fit `budget - reserved`.
+    Nothing is dropped. Returns the texts and how many were shortened.
+    """
+    available = max(budget - reserved, 0)
+    cap = max_uniform_cap(texts, lambda _, text: estimate_tokens(text), available, lo=1) or 1
+    return [shorten(text, cap) for text in texts], sum(1 for text in texts if len(text) > cap)
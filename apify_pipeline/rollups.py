@@ -0,0 +1,317 @@
+import heapq
+import json
+import sqlite3
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from apify_pipeline.analyzer import normalize_text
+from apify_pipeline.keywords import KeywordEngine
+
+# (post_id, author, created_ts, text)
+RollupRow = Tuple[str, Optional[str], Optional[int], Optional[str]]
+
+# Rows fetched per backfill pass
+BACKFILL_CHUNK_SIZE = 2000
+
+DAY_SECONDS = 86400
+
+
+def day_of(created_ts: Optional[int]) -> Optional[str]:
+    if created_ts is None:
+        return None
+    return time.strftime("%Y-%m-%d", time.gmtime(created_ts))
+
+
+def rollup_posts(conn: sqlite3.Connection, rows: Iterable[RollupRow]) -> int:
+    """
+    Add posts to the daily term and author rollups without committing. Returns the
+    number of posts counted.
+
+    Each post should be rolled up exactly once (ingest does it for newly inserted posts),
+    since the counts are additive. Posts without a timestamp are skipped. Terms go under
+    the author's current `accounts.category`.
+    """
+    rows = [row for row in rows if row[2] is not None]
+    if not rows:
+        return 0
+    authors = sorted({(row[1] or "").lower() for row in rows})
+    categories: Dict[str, str] = {}
+    for start in range(0, len(authors), 900):
+        chunk = authors[start : start + 900]
+        categories.update(
+            conn.execute(
+                f"""
+                SELECT handle, COALESCE(category, 'Uncategorized') FROM accounts
+                WHERE handle IN ({', '.join('?' * len(chunk))})
+                """,
+                chunk,
+            ).fetchall()
+        )
+
+    terms: Counter = Counter()
+    authors_per_day: Counter = Counter()
+    for _, author, created_ts, text in rows:
+        author = (author or "").lower()
+        day = day_of(created_ts)
+        category = categories.get(author, "Uncategorized")
+        authors_per_day[(day, author)] += 1
+        for term in normalize_text(text or ""):
+            terms[(day, category, term)] += 1
+
+    conn.executemany(
+        """
+        INSERT INTO term_daily(day, category, term, count) VALUES(?, ?, ?, ?)
+        ON CONFLICT(day, category, term) DO UPDATE SET count = count + excluded.count
+        """,
+        [(day, category, term, count) for (day, category, term), count in terms.items()],
+    )
+    conn.executemany(
+        """
+        INSERT INTO author_daily(day, author, post_count) VALUES(?, ?, ?)
+        ON CONFLICT(day, author) DO UPDATE SET post_count = post_count + excluded.post_count
+        """,
+        [(day, author, count) for (day, author), count in authors_per_day.items()],
+    )
+    return len(rows)
+
+
+def backfill_rollups(conn: sqlite3.Connection) -> int:
+    """Roll up posts stored before the rollup tables existed, without committing. Returns the count."""
+    total = 0
+    while True:
+        rows = conn.execute(
+            """
+            SELECT id, author, created_ts, text FROM posts
+            WHERE rolled_up = 0 AND created_ts IS NOT NULL
+            ORDER BY created_ts
+            LIMIT ?
+            """,
+            (BACKFILL_CHUNK_SIZE,),
+        ).fetchall()
+        if not rows:
+            return total
+        total += rollup_posts(conn, rows)
+        conn.executemany("UPDATE posts SET rolled_up = 1 WHERE id = ?", [(row[0],) for row in rows])
+
+
+def background_document_frequencies(
+    conn: sqlite3.Connection, engine: KeywordEngine, start_ts: int, end_ts: int
+) -> Tuple[int, Counter]:
+    """
+    `(posts, {term: df})` for the posts with text created in `[start_ts, end_ts)`, as
+    `KeywordEngine.distinctive_terms` takes them for `background_df`. Without committing.
+
+    Whole UTC days come from `keyword_df_daily`. A day is counted again when its number
+    of posts changed since it was cached. The partial days at either end are tokenized.
+    """
+    first_day = -(-start_ts // DAY_SECONDS) * DAY_SECONDS
+    last_day = end_ts // DAY_SECONDS * DAY_SECONDS
+    if first_day >= last_day:
+        return _count_documents(conn, engine, start_ts, end_ts)
+
+    posts, df = _count_documents(conn, engine, start_ts, first_day)
+    edge_posts, edge_df = _count_documents(conn, engine, last_day, end_ts)
+    posts += edge_posts
+    df.update(edge_df)
+
+    day_posts = conn.execute(
+        """
+        SELECT created_ts / ? AS day_index, COUNT(*) FROM posts
+        WHERE created_ts >= ? AND created_ts < ? AND text IS NOT NULL
+        GROUP BY day_index
+        """,
+        (DAY_SECONDS, first_day, last_day),
+    ).fetchall()
+    cached = {
+        day: (count, payload)
+        for day, count, payload in conn.execute(
+            "SELECT day, posts, df FROM keyword_df_daily WHERE engine = ? AND day BETWEEN ? AND ?",
+            (engine.signature, day_of(first_day), day_of(last_day - 1)),
+        )
+    }
+    for day_index, count in day_posts:
+        day_start = day_index * DAY_SECONDS
+        day = day_of(day_start)
+        entry = cached.get(day)
+        if entry is not None and entry[0] == count:
+            df.update(json.loads(entry[1]))
+        else:
+            count, day_df = _count_documents(conn, engine, day_start, day_start + DAY_SECONDS)
+            conn.execute(
+                """
+                INSERT INTO keyword_df_daily(day, engine, posts, df) VALUES(?, ?, ?, ?)
+                ON CONFLICT(day, engine) DO UPDATE SET posts = excluded.posts, df = excluded.df
+                """,
+                (day, engine.signature, count, json.dumps(day_df, ensure_ascii=False)),
+            )
+            df.update(day_df)
+        posts += count
+    return posts, df
+
+
+def _count_documents(conn: sqlite3.Connection, engine: KeywordEngine, start_ts: int, end_ts: int) -> Tuple[int, Counter]:
+    texts = [
+        row[0]
+        for row in conn.execute(
+            "SELECT text FROM posts WHERE created_ts >= ? AND created_ts < ? AND text IS NOT NULL",
+            (start_ts, end_ts),
+        )
+    ]
+    return len(texts), engine.document_frequencies(texts)
+
+
+class RollupRepository:
+    """
+    Read side of the daily rollups for windows `[start, end]`, to the second.
+
+    Whole UTC days inside the window are summed from the rollup tables. A day the window
+    only partly covers (e.g. a 24h window starting mid-day) still comes from the rollups
+    when none of its posts fall outside the window, as for today up to now. Otherwise the
+    posts of that day inside the window are counted directly.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def top_terms(
+        self,
+        start: datetime,
+        end: datetime,
+        limit: int = 12,
+        category: Optional[str] = None,
+        exclude: Iterable[str] = (),
+        unsummarized_only: bool = False,
+    ) -> List[Tuple[str, int]]:
+        """
+        Most frequent terms in the window, ties broken by term. The rollups do not track
+        `is_summarized`, so with `unsummarized_only` the window's posts are counted directly.
+        """
+        start_ts, end_ts = _ts(start), _ts(end) + 1
+        if unsummarized_only:
+            counts = self._post_terms(start_ts, end_ts, category, unsummarized_only=True)
+        else:
+            counts = self._term_counts(start_ts, end_ts, category)
+        excluded = set(exclude)
+        return heapq.nsmallest(
+            limit,
+            ((term, count) for term, count in counts.items() if term not in excluded),
+            key=lambda item: (-item[1], item[0]),
+        )
+
+    def author_counts(self, start: datetime, end: datetime, limit: int = 10) -> List[Tuple[str, int]]:
+        rollup_days, edges = self._split(_ts(start), _ts(end) + 1)
+        counts: Counter = Counter()
+        if rollup_days:
+            counts.update(
+                dict(
+                    self.conn.execute(
+                        "SELECT author, SUM(post_count) FROM author_daily WHERE day BETWEEN ? AND ? GROUP BY author",
+                        rollup_days,
+                    ).fetchall()
+                )
+            )
+        for edge_start, edge_end in edges:
+            counts.update(
+                dict(
+                    self.conn.execute(
+                        """
+                        SELECT LOWER(COALESCE(author, '')), COUNT(*) FROM posts
+                        WHERE created_ts >= ? AND created_ts < ?
+                        GROUP BY 1
+                        """,
+                        (edge_start, edge_end),
+                    ).fetchall()
+                )
+            )
+        return heapq.nsmallest(limit, counts.items(), key=lambda item: (-item[1], item[0]))
+
+    def term_deltas(
+        self, start: datetime, end: datetime, limit: int = 10, exclude: Iterable[str] = ()
+    ) -> List[Tuple[str, int, int]]:
+        """
+        `(term, current, previous)` for the terms that gained the most over the same span
+        right before the window (week over week for a 7-day window).
+        """
+        start_ts, end_ts = _ts(start), _ts(end) + 1
+        current = self._term_counts(start_ts, end_ts)
+        previous = self._term_counts(start_ts - (end_ts - start_ts), start_ts)
+        excluded = set(exclude)
+        rising = (
+            (term, count, previous.get(term, 0))
+            for term, count in current.items()
+            if count > previous.get(term, 0) and term not in excluded
+        )
+        return heapq.nsmallest(limit, rising, key=lambda item: (item[2] - item[1], item[0]))
+
+    def _term_counts(self, start_ts: int, end_ts: int, category: Optional[str] = None) -> Counter:
+        rollup_days, edges = self._split(start_ts, end_ts)
+        counts: Counter = Counter()
+        if rollup_days:
+            category_filter = "AND category = ?" if category else ""
+            counts.update(
+                dict(
+                    self.conn.execute(
+                        f"""
+                        SELECT term, SUM(count) FROM term_daily
+                        WHERE day BETWEEN ? AND ? {category_filter}
+                        GROUP BY term
+                        """,
+                        rollup_days + ((category,) if category else ()),
+                    ).fetchall()
+                )
+            )
+        for edge_start, edge_end in edges:
+            counts.update(self._post_terms(edge_start, edge_end, category))
+        return counts
+
+    def _post_terms(
+        self, start_ts: int, end_ts: int, category: Optional[str] = None, unsummarized_only: bool = False
+    ) -> Counter:
+        """Terms of the posts in `[start_ts, end_ts)`, counted as `rollup_posts` does."""
+        rows = self.conn.execute(
+            f"""
+            SELECT p.text FROM posts p
+            LEFT JOIN accounts a ON a.handle = LOWER(p.author)
+            WHERE p.created_ts >= ? AND p.created_ts < ? AND p.text IS NOT NULL
+              {"AND COALESCE(a.category, 'Uncategorized') = ?" if category else ""}
+              {"AND p.is_summarized = 0" if unsummarized_only else ""}
+            """,
+            (start_ts, end_ts) + ((category,) if category else ()),
+        )
+        counts: Counter = Counter()
+        for (text,) in rows:
+            counts.update(normalize_text(text))
+        return counts
+
+    def _split(self, start_ts: int, end_ts: int) -> Tuple[Optional[Tuple[str, str]], List[Tuple[int, int]]]:
+        """
+        `((first_day, last_day) or None, edges)` for `[start_ts, end_ts)`: the days to read
+        from the rollups and the partial-day ranges to count from posts instead.
+        """
+        first = start_ts // DAY_SECONDS * DAY_SECONDS
+        last = (end_ts - 1) // DAY_SECONDS * DAY_SECONDS
+        rollup_first, rollup_last = first, last
+        edges: List[Tuple[int, int]] = []
+        if start_ts > first and self._has_posts(first, start_ts):
+            rollup_first += DAY_SECONDS
+            edges.append((start_ts, min(first + DAY_SECONDS, end_ts)))
+        if rollup_first <= last and end_ts < last + DAY_SECONDS and self._has_posts(end_ts, last + DAY_SECONDS):
+            rollup_last -= DAY_SECONDS
+            edges.append((max(last, start_ts), end_ts))
+        if rollup_first > rollup_last:
+            return None, edges
+        return (day_of(rollup_first), day_of(rollup_last)), edges
+
+    def _has_posts(self, start_ts: int, end_ts: int) -> bool:
+        return (
+            self.conn.execute(
+                "SELECT 1 FROM posts WHERE created_ts >= ? AND created_ts < ? LIMIT 1", (start_ts, end_ts)
+            ).fetchone()
+            is not None
+        )
+
+
+def _ts(moment: datetime) -> int:
+    return int(moment.timestamp())
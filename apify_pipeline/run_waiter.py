@@ -0,0 +1,204 @@
+import random
+import sqlite3
+import statistics
+import threading
+import time
+import urllib.parse
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, Optional
+
+from apify_pipeline.http_transport import HttpTransport
+
+TERMINAL_STATES = {"SUCCEEDED", "FAILED", "TIMED_OUT", "ABORTED", "CANCELLED"}
+
+# Apify caps waitForFinish at 60 seconds per request.
+MAX_LONG_POLL_SECONDS = 60
+# A status call that took at least this share of its waitForFinish held the long poll
+# open for the full window; polling again right away costs nothing extra.
+FULL_POLL_RATIO = 0.9
+
+
+@dataclass
+class WaitMetrics:
+    runs: int = 0
+    status_calls: int = 0
+    wait_seconds: float = 0.0
+    sleep_seconds: float = 0.0
+    outliers: int = 0
+
+    def as_dict(self) -> Dict[str, float]:
+        return asdict(self)
+
+
+class RunWaiter:
+    """
+    Waits for Apify actor runs to reach a terminal state.
+
+    Each status call long-polls server-side (`waitForFinish`), so an unfinished run costs
+    one request per minute instead of one per poll interval. If the server answers early
+    without a terminal status, the next call is delayed with jittered exponential backoff,
+    stretched toward the run's expected duration when one is known. Expected durations are
+    learned from past runs stored in `actor_run_history`. Runs that take longer than
+    `outlier_factor` times the expected duration are flagged.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        token: Optional[str],
+        actor_id: str,
+        conn: Optional[sqlite3.Connection] = None,
+        long_poll_seconds: int = MAX_LONG_POLL_SECONDS,
+        initial_backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        outlier_factor: float = 3.0,
+        history_size: int = 20,
+        http: Optional[HttpTransport] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.actor_id = actor_id
+        self.conn = conn
+        self.long_poll_seconds = max(1, min(long_poll_seconds, MAX_LONG_POLL_SECONDS))
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.outlier_factor = outlier_factor
+        self.history_size = history_size
+        self.http = http or HttpTransport()
+        self.metrics = WaitMetrics()
+        self._lock = threading.Lock()
+
+    def expected_duration(self) -> Optional[float]:
+        """Median duration in seconds of recent successful runs of this actor."""
+        if self.conn is None:
+            return None
+        with self._lock:
+            rows = self.conn.execute(
+                """
+                SELECT duration_seconds FROM actor_run_history
+                WHERE actor_id = ? AND status = 'SUCCEEDED' AND duration_seconds IS NOT NULL
+                ORDER BY finished_at DESC
+                LIMIT ?
+                """,
+                (self.actor_id, self.history_size),
+            ).fetchall()
+        if not rows:
+            return None
+        return statistics.median(row[0] for row in rows)
+
+    def wait(self, run_data: Dict, timeout_seconds: int) -> Dict:
+        """Block until the run in `run_data` finishes; returns the final run object."""
+        run_id = run_data.get("id")
+        if not run_id:
+            raise RuntimeError("Missing run id when polling Apify")
+
+        started = time.monotonic()
+        deadline = started + timeout_seconds
+        expected = self.expected_duration()
+        attempt = 0
+        flagged = False
+        data = run_data
+
+        while data.get("status") not in TERMINAL_STATES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._finish(run_id, data, started, flagged)
+                raise TimeoutError(f"Apify run {run_id} did not finish in {timeout_seconds} seconds")
+
+            wait_for = min(self.long_poll_seconds, int(remaining))
+            call_started = time.monotonic()
+            data = self._get_status(run_id, wait_for=wait_for)
+            if data.get("status") in TERMINAL_STATES:
+                break
+            answered_early = time.monotonic() - call_started < wait_for * FULL_POLL_RATIO
+
+            elapsed = time.monotonic() - started
+            if expected and not flagged and elapsed > expected * self.outlier_factor:
+                flagged = True
+                print(
+                    f"Warning: Apify run {run_id} has been running {elapsed:.0f}s "
+                    f"(expected ~{expected:.0f}s); flagging as outlier"
+                )
+
+            if not answered_early:
+                # The long poll already waited server-side; back to the first backoff step
+                attempt = 0
+                continue
+
+            delay = self._backoff(attempt)
+            if expected and elapsed < expected:
+                # No point checking again long before a typical run would be done
+                delay = max(delay, min(expected - elapsed, self.long_poll_seconds))
+            delay = min(delay, max(deadline - time.monotonic(), 0))
+            attempt += 1
+            if delay > 0:
+                time.sleep(delay)
+                with self._lock:
+                    self.metrics.sleep_seconds += delay
+
+        self._finish(run_id, data, started, flagged or self._is_outlier(data, expected))
+        return data
+
+    def _get_status(self, run_id: str, wait_for: int) -> Dict:
+        url = (
+            f"{self.base_url}/actor-runs/{urllib.parse.quote(run_id)}"
+            f"?token={urllib.parse.quote(self.token or '')}&waitForFinish={max(wait_for, 0)}"
+        )
+        response = self.http.get(url, timeout=wait_for + 30)
+        response.raise_for_status()
+        with self._lock:
+            self.metrics.status_calls += 1
+        return response.json().get("data") or {}
+
+    def _backoff(self, attempt: int) -> float:
+        cap = min(self.max_backoff, self.initial_backoff * (2 ** attempt))
+        return random.uniform(cap / 2, cap)
+
+    def _is_outlier(self, data: Dict, expected: Optional[float]) -> bool:
+        duration = self._run_duration(data)
+        return bool(expected and duration and duration > expected * self.outlier_factor)
+
+    @staticmethod
+    def _run_duration(data: Dict) -> Optional[float]:
+        started_at, finished_at = data.get("startedAt"), data.get("finishedAt")
+        if not started_at or not finished_at:
+            return None
+        try:
+            start = datetime.fromisoformat(str(started_at).replace("Z", "+00:00"))
+            end = datetime.fromisoformat(str(finished_at).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        return max((end - start).total_seconds(), 0.0)
+
+    def _finish(self, run_id: str, data: Dict, started: float, outlier: bool) -> None:
+        waited = time.monotonic() - started
+        duration = self._run_duration(data)
+        with self._lock:
+            self.metrics.runs += 1
+            self.metrics.wait_seconds += waited
+            if outlier:
+                self.metrics.outliers += 1
+            if self.conn is None:
+                return
+            self.conn.execute(
+                """
+                INSERT INTO actor_run_history(run_id, actor_id, status, started_at, finished_at, duration_seconds, is_outlier)
+                VALUES(?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(run_id) DO UPDATE SET
+                    status = excluded.status,
+                    finished_at = excluded.finished_at,
+                    duration_seconds = excluded.duration_seconds,
+                    is_outlier = excluded.is_outlier
+                """,
+                (
+                    run_id,
+                    self.actor_id,
+                    data.get("status"),
+                    data.get("startedAt"),
+                    data.get("finishedAt"),
+                    duration,
+                    int(outlier),
+                ),
+            )
+            self.conn.commit()
@@ -0,0 +1,93 @@
+import re
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+# Queries using FTS5 syntax (phrases, boolean operators, prefixes, column filters) are
+# passed through as written; anything else is treated as a list of plain terms.
+FTS_SYNTAX_RE = re.compile(r'"|\b(?:AND|OR|NOT|NEAR)\b|[*()^:]')
+WORD_RE = re.compile(r"\w+")
+
+
+@dataclass
+class SearchHit:
+    post_id: str
+    author: str
+    created_at: Optional[str]
+    category: str
+    url: Optional[str]
+    snippet: str
+    score: float
+
+
+def match_query(query: str) -> str:
+    """
+    Turn user input into an FTS5 MATCH expression.
+
+    Plain input like `$CCJ uranium` becomes `"$CCJ" "uranium"`, i.e. every term must
+    appear. Quoting keeps tickers, hashtags and hyphenated words from being read as
+    FTS5 operators; the tokenizer drops the `$`/`#` so `$CCJ` also matches `CCJ`.
+    """
+    query = query.strip()
+    if FTS_SYNTAX_RE.search(query):
+        return query
+    terms = [term for term in query.split() if WORD_RE.search(term)]
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def search_posts(
+    conn: sqlite3.Connection,
+    query: str,
+    author: Optional[str] = None,
+    category: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 20,
+) -> List[SearchHit]:
+    """
+    Full-text search over post text, best BM25 match first.
+
+    Filters apply to the author handle (case-insensitive), `accounts.category` and
+    `created_ts` (`since` inclusive, `until` exclusive). Snippets mark matched terms
+    with `**` for Markdown. Raises ValueError for an empty or malformed query.
+    """
+    expression = match_query(query)
+    if not expression:
+        raise ValueError("Search query has no searchable terms")
+
+    filters = []
+    params: List = [expression]
+    if author:
+        filters.append("p.author = ?")
+        params.append(author.lstrip("@").lower())
+    if category:
+        filters.append("COALESCE(a.category, 'Uncategorized') = ?")
+        params.append(category)
+    if since:
+        filters.append("p.created_ts >= ?")
+        params.append(int(since.timestamp()))
+    if until:
+        filters.append("p.created_ts < ?")
+        params.append(int(until.timestamp()))
+    params.append(limit)
+
+    try:
+        rows = conn.execute(
+            f"""
+            SELECT p.id, p.author, p.created_at, COALESCE(a.category, 'Uncategorized'), p.url,
+                   snippet(posts_fts, 0, '**', '**', '…', 24), bm25(posts_fts) AS score
+            FROM posts_fts
+            JOIN posts p ON p.id = posts_fts.post_id
+            LEFT JOIN accounts a ON a.handle = p.author
+            WHERE posts_fts MATCH ? {''.join(' AND ' + f for f in filters)}
+            ORDER BY score
+            LIMIT ?
+            """,
+            params,
+        ).fetchall()
+    except sqlite3.OperationalError as exc:
+        if "fts5" in str(exc) or "syntax" in str(exc):
+            raise ValueError(f"Invalid search query {query!r}: {exc}") from exc
+        raise
+    return [SearchHit(*row) for row in rows]
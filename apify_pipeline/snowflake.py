@@ -0,0 +1,73 @@
+"""
+Helpers for X/Twitter snowflake IDs.
+
+Since November 2010 tweet IDs are 64-bit snowflakes: the top 41 bits are milliseconds
+since the Twitter epoch, followed by 10 bits of worker ID and 12 bits of sequence.
+IDs therefore order by creation time, but only as integers: comparing them as
+strings breaks as soon as two IDs differ in length.
+"""
+from datetime import datetime, timezone
+from typing import Optional, Union
+
+TWITTER_EPOCH_MS = 1288834974657
+TIMESTAMP_SHIFT = 22
+SEQUENCE_MASK = (1 << 12) - 1
+
+# Pre-snowflake IDs were sequential and stayed far below this, so they carry no time
+SNOWFLAKE_MIN_ID = 10**15
+
+IdLike = Union[int, str, None]
+
+
+def to_int(value: IdLike) -> Optional[int]:
+    """The ID as an integer, or None when it is missing or not numeric."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    value = str(value).strip()
+    return int(value) if value.isdigit() else None
+
+
+def id_key(value: IdLike) -> int:
+    """Sort key that orders IDs numerically; missing or non-numeric IDs sort first."""
+    as_int = to_int(value)
+    return -1 if as_int is None else as_int
+
+
+def is_newer(candidate: IdLike, reference: IdLike) -> bool:
+    """Whether `candidate` is a strictly larger ID than `reference` (False if either is unusable)."""
+    a, b = to_int(candidate), to_int(reference)
+    return a is not None and b is not None and a > b
+
+
+def is_snowflake(value: IdLike) -> bool:
+    as_int = to_int(value)
+    return as_int is not None and as_int >= SNOWFLAKE_MIN_ID
+
+
+def timestamp_ms(value: IdLike) -> Optional[int]:
+    """Creation time embedded in a snowflake ID, in epoch milliseconds."""
+    if not is_snowflake(value):
+        return None
+    return (to_int(value) >> TIMESTAMP_SHIFT) + TWITTER_EPOCH_MS
+
+
+def to_datetime(value: IdLike) -> Optional[datetime]:
+    ms = timestamp_ms(value)
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc) if ms is not None else None
+
+
+def id_floor(moment: Union[datetime, int, float]) -> int:
+    """
+    Smallest snowflake ID that can be created at `moment` (a datetime or epoch seconds).
+    Every tweet created at or after `moment` has an ID >= this, so `since_id:` with
+    `id_floor(t) - 1` selects tweets from `t` on.
+    """
+    seconds = moment.timestamp() if isinstance(moment, datetime) else float(moment)
+    return max(int(seconds * 1000) - TWITTER_EPOCH_MS, 0) << TIMESTAMP_SHIFT
+
+
+def make_id(moment: Union[datetime, int, float], sequence: int = 0) -> int:
+    """A snowflake ID for `moment` (used by the fake server and benchmarks)."""
+    return id_floor(moment) | (sequence & SEQUENCE_MASK)
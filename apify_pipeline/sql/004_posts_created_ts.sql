@@ -0,0 +1,11 @@
+-- Migration: normalized epoch-seconds timestamp on posts
+-- Lets daily/weekly loaders push the time-window cutoff into SQL instead of parsing every row in Python.
+
+ALTER TABLE posts ADD COLUMN created_ts INTEGER;
+
+-- Backfill from the ISO-8601 created_at text (rows that cannot be parsed stay NULL and are never loaded).
+UPDATE posts
+SET created_ts = CAST(strftime('%s', created_at) AS INTEGER)
+WHERE created_ts IS NULL AND created_at IS NOT NULL AND created_at <> '';
+
+CREATE INDEX IF NOT EXISTS idx_posts_created_ts ON posts(created_ts);
@@ -0,0 +1,38 @@
+-- Migration: merge the legacy since_ids / latest_timestamps tables into accounts
+-- accounts.since_id / accounts.latest_timestamp become the single source of crawl state.
+-- The legacy tables are replaced by read-only views with the same columns for compatibility.
+
+CREATE TABLE IF NOT EXISTS since_ids (
+    account TEXT PRIMARY KEY,
+    since_id TEXT
+);
+
+CREATE TABLE IF NOT EXISTS latest_timestamps (
+    account TEXT PRIMARY KEY,
+    latest_timestamp TEXT
+);
+
+INSERT OR IGNORE INTO accounts(handle, platform)
+SELECT LOWER(account), 'x' FROM since_ids WHERE account IS NOT NULL AND account <> ''
+UNION
+SELECT LOWER(account), 'x' FROM latest_timestamps WHERE account IS NOT NULL AND account <> '';
+
+-- Legacy rows took precedence over the accounts columns when reading, so keep that order here.
+UPDATE accounts
+SET since_id = COALESCE(
+        (SELECT s.since_id FROM since_ids s WHERE LOWER(s.account) = accounts.handle LIMIT 1),
+        since_id
+    ),
+    latest_timestamp = COALESCE(
+        (SELECT t.latest_timestamp FROM latest_timestamps t WHERE LOWER(t.account) = accounts.handle LIMIT 1),
+        latest_timestamp
+    );
+
+DROP TABLE since_ids;
+DROP TABLE latest_timestamps;
+
+CREATE VIEW IF NOT EXISTS since_ids AS
+SELECT handle AS account, since_id FROM accounts WHERE since_id IS NOT NULL;
+
+CREATE VIEW IF NOT EXISTS latest_timestamps AS
+SELECT handle AS account, latest_timestamp FROM accounts WHERE latest_timestamp IS NOT NULL;
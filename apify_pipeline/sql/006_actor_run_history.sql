@@ -0,0 +1,15 @@
+-- Migration: history of Apify actor runs
+-- Used by the run waiter to learn expected run durations and flag outliers.
+
+CREATE TABLE IF NOT EXISTS actor_run_history (
+    run_id TEXT PRIMARY KEY,
+    actor_id TEXT NOT NULL,
+    status TEXT,
+    started_at TEXT,
+    finished_at TEXT,
+    duration_seconds REAL,
+    is_outlier INTEGER NOT NULL DEFAULT 0,
+    recorded_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_actor_run_history_actor ON actor_run_history(actor_id, finished_at);
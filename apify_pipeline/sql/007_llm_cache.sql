@@ -0,0 +1,16 @@
+-- Migration: persistent LLM response cache
+-- Entries are keyed by a hash of model + messages + parameters. `scope` optionally tags an
+-- entry with its run window/category so reruns in the same window can reuse it.
+
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    scope TEXT,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    hit_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_llm_cache_scope ON llm_cache(scope, created_at);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used_at);
@@ -0,0 +1,24 @@
+-- Migration: persisted LLM summaries
+-- Each daily category summary is stored with its window and the posts it covered, so
+-- weekly runs can build on them instead of re-reading every post.
+
+CREATE TABLE IF NOT EXISTS summaries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    category TEXT NOT NULL,
+    model TEXT,
+    window_start INTEGER NOT NULL,
+    window_end INTEGER NOT NULL,
+    summary TEXT NOT NULL,
+    post_count INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS summary_posts (
+    summary_id INTEGER NOT NULL REFERENCES summaries(id) ON DELETE CASCADE,
+    post_id TEXT NOT NULL,
+    PRIMARY KEY (summary_id, post_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_summaries_kind_window ON summaries(kind, category, window_end);
+CREATE INDEX IF NOT EXISTS idx_summary_posts_post ON summary_posts(post_id);
@@ -0,0 +1,9 @@
+-- Migration: reply/conversation fields on posts
+-- Lets self-reply threads be reassembled into one logical post before summarizing and reporting.
+
+ALTER TABLE posts ADD COLUMN conversation_id TEXT;
+ALTER TABLE posts ADD COLUMN in_reply_to_id TEXT;
+ALTER TABLE posts ADD COLUMN in_reply_to_user TEXT;
+ALTER TABLE posts ADD COLUMN is_reply INTEGER NOT NULL DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS idx_posts_conversation ON posts(conversation_id);
@@ -0,0 +1,23 @@
+-- Migration: SimHash fingerprints and LSH band index for near-duplicate detection
+-- Reposts and light paraphrases across accounts share a cluster_id, so prompts and
+-- reports can keep one representative per cluster.
+
+CREATE TABLE IF NOT EXISTS post_fingerprints (
+    post_id TEXT PRIMARY KEY,
+    simhash INTEGER,              -- 64-bit SimHash stored signed; NULL when the text is too short
+    created_ts INTEGER,
+    cluster_id TEXT NOT NULL      -- post_id of the cluster's first post
+);
+
+CREATE INDEX IF NOT EXISTS idx_post_fingerprints_cluster ON post_fingerprints(cluster_id);
+CREATE INDEX IF NOT EXISTS idx_post_fingerprints_created_ts ON post_fingerprints(created_ts);
+
+-- One row per (band, band value) of each signature. created_ts is part of the key so a
+-- lookup only range-scans the posts inside the comparison window.
+CREATE TABLE IF NOT EXISTS post_simhash_bands (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    created_ts INTEGER NOT NULL,
+    post_id TEXT NOT NULL,
+    PRIMARY KEY (band, bucket, created_ts, post_id)
+) WITHOUT ROWID;
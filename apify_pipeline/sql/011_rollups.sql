@@ -0,0 +1,22 @@
+-- Migration: daily keyword and author-activity rollups
+-- Updated at ingest for each new post, so report keywords, per-author counts and
+-- week-over-week term deltas are SQL aggregates instead of re-tokenizing every post.
+
+CREATE TABLE IF NOT EXISTS term_daily (
+    day TEXT NOT NULL,            -- UTC date, YYYY-MM-DD
+    category TEXT NOT NULL,       -- accounts.category at ingest, or 'Uncategorized'
+    term TEXT NOT NULL,           -- normalize_text() token
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, category, term)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS author_daily (
+    day TEXT NOT NULL,
+    author TEXT NOT NULL,
+    post_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, author)
+) WITHOUT ROWID;
+
+-- Posts stored before this migration start at 0 and are rolled up on the next run
+ALTER TABLE posts ADD COLUMN rolled_up INTEGER NOT NULL DEFAULT 0;
+CREATE INDEX IF NOT EXISTS idx_posts_not_rolled_up ON posts(created_ts) WHERE rolled_up = 0;
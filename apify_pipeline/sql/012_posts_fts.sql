@@ -0,0 +1,30 @@
+-- Migration: full-text index over post text
+-- FTS5 table kept in sync with `posts` by triggers, backfilled from existing rows.
+-- post_id is stored (unindexed) rather than relying on posts.rowid, which VACUUM may
+-- renumber for a table with a TEXT primary key.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+    text,
+    post_id UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+
+INSERT INTO posts_fts(text, post_id)
+SELECT text, id FROM posts WHERE text IS NOT NULL;
+
+CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts
+WHEN new.text IS NOT NULL
+BEGIN
+    INSERT INTO posts_fts(text, post_id) VALUES (new.text, new.id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts
+BEGIN
+    DELETE FROM posts_fts WHERE post_id = old.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF text ON posts
+BEGIN
+    DELETE FROM posts_fts WHERE post_id = old.id;
+    INSERT INTO posts_fts(text, post_id) SELECT new.text, new.id WHERE new.text IS NOT NULL;
+END;
@@ -0,0 +1,38 @@
+-- Migration: store accounts.since_id as an INTEGER
+-- Snowflake IDs only order correctly as numbers ("999" > "1000" as text), and an
+-- integer column lets SQLite compare and MAX() them directly. SQLite cannot change a
+-- column type in place, so the table is rebuilt; the compatibility views from 005
+-- are dropped first and recreated on top of the new table.
+
+DROP VIEW IF EXISTS since_ids;
+DROP VIEW IF EXISTS latest_timestamps;
+
+CREATE TABLE accounts_new (
+    handle TEXT PRIMARY KEY,
+    platform TEXT NOT NULL DEFAULT 'x',
+    display_name TEXT,
+    profile_url TEXT,
+    since_id INTEGER,
+    latest_timestamp TEXT,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    category TEXT
+);
+
+-- Non-numeric leftovers cannot be compared with real IDs, so they are dropped
+INSERT INTO accounts_new(
+    handle, platform, display_name, profile_url, since_id, latest_timestamp, created_at, updated_at, category
+)
+SELECT handle, platform, display_name, profile_url,
+       CASE WHEN TRIM(since_id) <> '' AND TRIM(since_id) NOT GLOB '*[^0-9]*' THEN CAST(TRIM(since_id) AS INTEGER) END,
+       latest_timestamp, created_at, updated_at, category
+FROM accounts;
+
+DROP TABLE accounts;
+ALTER TABLE accounts_new RENAME TO accounts;
+
+CREATE VIEW IF NOT EXISTS since_ids AS
+SELECT handle AS account, since_id FROM accounts WHERE since_id IS NOT NULL;
+
+CREATE VIEW IF NOT EXISTS latest_timestamps AS
+SELECT handle AS account, latest_timestamp FROM accounts WHERE latest_timestamp IS NOT NULL;
@@ -0,0 +1,16 @@
+-- Migration: per-account fetch caps and how many new posts each run found
+-- The fetch budget planner reads the latest row per account: an account that filled
+-- its cap, or whose actor run stopped at maxItems, was probably truncated, so its next
+-- cap is raised.
+
+CREATE TABLE IF NOT EXISTS fetch_budget_history (
+    handle TEXT NOT NULL,
+    run_at INTEGER NOT NULL,      -- epoch seconds when the fetch finished
+    cap INTEGER NOT NULL,         -- posts the account was allowed this run
+    fetched INTEGER NOT NULL,     -- new posts the actor returned for it (before the cap)
+    expected REAL,                -- new posts predicted from the posting rate
+    run_capped INTEGER NOT NULL DEFAULT 0,  -- the actor run returned maxItems items
+    PRIMARY KEY (handle, run_at)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_fetch_budget_history_run_at ON fetch_budget_history(run_at);
@@ -0,0 +1,15 @@
+-- Migration: per-run fetch accounting
+-- items_returned / new_posts is the run's overfetch ratio: how many dataset items the
+-- actor returned (and billed) for every post that was not already stored.
+
+CREATE TABLE IF NOT EXISTS fetch_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_at INTEGER NOT NULL,         -- epoch seconds
+    accounts INTEGER NOT NULL,
+    max_items INTEGER,               -- sum of maxItems over the run's shards
+    items_returned INTEGER NOT NULL,
+    new_posts INTEGER NOT NULL,
+    overlap_seconds INTEGER          -- search window overlap used for the run
+);
+
+CREATE INDEX IF NOT EXISTS idx_fetch_runs_run_at ON fetch_runs(run_at);
@@ -0,0 +1,23 @@
+-- Migration: rolling Feishu documents and converted-block cache for incremental publishing
+-- One document per period (a day, or an ISO week for weekly reports). Each run diffs the
+-- report's sections against `sections` and rewrites only the ones whose hash changed.
+
+CREATE TABLE IF NOT EXISTS feishu_documents (
+    period TEXT PRIMARY KEY,         -- e.g. daily:2026-10-18, weekly:2026-W42
+    document_id TEXT NOT NULL,
+    url TEXT,
+    title TEXT,
+    sections TEXT NOT NULL,          -- JSON [{"hash": ..., "block_ids": [...]}] in document order
+    created_at INTEGER NOT NULL,     -- epoch seconds
+    updated_at INTEGER NOT NULL
+);
+
+-- Blocks returned by /docx/v1/document/convert, keyed by the SHA-256 of a section's Markdown
+CREATE TABLE IF NOT EXISTS feishu_block_cache (
+    section_hash TEXT PRIMARY KEY,
+    blocks TEXT NOT NULL,            -- JSON list of docx blocks
+    created_at INTEGER NOT NULL,
+    last_used_at INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_feishu_block_cache_last_used ON feishu_block_cache(last_used_at);
@@ -0,0 +1,11 @@
+-- Migration: per-day document frequencies for report themes
+-- Themes score the window against the preceding weeks of posts. Each finished UTC day's
+-- document frequencies are counted once and reused until posts are added to that day.
+
+CREATE TABLE IF NOT EXISTS keyword_df_daily (
+    day TEXT NOT NULL,               -- UTC date, YYYY-MM-DD
+    engine TEXT NOT NULL,            -- KeywordEngine.signature (stopwords + n-gram size)
+    posts INTEGER NOT NULL,          -- posts with text that day when counted
+    df TEXT NOT NULL,                -- JSON {term: number of posts containing it}
+    PRIMARY KEY (day, engine)
+) WITHOUT ROWID;
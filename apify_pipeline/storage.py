@@ -0,0 +1,326 @@
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Union
+
+from apify_pipeline.models import PostLike, as_post
+from apify_pipeline.near_duplicates import fingerprint_posts
+from apify_pipeline.rollups import rollup_posts
+
+PragmaValue = Union[str, int]
+
+DEFAULT_PRAGMAS: Dict[str, PragmaValue] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -65536,  # negative = KiB, i.e. 64 MiB page cache
+    "mmap_size": 268435456,  # 256 MiB
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,
+}
+
+ALLOWED_PRAGMAS = {
+    "journal_mode",
+    "synchronous",
+    "cache_size",
+    "mmap_size",
+    "temp_store",
+    "busy_timeout",
+    "wal_autocheckpoint",
+    "foreign_keys",
+}
+
+POST_COLUMNS = (
+    "id",
+    "author",
+    "created_at",
+    "created_ts",
+    "text",
+    "url",
+    "conversation_id",
+    "in_reply_to_id",
+    "in_reply_to_user",
+    "is_reply",
+    "rolled_up",
+)
+
+# Rows per multi-row INSERT ... RETURNING statement (11 bound columns per row keeps
+# us under the 999-variable limit of older SQLite builds).
+INSERT_CHUNK_SIZE = 90
+
+SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+
+@dataclass
+class IngestResult:
+    inserted: List[str] = field(default_factory=list)
+    duplicates: List[str] = field(default_factory=list)
+
+    @property
+    def inserted_count(self) -> int:
+        return len(self.inserted)
+
+    @property
+    def duplicate_count(self) -> int:
+        return len(self.duplicates)
+
+
+def apply_pragmas(conn: sqlite3.Connection, pragmas: Optional[Dict[str, PragmaValue]]) -> None:
+    for name, value in (pragmas or {}).items():
+        if name not in ALLOWED_PRAGMAS:
+            raise ValueError(f"Unsupported SQLite pragma: {name}")
+        if not re.fullmatch(r"-?\w+", str(value)):
+            raise ValueError(f"Invalid value for PRAGMA {name}: {value!r}")
+        conn.execute(f"PRAGMA {name}={value}").fetchall()
+
+
+def init_db(
+    db_path: Path,
+    pragmas: Optional[Dict[str, PragmaValue]] = None,
+    check_same_thread: bool = True,
+) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=check_same_thread)
+    apply_pragmas(conn, pragmas)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS posts (
+            id TEXT PRIMARY KEY,
+            author TEXT,
+            created_at TEXT,
+            text TEXT,
+            url TEXT,
+            is_summarized INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    apply_sql_migrations(conn, Path(__file__).parent / "sql")
+    conn.commit()
+    return conn
+
+
+def apply_sql_migrations(conn: sqlite3.Connection, migrations_dir: Path) -> None:
+    migrations_dir.mkdir(parents=True, exist_ok=True)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name TEXT PRIMARY KEY,
+            applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    conn.commit()
+
+    applied = {row[0] for row in conn.execute("SELECT name FROM schema_migrations")}
+    for path in sorted(migrations_dir.glob("*.sql")):
+        name = path.name
+        if name in applied:
+            continue
+        sql = path.read_text(encoding="utf-8")
+        conn.executescript(sql)
+        conn.execute("INSERT INTO schema_migrations(name) VALUES (?)", (name,))
+    conn.commit()
+
+
+def ingest_posts(
+    conn: sqlite3.Connection, posts: Iterable[PostLike], fingerprint: bool = True, rollup: bool = True
+) -> IngestResult:
+    """
+    Write posts, their accounts and media without committing.
+
+    New posts are detected with `INSERT ... ON CONFLICT DO NOTHING RETURNING id`, so the
+    result tells callers exactly which IDs were inserted and which were already stored.
+    With `fingerprint`, newly inserted posts are also SimHashed and assigned to a
+    near-duplicate cluster. With `rollup`, they are added to the daily keyword and
+    author-activity rollups (posts ingested without it are picked up by
+    `backfill_rollups`).
+    """
+    accounts: Set[str] = set()
+    media_rows = []
+    post_rows = []
+
+    for post in posts:
+        post = as_post(post)
+        post_id = post.id
+        author = post.author
+        post_rows.append(
+            (
+                post_id,
+                author,
+                post.created_at or None,
+                post.created_ts,
+                post.text,
+                post.url,
+                post.conversation_id,
+                post.in_reply_to_id,
+                post.in_reply_to_user,
+                int(post.is_reply),
+                int(rollup),
+            )
+        )
+        if author:
+            accounts.add(author)
+
+        for idx, media in enumerate(post.media):
+            media_id = media.get("id") or media.get("media_key") or f"{post_id}-media-{idx}"
+            media_rows.append(
+                (
+                    str(media_id),
+                    post_id,
+                    media.get("type"),
+                    media.get("url"),
+                    media.get("preview_url"),
+                    media.get("width"),
+                    media.get("height"),
+                    media.get("description"),
+                )
+            )
+
+    if accounts:
+        conn.executemany(
+            """
+            INSERT INTO accounts(handle, platform)
+            VALUES(?, 'x')
+            ON CONFLICT(handle) DO NOTHING
+            """,
+            [(account,) for account in accounts],
+        )
+
+    columns = ", ".join(POST_COLUMNS)
+    row_placeholder = "(" + ", ".join("?" * len(POST_COLUMNS)) + ")"
+    inserted: Set[str] = set()
+    for start in range(0, len(post_rows), INSERT_CHUNK_SIZE):
+        chunk = post_rows[start : start + INSERT_CHUNK_SIZE]
+        if SUPPORTS_RETURNING:
+            placeholders = ", ".join([row_placeholder] * len(chunk))
+            params = [value for row in chunk for value in row]
+            cur = conn.execute(
+                f"""
+                INSERT INTO posts({columns})
+                VALUES {placeholders}
+                ON CONFLICT(id) DO NOTHING
+                RETURNING id
+                """,
+                params,
+            )
+            inserted.update(row[0] for row in cur.fetchall())
+        else:
+            ids = [row[0] for row in chunk]
+            existing = {
+                row[0]
+                for row in conn.execute(
+                    f"SELECT id FROM posts WHERE id IN ({', '.join('?' * len(ids))})", ids
+                )
+            }
+            conn.executemany(
+                f"INSERT OR IGNORE INTO posts({columns}) VALUES{row_placeholder}",
+                chunk,
+            )
+            inserted.update(pid for pid in ids if pid not in existing)
+
+    if media_rows:
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO media(id, post_id, type, url, preview_url, width, height, description)
+            VALUES(?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            media_rows,
+        )
+
+    result = IngestResult()
+    for row in post_rows:
+        post_id = row[0]
+        if post_id in inserted:
+            result.inserted.append(post_id)
+            inserted.discard(post_id)  # a repeated ID later in the same batch is a duplicate
+        else:
+            result.duplicates.append(post_id)
+
+    if result.inserted:
+        # First occurrence of each new ID
+        new_rows = {row[0]: row for row in reversed(post_rows)}
+        inserted_rows = [new_rows[pid] for pid in result.inserted]
+        if fingerprint:
+            # Oldest first so a cluster is named after its earliest post
+            fingerprint_posts(
+                conn,
+                sorted(((row[0], row[4], row[3]) for row in inserted_rows), key=lambda row: (row[2] or 0, row[0])),
+            )
+        if rollup:
+            rollup_posts(conn, [(row[0], row[1], row[3], row[4]) for row in inserted_rows])
+    return result
+
+
+def mark_summarized(conn: sqlite3.Connection, post_ids: Iterable[str]) -> None:
+    """Flag posts as summarized without committing."""
+    conn.executemany(
+        "UPDATE posts SET is_summarized = 1 WHERE id = ?",
+        [(pid,) for pid in post_ids],
+    )
+
+
+class PostStore:
+    """
+    SQLite-backed post storage tuned for ingest throughput.
+
+    The writer connection runs in WAL mode with configurable pragmas and is guarded by a
+    lock, so it can be shared across threads. Each ingest batch is a single transaction.
+    Other stages call `reader()` to get a per-thread connection; in WAL mode those reads
+    are not blocked by an in-flight ingest.
+    """
+
+    def __init__(self, db_path: Path, pragmas: Optional[Dict[str, PragmaValue]] = None):
+        self.db_path = db_path
+        self.pragmas: Dict[str, PragmaValue] = {**DEFAULT_PRAGMAS, **(pragmas or {})}
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self.conn = init_db(db_path, self.pragmas, check_same_thread=False)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            if self.conn.in_transaction:
+                # Flush implicit work so the batch starts in its own transaction
+                self.conn.commit()
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.rollback()
+                raise
+            self.conn.commit()
+
+    def ingest(self, posts: Iterable[PostLike]) -> IngestResult:
+        with self.transaction() as conn:
+            return ingest_posts(conn, posts)
+
+    def mark_summarized(self, post_ids: List[str]) -> None:
+        if not post_ids:
+            return
+        with self.transaction() as conn:
+            mark_summarized(conn, post_ids)
+
+    def reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self.connect()
+            self._local.conn = conn
+        return conn
+
+    def connect(self) -> sqlite3.Connection:
+        """Open an extra connection (closed with the store) for a component that needs its own."""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        apply_pragmas(conn, {k: v for k, v in self.pragmas.items() if k != "journal_mode"})
+        with self._lock:
+            self._readers.append(conn)
+        return conn
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+            self.conn.close()
@@ -0,0 +1,177 @@
+import asyncio
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass, field
+from typing import AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from apify_pipeline.models import Post
+from apify_pipeline.threads import member_ids
+
+CategoryJob = Tuple[str, List[Post]]
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Take `amount` tokens, sleeping until they are available. Returns seconds waited."""
+        # A single request larger than the bucket would otherwise never be admitted
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class RateLimiter:
+    """Requests/min and tokens/min limits for one LLM provider. A falsy limit disables that bucket."""
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def acquire(self, estimated_tokens: int) -> float:
+        waited = 0.0
+        if self.requests:
+            waited += self.requests.acquire(1)
+        if self.tokens:
+            waited += self.tokens.acquire(estimated_tokens)
+        return waited
+
+
+class ProviderRateLimits:
+    """One RateLimiter per provider, created on first use with the configured limits."""
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._limiters: Dict[str, RateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def for_provider(self, provider: str) -> RateLimiter:
+        with self._lock:
+            if provider not in self._limiters:
+                self._limiters[provider] = RateLimiter(self.requests_per_minute, self.tokens_per_minute)
+            return self._limiters[provider]
+
+
+def provider_for(model: str, base_url: Optional[str] = None) -> str:
+    if base_url:
+        host = urllib.parse.urlparse(base_url).hostname
+        if host:
+            return host
+    return "deepseek" if model.lower().startswith("deepseek") else "openai"
+
+
+def estimate_prompt_tokens(
+    posts: List[Post],
+    max_posts: int,
+    token_budget: Optional[int] = None,
+    per_post_chars: int = 400,
+    overhead: int = 1500,
+) -> int:
+    """
+    Rough prompt size: ~1 token per CJK char / 4 Latin chars, averaged to ~1 token per 2 chars.
+    Prompts packed to a `token_budget` never exceed it.
+    """
+    if max_posts and max_posts > 0:
+        posts = posts[:max_posts]
+    if token_budget:
+        chars = sum(len(p.text or "") + 60 for p in posts)
+        return min(token_budget, overhead + chars // 2)
+    chars = sum(min(len(p.text or ""), per_post_chars) + 60 for p in posts)
+    return overhead + chars // 2
+
+
+def estimate_text_tokens(texts: Iterable[str], overhead: int = 1500) -> int:
+    """Same heuristic as `estimate_prompt_tokens`, for prompts built from arbitrary texts."""
+    return overhead + sum(len(text or "") for text in texts) // 2
+
+
+@dataclass
+class CategorySummaries:
+    results: Dict[str, str] = field(default_factory=dict)
+    failures: Dict[str, BaseException] = field(default_factory=dict)
+    post_ids: Dict[str, List[str]] = field(default_factory=dict)
+
+
+async def summarize_categories_async(
+    jobs: AsyncIterable[CategoryJob],
+    summarize: Callable[[str, List[Post]], str],
+    max_concurrency: int = 3,
+    limiter: Optional[RateLimiter] = None,
+    estimate_tokens: Callable[[List[Post]], int] = lambda posts: estimate_prompt_tokens(posts, 0),
+    on_result: Optional[Callable[[str, str], Awaitable[None]]] = None,
+    on_error: Optional[Callable[[str, BaseException], None]] = None,
+) -> CategorySummaries:
+    """
+    Run `summarize(category, posts)` for jobs that arrive over time, e.g. as each
+    category's posts finish storing. Each `summarize` call runs in a worker thread; the
+    next job is only pulled once fewer than `max_concurrency` are in flight, so only that
+    many categories' posts are held in memory. Failures are collected in `failures` and
+    reported through `on_error`. Every summary is passed to the awaited `on_result` as
+    soon as it completes, not when the next job is pulled. The returned `results` keep
+    the order the jobs arrived in.
+    """
+    outcome = CategorySummaries()
+    order: List[str] = []
+    slots = asyncio.Semaphore(max(max_concurrency, 1))
+
+    def run(category: str, posts: List[Post]) -> str:
+        if limiter:
+            limiter.acquire(estimate_tokens(posts))
+        return summarize(category, posts)
+
+    async def summarize_job(category: str, posts: List[Post]) -> None:
+        try:
+            summary = await asyncio.to_thread(run, category, posts)
+        except Exception as exc:
+            outcome.failures[category] = exc
+            outcome.post_ids.pop(category, None)
+            if on_error:
+                on_error(category, exc)
+            return
+        finally:
+            slots.release()
+        if summary:
+            outcome.results[category] = summary
+            if on_result:
+                await on_result(category, summary)
+        else:
+            outcome.post_ids.pop(category, None)
+
+    tasks: List[asyncio.Task] = []
+    iterator = jobs.__aiter__()
+    try:
+        while True:
+            await slots.acquire()
+            try:
+                category, posts = await iterator.__anext__()
+            except StopAsyncIteration:
+                slots.release()
+                break
+            order.append(category)
+            outcome.post_ids[category] = [pid for p in posts for pid in member_ids(p)]
+            tasks.append(asyncio.create_task(summarize_job(category, posts)))
+    finally:
+        # Summaries already started are finished (and reported) even if the jobs fail
+        await asyncio.gather(*tasks)
+
+    outcome.results = {cat: outcome.results[cat] for cat in order if cat in outcome.results}
+    return outcome
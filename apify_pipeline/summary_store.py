@@ -0,0 +1,94 @@
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set
+
+
+@dataclass
+class StoredSummary:
+    id: int
+    kind: str
+    category: str
+    model: Optional[str]
+    window_start: int
+    window_end: int
+    summary: str
+    post_count: int
+
+    @property
+    def label(self) -> str:
+        start = datetime.fromtimestamp(self.window_start, tz=timezone.utc)
+        end = datetime.fromtimestamp(self.window_end, tz=timezone.utc)
+        return f"{start:%Y-%m-%d %H:%M} ~ {end:%Y-%m-%d %H:%M} UTC, {self.post_count} posts"
+
+
+class SummaryRepository:
+    """
+    Category summaries stored in `summaries`, with the posts each one covered in
+    `summary_posts`.
+
+    `add` does not commit, so callers can record a summary in the same transaction that
+    marks its posts as summarized.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def add(
+        self,
+        kind: str,
+        category: str,
+        model: Optional[str],
+        window_start: int,
+        window_end: int,
+        summary: str,
+        post_ids: Iterable[str],
+    ) -> int:
+        ids = list(dict.fromkeys(post_ids))
+        cur = self.conn.execute(
+            """
+            INSERT INTO summaries(kind, category, model, window_start, window_end, summary, post_count)
+            VALUES(?, ?, ?, ?, ?, ?, ?)
+            """,
+            (kind, category, model, window_start, window_end, summary, len(ids)),
+        )
+        summary_id = cur.lastrowid
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO summary_posts(summary_id, post_id) VALUES(?, ?)",
+            [(summary_id, pid) for pid in ids],
+        )
+        return summary_id
+
+    def covering_posts_since(self, kind: str, since_ts: int) -> Dict[str, List[StoredSummary]]:
+        """Summaries of `kind` covering at least one post created at or after `since_ts`, by category, oldest first."""
+        cur = self.conn.execute(
+            """
+            SELECT id, kind, category, model, window_start, window_end, summary, post_count
+            FROM summaries
+            WHERE kind = ? AND id IN (
+                SELECT sp.summary_id FROM summary_posts sp
+                JOIN posts p ON p.id = sp.post_id
+                WHERE p.created_ts >= ?
+            )
+            ORDER BY category, window_end, id
+            """,
+            (kind, since_ts),
+        )
+        by_category: Dict[str, List[StoredSummary]] = {}
+        for row in cur:
+            summary = StoredSummary(*row)
+            by_category.setdefault(summary.category, []).append(summary)
+        return by_category
+
+    def covered_post_ids(self, kind: str, since_ts: int) -> Set[str]:
+        """IDs of posts created at or after `since_ts` that some summary of `kind` already covers."""
+        cur = self.conn.execute(
+            """
+            SELECT DISTINCT sp.post_id FROM summary_posts sp
+            JOIN summaries s ON s.id = sp.summary_id
+            JOIN posts p ON p.id = sp.post_id
+            WHERE s.kind = ? AND p.created_ts >= ?
+            """,
+            (kind, since_ts),
+        )
+        return {row[0] for row in cur}
@@ -0,0 +1,78 @@
+from itertools import groupby
+from typing import Dict, Iterable, Iterator, List
+
+from apify_pipeline.models import Post
+
+
+def member_ids(post: Post) -> List[str]:
+    """IDs of the stored posts behind `post` (several for a collapsed thread or near-duplicate cluster)."""
+    return list(post.thread_ids or (post.id,)) + list(post.duplicate_ids)
+
+
+def collapse_threads(posts: Iterable[Post]) -> Iterator[Post]:
+    """
+    Merge self-reply threads into one logical post.
+
+    `posts` must come grouped by category and author (as `iter_posts_since` yields them).
+    Only one author's posts are held at a time. A post joins its parent when it replies to
+    a post by the same author in the same run. If the parent is outside the window, the
+    post joins the other self-replies of its conversation instead. Merged posts keep the
+    first post's ID, timestamp and URL. Their texts are joined in time order, and
+    `thread_ids` lists every member.
+    """
+    for _, group in groupby(posts, key=lambda p: (p.category, p.author)):
+        yield from _collapse_author_posts(list(group))
+
+
+def _collapse_author_posts(posts: List[Post]) -> Iterator[Post]:
+    if len(posts) < 2:
+        yield from posts
+        return
+
+    author = posts[0].author
+    by_id = {post.id: post for post in posts}
+    parent = {post_id: post_id for post_id in by_id}
+
+    def find(post_id: str) -> str:
+        while parent[post_id] != post_id:
+            parent[post_id] = parent[parent[post_id]]
+            post_id = parent[post_id]
+        return post_id
+
+    def union(a: str, b: str) -> None:
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[root_b] = root_a
+
+    conversation_anchor: Dict[str, str] = {}
+    for post in posts:
+        reply_to = post.in_reply_to_id
+        if not reply_to:
+            continue
+        if reply_to in by_id:
+            union(reply_to, post.id)
+            continue
+        reply_user = (post.in_reply_to_user or "").lower()
+        conversation = post.conversation_id
+        if reply_user != author or not conversation:
+            continue
+        if conversation in by_id:
+            union(conversation, post.id)
+        else:
+            union(conversation_anchor.setdefault(conversation, post.id), post.id)
+
+    groups: Dict[str, List[Post]] = {}
+    for post in posts:
+        groups.setdefault(find(post.id), []).append(post)
+    for members in groups.values():
+        yield members[0] if len(members) == 1 else _merge_thread(members)
+
+
+def _merge_thread(members: List[Post]) -> Post:
+    return members[0].replace(
+        text="\n".join((member.text or "").strip() for member in members),
+        media=[media for member in members for media in member.media],
+        thread_ids=[member.id for member in members],
+        duplicate_ids=[pid for member in members for pid in member.duplicate_ids],
+        is_summarized=all(member.is_summarized for member in members),
+    )
@@ -1,4 +1,17 @@
 from .config import FeishuConfig
 from .client import FeishuClient
+from .incremental import BlockCache, DocumentState, MemoryBlockCache, SectionBlocks, UpdateResult
+from .markdown import markdown_to_blocks
+from .publish import PublishResult
 
-__all__ = ["FeishuConfig", "FeishuClient"]
+__all__ = [
+    "FeishuConfig",
+    "FeishuClient",
+    "PublishResult",
+    "BlockCache",
+    "DocumentState",
+    "MemoryBlockCache",
+    "SectionBlocks",
+    "UpdateResult",
+    "markdown_to_blocks",
+]
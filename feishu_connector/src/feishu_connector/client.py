@@ -1,15 +1,56 @@
+import difflib
 import json
+import random
+import threading
 import time
+import urllib.parse
 from typing import Optional, Tuple
 
 import requests
 from .config import FeishuConfig
+from .incremental import BlockCache, DocumentState, Section, SectionBlocks, UpdateResult, split_sections
+from .markdown import blocks_from_flat, count_blocks, flatten_blocks, has_nested, markdown_to_blocks
+from .publish import PublishGraph, PublishResult
+
+# 创建子块接口单次最多 50 个子块；创建嵌套块接口单次最多 1000 个块 (含所有子孙块)
+MAX_CHILDREN_PER_REQUEST = 50
+MAX_DESCENDANTS_PER_REQUEST = 1000
+# 获取子块接口单页最多 500 个
+MAX_CHILDREN_PAGE_SIZE = 500
+# 单个文档写入的块数上限，超过时拆分为多个子文档 (尽量在标题处断开)
+MAX_BLOCKS_PER_DOC = 2000
+# 频率限制: HTTP 429 或业务码 99991400 (请求频率超限)
+RATE_LIMIT_CODES = {99991400}
+MAX_RATE_LIMIT_RETRIES = 5
+MAX_RATE_LIMIT_BACKOFF = 30.0
+# 标题块 (heading1-heading9)
+HEADING_BLOCK_TYPES = range(3, 12)
 
 
 class FeishuClient:
-    def __init__(self, config: FeishuConfig) -> None:
+    def __init__(
+        self,
+        config: FeishuConfig,
+        session=None,
+        max_workers: int = 4,
+        max_blocks_per_doc: int = MAX_BLOCKS_PER_DOC,
+        remote_convert: bool = False,
+    ) -> None:
+        """
+        session: 可选的 HTTP 会话 (需提供与 requests.Session.request 相同签名的 request 方法)，
+        用于复用连接池与重试策略；默认创建一个 requests.Session，多次调用之间保持长连接。
+        max_workers: 发布时并发执行的步骤数。
+        max_blocks_per_doc: 单个文档的块数上限，超出的内容拆分到子文档。
+        remote_convert: 使用飞书 /docx/v1/document/convert 接口转换 Markdown；默认在本地转换
+        (feishu_connector.markdown)，发布时少一次网络往返。
+        """
         self.config = config
+        self.session = session or requests.Session()
+        self.max_workers = max(max_workers, 1)
+        self.max_blocks_per_doc = max(max_blocks_per_doc, 1)
+        self.remote_convert = remote_convert
         self._token_cache = {"access_token": "", "expire_at": 0}
+        self._token_lock = threading.Lock()
 
     def _request(
         self, method: str, url: str, token: Optional[str], payload: Optional[dict], timeout: int
@@ -17,10 +58,20 @@ class FeishuClient:
         headers = {"Content-Type": "application/json"}
         if token:
             headers["Authorization"] = f"Bearer {token}"
-        response = requests.request(method, url, headers=headers, json=payload, timeout=timeout)
-        try:
-            result = response.json()
-        except ValueError:
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            response = self.session.request(method, url, headers=headers, json=payload, timeout=timeout)
+            try:
+                result = response.json()
+            except ValueError:
+                result = None
+            code = result.get("code") if isinstance(result, dict) else None
+            # 被限流的请求未被处理，可安全重试
+            if (response.status_code == 429 or code in RATE_LIMIT_CODES) and attempt < MAX_RATE_LIMIT_RETRIES:
+                time.sleep(self._rate_limit_delay(response, attempt))
+                continue
+            break
+
+        if result is None:
             raise RuntimeError(
                 f"Feishu API invalid response ({response.status_code}): {response.text}"
             )
@@ -34,7 +85,23 @@ class FeishuClient:
 
         return result
 
+    @staticmethod
+    def _rate_limit_delay(response, attempt: int) -> float:
+        """优先使用 x-ogw-ratelimit-reset 响应头 (秒)，否则指数退避加抖动。"""
+        reset = response.headers.get("x-ogw-ratelimit-reset") if response.headers else None
+        try:
+            if reset is not None:
+                return min(max(float(reset), 0.0), MAX_RATE_LIMIT_BACKOFF)
+        except ValueError:
+            pass
+        cap = min(MAX_RATE_LIMIT_BACKOFF, 2 ** attempt)
+        return random.uniform(cap / 2, cap)
+
     def _get_tenant_token(self, force_refresh: bool = False) -> str:
+        with self._token_lock:
+            return self._fetch_tenant_token(force_refresh)
+
+    def _fetch_tenant_token(self, force_refresh: bool) -> str:
         now = time.time()
         cached_token = self._token_cache["access_token"]
         if not force_refresh and cached_token and now < self._token_cache["expire_at"]:
@@ -51,32 +118,320 @@ class FeishuClient:
         return token
 
     def create_doc_from_markdown(self, title: str, markdown_content: str) -> str:
-        token = self._get_tenant_token()
-        document_id, doc_url = self._create_doc(title, token)
+        return self.publish_markdown(title, markdown_content).url
+
+    def warm_up(self) -> None:
+        """提前获取 tenant token (缓存到过期前)，之后的发布少一次往返。"""
+        self._get_tenant_token()
+
+    def preconvert(self, markdown_content: str, block_cache: BlockCache) -> int:
+        """
+        在发布前转换 Markdown 的各段并写入 `block_cache`，之后发布包含这些段的报告时
+        直接使用缓存。返回新转换的段数。
+        """
+        converted = 0
+        for section in split_sections(markdown_content):
+            if block_cache.get_blocks(section.hash) is None:
+                token = self._get_tenant_token() if self.remote_convert else None
+                block_cache.put_blocks(section.hash, self._convert_markdown(section.markdown, token))
+                converted += 1
+        return converted
+
+    def publish_markdown(
+        self, title: str, markdown_content: str, block_cache: Optional[BlockCache] = None
+    ) -> PublishResult:
+        """
+        将 Markdown 发布为飞书文档，按依赖关系并发执行各步骤:
+
+        token -> (Markdown 转换 | 创建文档)；文档创建后 (添加群协作者 | 开启租户内分享 |
+        写入内容块) 并发执行。块数超过 `max_blocks_per_doc` 时，超出部分写入
+        "标题 (i/n)" 子文档，主文档开头插入各部分的链接。同一文档内的块按顺序分批写入。
+        传入 `block_cache` 时按段转换，缓存中已有的段 (例如 `preconvert` 过的) 不再转换。
+        """
+        graph = PublishGraph(self.max_workers)
+        graph.add("token", self._get_tenant_token)
+        sections: list[Section] = []
+        cached: dict[str, list[dict]] = {}
+        if block_cache is None:
+            self._add_convert_step(graph, "blocks", markdown_content)
+        else:
+            sections = split_sections(markdown_content)
+            cached = self._cached_blocks(sections, block_cache)
+            needed = list(dict.fromkeys(section.hash for section in sections if section.hash not in cached))
+            markdown_by_hash = {section.hash: section.markdown for section in sections}
+            for section_hash in needed:
+                self._add_convert_step(graph, f"convert:{section_hash}", markdown_by_hash[section_hash])
+
+            def assemble(*converted: list[dict]) -> list[dict]:
+                blocks_by_hash = {**cached, **dict(zip(needed, converted))}
+                return [block for section in sections for block in blocks_by_hash[section.hash]]
+
+            graph.add("blocks", assemble, *[f"convert:{h}" for h in needed])
+        self._add_document_steps(graph, 0, title)
+
+        def plan_parts(blocks: list[dict]) -> list[list[dict]]:
+            parts = self._split_blocks(blocks)
+            for idx in range(1, len(parts)):
+                self._add_document_steps(graph, idx, f"{title} ({idx + 1}/{len(parts)})")
+            for idx, part in enumerate(parts):
+                if part:
+                    graph.add(
+                        f"append:{idx}",
+                        lambda token, doc, part=part: self._append_blocks(doc[0], doc[0], part, token),
+                        "token",
+                        f"doc:{idx}",
+                    )
+            if len(parts) > 1:
+                docs = [f"doc:{idx}" for idx in range(len(parts))]
+                graph.add(
+                    "part_links",
+                    lambda token, _, *docs: self._insert_part_links(docs, token),
+                    "token",
+                    "append:0",
+                    *docs,
+                )
+            return parts
+
+        graph.add("parts", plan_parts, "blocks")
+        results = graph.run()
+        if block_cache is not None:
+            self._store_converted(results, sections, cached, block_cache)
+
+        token = results["token"]
+        documents = [
+            PublishResult(
+                document_id=results[f"doc:{idx}"][0],
+                url=self._document_url(results[f"doc:{idx}"], token),
+                title=title if idx == 0 else f"{title} ({idx + 1}/{len(results['parts'])})",
+                share_url=results.get(f"share:{idx}"),
+                block_count=len(part),
+            )
+            for idx, part in enumerate(results["parts"])
+        ]
+        main = documents[0]
+        main.sub_documents = documents[1:]
+        return main
+
+    def update_markdown(
+        self,
+        title: str,
+        markdown_content: str,
+        state: Optional[DocumentState] = None,
+        block_cache: Optional[BlockCache] = None,
+    ) -> UpdateResult:
+        """
+        增量更新滚动文档 (例如每天或每周一篇)。
+
+        Markdown 在标题处切分为段，与 `state` 中记录的各段哈希比较: 未变化的段保留原有块，
+        变化的段按记录的块 ID 定位、删除后在原处插入新块。只有 `block_cache` 中没有的段
+        才调用转换接口，各段并发转换。`state` 为空时新建文档；文档内容与记录的块 ID 不一致
+        (例如被手动编辑) 时整体重写。返回的 `UpdateResult.state` 供下次调用使用。
+        """
+        sections = split_sections(markdown_content)
+        cached = self._cached_blocks(sections, block_cache) if block_cache is not None else {}
+        result = UpdateResult(state=state, created=state is None)
+
+        graph = PublishGraph(self.max_workers)
+        graph.add("token", self._get_tenant_token)
+        if state is None:
+            self._add_document_steps(graph, 0, title)
+            graph.add("children", lambda token: [], "token")
+        else:
+            graph.add("doc:0", lambda: (state.document_id, state.url))
+            graph.add("children", lambda token: self._list_child_ids(state.document_id, token), "token")
+
+        def plan(children: list[str]) -> None:
+            old = state.sections if state is not None else []
+            if children != [block_id for section in old for block_id in section.block_ids]:
+                result.rebuilt = True
+                old = []
+            opcodes = difflib.SequenceMatcher(
+                None, [s.hash for s in old], [s.hash for s in sections], autojunk=False
+            ).get_opcodes()
+            # 只转换需要写入且未缓存的段，相同内容的段只转换一次
+            needed = list(
+                dict.fromkeys(
+                    section.hash
+                    for tag, _, _, j1, j2 in opcodes
+                    if tag != "equal"
+                    for section in sections[j1:j2]
+                    if section.hash not in cached
+                )
+            )
+            markdown_by_hash = {section.hash: section.markdown for section in sections}
+            for section_hash in needed:
+                self._add_convert_step(graph, f"convert:{section_hash}", markdown_by_hash[section_hash])
+            result.conversions = len(needed)
+
+            def write(token: str, doc: tuple, *converted: list[dict]) -> list[SectionBlocks]:
+                blocks_by_hash = {**cached, **dict(zip(needed, converted))}
+                return self._write_sections(doc[0], token, old, len(children), sections, opcodes, blocks_by_hash, result)
+
+            graph.add("write", write, "token", "doc:0", *[f"convert:{h}" for h in needed])
+
+        graph.add("plan", plan, "children")
+        results = graph.run()
+
+        if block_cache is not None:
+            self._store_converted(results, sections, cached, block_cache)
+        document_id = results["doc:0"][0]
+        url = state.url if state is not None else self._document_url(results["doc:0"], results["token"])
+        result.state = DocumentState(document_id, url, title, results["write"])
+        return result
+
+    @staticmethod
+    def _cached_blocks(sections: list[Section], block_cache: BlockCache) -> dict[str, list[dict]]:
+        cached: dict[str, list[dict]] = {}
+        for section in sections:
+            if section.hash not in cached:
+                blocks = block_cache.get_blocks(section.hash)
+                if blocks is not None:
+                    cached[section.hash] = blocks
+        return cached
+
+    @staticmethod
+    def _store_converted(
+        results: dict, sections: list[Section], cached: dict[str, list[dict]], block_cache: BlockCache
+    ) -> None:
+        """将本次转换 (`convert:<hash>` 步骤) 的结果写入缓存。"""
+        for section in sections:
+            blocks = results.get(f"convert:{section.hash}")
+            if blocks is not None and section.hash not in cached:
+                block_cache.put_blocks(section.hash, blocks)
+                cached[section.hash] = blocks
+
+    def _write_sections(
+        self,
+        document_id: str,
+        token: str,
+        old: list[SectionBlocks],
+        existing: int,
+        sections: list[Section],
+        opcodes: list[tuple],
+        blocks_by_hash: dict[str, list[dict]],
+        result: UpdateResult,
+    ) -> list[SectionBlocks]:
+        """按 diff 结果从文档末尾向前删除、插入，前面各段的块位置因此保持不变。"""
+        if result.rebuilt and existing:
+            self._delete_children(document_id, token, 0, existing)
+        offsets = [0]
+        for section in old:
+            offsets.append(offsets[-1] + len(section.block_ids))
+
+        written: dict[int, SectionBlocks] = {}
+        for tag, i1, i2, j1, j2 in reversed(opcodes):
+            if tag == "equal":
+                result.sections_kept += i2 - i1
+                for i, j in zip(range(i1, i2), range(j1, j2)):
+                    written[j] = old[i]
+                continue
+            if offsets[i2] > offsets[i1]:
+                self._delete_children(document_id, token, offsets[i1], offsets[i2])
+            result.sections_deleted += i2 - i1
+            new = sections[j1:j2]
+            blocks = [block for section in new for block in blocks_by_hash[section.hash]]
+            block_ids = self._append_blocks(document_id, document_id, blocks, token, index=offsets[i1]) if blocks else []
+            result.sections_written += j2 - j1
+            result.blocks_written += len(blocks)
+            # 响应缺少块 ID 时记录为空，下次更新会因校验不一致而整体重写
+            position = 0
+            for j, section in zip(range(j1, j2), new):
+                count = len(blocks_by_hash[section.hash])
+                ids = block_ids[position : position + count] if len(block_ids) == len(blocks) else []
+                written[j] = SectionBlocks(section.hash, ids)
+                position += count
+        return [written[j] for j in range(len(sections))]
+
+    def _list_child_ids(self, document_id: str, token: str) -> list[str]:
+        """文档根块下的全部顶层子块 ID (分页获取)。"""
+        url = f"{self.config.base_url}/open-apis/docx/v1/documents/{document_id}/blocks/{document_id}/children"
+        block_ids: list[str] = []
+        page_token = ""
+        while True:
+            query = {"page_size": MAX_CHILDREN_PAGE_SIZE}
+            if page_token:
+                query["page_token"] = page_token
+            result = self._request("GET", f"{url}?{urllib.parse.urlencode(query)}", token, None, timeout=15)
+            data = result.get("data", {})
+            block_ids.extend(item.get("block_id") for item in data.get("items") or [])
+            page_token = data.get("page_token") or ""
+            if not data.get("has_more") or not page_token:
+                return block_ids
+
+    def _delete_children(self, document_id: str, token: str, start_index: int, end_index: int) -> None:
+        """删除根块下 [start_index, end_index) 的子块。"""
+        url = (
+            f"{self.config.base_url}/open-apis/docx/v1/documents/{document_id}"
+            f"/blocks/{document_id}/children/batch_delete"
+        )
+        payload = {"start_index": start_index, "end_index": end_index}
+        self._request("DELETE", url, token, payload, timeout=15)
 
+    def _add_convert_step(self, graph: PublishGraph, name: str, markdown_content: str) -> None:
+        # 本地转换不需要 token，可与获取 token 同时进行
+        if self.remote_convert:
+            graph.add(name, lambda token: self._convert_markdown(markdown_content, token), "token")
+        else:
+            graph.add(name, lambda: self._convert_markdown(markdown_content))
+
+    def _add_document_steps(self, graph: PublishGraph, idx: int, title: str) -> None:
+        graph.add(f"doc:{idx}", lambda token: self._create_doc(title, token), "token")
         # 尝试将群组添加为协作者，确保群成员可访问
         if self.config.chat_id:
-            self._add_perm_member(token, document_id, "openchat", self.config.chat_id, "view")
+            graph.add(
+                f"perm:{idx}",
+                lambda token, doc: self._add_perm_member(token, doc[0], "openchat", self.config.chat_id, "view"),
+                "token",
+                f"doc:{idx}",
+            )
+        graph.add(f"share:{idx}", lambda token, doc: self._share_doc_to_tenant(doc[0], token), "token", f"doc:{idx}")
 
-        blocks = self._convert_markdown(markdown_content, token)
-        if blocks:
-            self._append_blocks(document_id, document_id, blocks, token)
+    def _split_blocks(self, blocks: list[dict]) -> list[list[dict]]:
+        """按 `max_blocks_per_doc` 切分块列表；后半段内有标题时在最后一个标题前断开。"""
+        limit = self.max_blocks_per_doc
+        parts: list[list[dict]] = []
+        start = 0
+        while len(blocks) - start > limit:
+            end = start + limit
+            for cut in range(end - 1, start + limit // 2, -1):
+                if blocks[cut].get("block_type") in HEADING_BLOCK_TYPES:
+                    end = cut
+                    break
+            parts.append(blocks[start:end])
+            start = end
+        parts.append(blocks[start:])
+        return parts
 
-        # 尝试获取分享链接
-        share_url = self._share_doc_to_tenant(document_id, token)
+    def _insert_part_links(self, docs: tuple, token: str) -> None:
+        """在主文档开头插入指向各部分的链接。"""
+        elements = [{"text_run": {"content": f"本报告共 {len(docs)} 部分: "}}]
+        for idx, doc in enumerate(docs):
+            url = self._document_url(doc, token)
+            if idx:
+                elements.append({"text_run": {"content": " | "}})
+            elements.append(
+                {
+                    "text_run": {
+                        "content": f"第 {idx + 1} 部分",
+                        "text_element_style": {"link": {"url": urllib.parse.quote(url, safe="")}},
+                    }
+                }
+            )
+        self._append_blocks(docs[0][0], docs[0][0], [{"block_type": 2, "text": {"elements": elements}}], token, index=0)
 
+    def _document_url(self, doc: Tuple[str, Optional[str]], token: str) -> str:
+        document_id, doc_url = doc
         # 优先返回原始文档链接，因为添加协作者后群成员应可直接访问
         if doc_url:
             return doc_url
 
         # 如果 API 未返回 URL，尝试获取或使用构造链接
-        if not doc_url:
-            try:
-                doc_url = self._get_doc_url(document_id, token)
-                if doc_url:
-                    return doc_url
-            except Exception:
-                pass
+        try:
+            doc_url = self._get_doc_url(document_id, token)
+            if doc_url:
+                return doc_url
+        except Exception:
+            pass
 
         # 如果 API 未返回 URL，构造标准文档访问链接
         # 注意：使用 www.feishu.cn 通用域名，它会自动重定向到租户域名
@@ -124,38 +479,27 @@ class FeishuClient:
             raise RuntimeError("Feishu docx create response missing document_id")
         return document_id, document.get("url")
 
-    def _convert_markdown(self, markdown_content: str, token: str) -> list[dict]:
+    def _convert_markdown(self, markdown_content: str, token: Optional[str] = None) -> list[dict]:
+        """Markdown -> docx 块树。远程转换接口不可用 (404) 时回退到本地转换。"""
         if not markdown_content.strip():
             return []
+        if not self.remote_convert:
+            return markdown_to_blocks(markdown_content)
 
         url = f"{self.config.base_url}/open-apis/docx/v1/document/convert"
         payload = {"source_content": markdown_content, "content_type": "markdown"}
         try:
-            result = self._request("POST", url, token, payload, timeout=15)
+            result = self._request("POST", url, token or self._get_tenant_token(), payload, timeout=15)
         except RuntimeError as exc:
             if "404" in str(exc).lower() and "page not found" in str(exc).lower():
-                return self._markdown_to_plain_blocks(markdown_content)
+                return markdown_to_blocks(markdown_content)
             raise
 
         data = result.get("data", {})
         blocks = data.get("blocks") or data.get("children")
         if blocks is None:
             raise RuntimeError("Feishu markdown convert response missing blocks")
-        return blocks
-
-    def _markdown_to_plain_blocks(self, markdown_content: str) -> list[dict]:
-        blocks: list[dict] = []
-        for line in markdown_content.splitlines():
-            content = line.rstrip()
-            if not content:
-                content = " "
-            blocks.append(
-                {
-                    "block_type": 2,
-                    "text": {"elements": [{"text_run": {"content": content}}]},
-                }
-            )
-        return blocks
+        return blocks_from_flat(blocks, data.get("first_level_block_ids"))
 
     def _append_blocks(
         self,
@@ -163,13 +507,52 @@ class FeishuClient:
         parent_block_id: str,
         blocks: list[dict],
         token: str,
-        batch_size: int = 50,
-    ) -> None:
-        url = f"{self.config.base_url}/open-apis/docx/v1/documents/{document_id}/blocks/{parent_block_id}/children"
-        for start in range(0, len(blocks), batch_size):
-            batch = blocks[start : start + batch_size]
-            payload = {"children": batch, "index": -1}
-            self._request("POST", url, token, payload, timeout=15)
+        batch_size: int = MAX_CHILDREN_PER_REQUEST,
+        index: int = -1,
+    ) -> list[str]:
+        """
+        分批写入子块，返回新建的顶层块 ID (按顺序)。含嵌套子块 (表格、嵌套列表) 的批次
+        使用创建嵌套块接口，每批子孙块总数不超过 MAX_DESCENDANTS_PER_REQUEST。
+        """
+        base_url = f"{self.config.base_url}/open-apis/docx/v1/documents/{document_id}/blocks/{parent_block_id}"
+        batch_size = min(max(batch_size, 1), MAX_CHILDREN_PER_REQUEST)
+        block_ids: list[str] = []
+        start = 0
+        for batch in self._block_batches(blocks, batch_size):
+            # 批次按顺序写入，插入到指定位置时后续批次紧随其后
+            position = index if index < 0 else index + start
+            start += len(batch)
+            if has_nested(batch):
+                children_id, descendants = flatten_blocks(batch)
+                payload = {"children_id": children_id, "index": position, "descendants": descendants}
+                result = self._request("POST", f"{base_url}/descendant", token, payload, timeout=15)
+                relations = {
+                    item.get("temporary_block_id"): item.get("block_id")
+                    for item in result.get("data", {}).get("block_id_relations") or []
+                }
+                block_ids.extend(relations[temp_id] for temp_id in children_id if relations.get(temp_id))
+            else:
+                payload = {"children": batch, "index": position}
+                result = self._request("POST", f"{base_url}/children", token, payload, timeout=15)
+                children = result.get("data", {}).get("children") or []
+                block_ids.extend(child.get("block_id") for child in children if child.get("block_id"))
+        return block_ids
+
+    @staticmethod
+    def _block_batches(blocks: list[dict], batch_size: int) -> list[list[dict]]:
+        batches: list[list[dict]] = []
+        batch: list[dict] = []
+        size = 0
+        for block in blocks:
+            block_size = count_blocks([block])
+            if batch and (len(batch) >= batch_size or size + block_size > MAX_DESCENDANTS_PER_REQUEST):
+                batches.append(batch)
+                batch, size = [], 0
+            batch.append(block)
+            size += block_size
+        if batch:
+            batches.append(batch)
+        return batches
 
     def _share_doc_to_tenant(self, document_id: str, token: str) -> Optional[str]:
         patch_url = (
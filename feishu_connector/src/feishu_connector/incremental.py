@@ -0,0 +1,116 @@
+import hashlib
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Protocol
+
+HEADING_RE = re.compile(r"#{1,9}\s")
+FENCE_RE = re.compile(r"(```|~~~)")
+
+
+@dataclass
+class Section:
+    """以标题开头的一段 Markdown (第一个标题之前的内容单独成段)。"""
+
+    markdown: str
+    hash: str
+
+
+@dataclass
+class SectionBlocks:
+    """文档中某一段对应的顶层块 ID (按文档顺序)。"""
+
+    hash: str
+    block_ids: List[str] = field(default_factory=list)
+
+
+@dataclass
+class DocumentState:
+    """滚动文档的状态: 文档 ID、链接以及各段的哈希与块 ID，用于下次增量更新。"""
+
+    document_id: str
+    url: str
+    title: str
+    sections: List[SectionBlocks] = field(default_factory=list)
+
+    @property
+    def block_ids(self) -> List[str]:
+        return [block_id for section in self.sections for block_id in section.block_ids]
+
+
+@dataclass
+class UpdateResult:
+    state: DocumentState
+    created: bool
+    sections_kept: int = 0
+    sections_written: int = 0
+    sections_deleted: int = 0
+    conversions: int = 0
+    blocks_written: int = 0
+    rebuilt: bool = False  # 文档内容与记录的块 ID 不一致，已整体重写
+
+    def describe(self) -> str:
+        action = "created" if self.created else ("rebuilt" if self.rebuilt else "updated")
+        return (
+            f"Feishu doc {action}: {self.sections_kept} section(s) kept, {self.sections_written} written, "
+            f"{self.sections_deleted} deleted, {self.conversions} converted, {self.blocks_written} block(s) written"
+        )
+
+
+class BlockCache(Protocol):
+    """按段落哈希缓存转换后的块 (例如存放在 SQLite 中)。"""
+
+    def get_blocks(self, section_hash: str) -> Optional[list]: ...
+
+    def put_blocks(self, section_hash: str, blocks: list) -> None: ...
+
+
+class MemoryBlockCache:
+    """
+    进程内的 BlockCache (线程安全)，例如在报告完成前预先转换已完成的段落。设置 `backing`
+    (如 SQLite 缓存) 后，内存未命中时再查 `backing`，写入时两者都写。
+    """
+
+    def __init__(self, backing: Optional[BlockCache] = None) -> None:
+        self.backing = backing
+        self._blocks: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._blocks)
+
+    def get_blocks(self, section_hash: str) -> Optional[list]:
+        with self._lock:
+            blocks = self._blocks.get(section_hash)
+        if blocks is None and self.backing is not None:
+            blocks = self.backing.get_blocks(section_hash)
+        return blocks
+
+    def put_blocks(self, section_hash: str, blocks: list) -> None:
+        with self._lock:
+            self._blocks[section_hash] = blocks
+        if self.backing is not None:
+            self.backing.put_blocks(section_hash, blocks)
+
+
+def section_hash(markdown: str) -> str:
+    return hashlib.sha256(markdown.strip().encode("utf-8")).hexdigest()
+
+
+def split_sections(markdown: str) -> List[Section]:
+    """在每个标题行前切分 Markdown，代码块内的 `#` 不算标题。"""
+    chunks: List[List[str]] = [[]]
+    in_fence = False
+    for line in markdown.splitlines():
+        if FENCE_RE.match(line.lstrip()):
+            in_fence = not in_fence
+        elif not in_fence and HEADING_RE.match(line) and any(l.strip() for l in chunks[-1]):
+            chunks.append([])
+        chunks[-1].append(line)
+    sections = []
+    for lines in chunks:
+        text = "\n".join(lines).strip("\n")
+        if text.strip():
+            sections.append(Section(text, section_hash(text)))
+    return sections
@@ -0,0 +1,250 @@
+"""
+本地 Markdown -> 飞书 docx 块转换。
+
+支持报告中用到的子集: 标题、段落、无序/有序列表 (按缩进嵌套)、引用、分割线、
+代码块、管道表格，以及行内的粗体、斜体、删除线、行内代码、链接和裸 URL。
+
+返回块树: 每个块是 docx 块结构，嵌套的子块以块字典列表放在 `children` 中
+(表格 -> 单元格 -> 文本)。写入时由 `flatten_blocks` 展开为创建嵌套块接口所需的
+临时 block_id 形式。
+"""
+import itertools
+import re
+import urllib.parse
+from typing import Optional
+
+TEXT = 2
+HEADING_BASE = 2  # heading1 = 3 ... heading9 = 11
+BULLET = 12
+ORDERED = 13
+CODE = 14
+QUOTE = 15
+DIVIDER = 22
+TABLE = 31
+TABLE_CELL = 32
+
+# 代码块语言: 1 = PlainText
+CODE_LANGUAGE_PLAIN = 1
+
+HEADING_RE = re.compile(r"^(#{1,9})\s+(.*?)\s*#*\s*$")
+FENCE_RE = re.compile(r"^\s*(```|~~~)")
+DIVIDER_RE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+LIST_RE = re.compile(r"^(\s*)([-*+]|\d+[.)])\s+(.*)$")
+QUOTE_RE = re.compile(r"^\s*>\s?(.*)$")
+TABLE_SEPARATOR_RE = re.compile(r"^\s*\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?\s*$")
+
+INLINE_RE = re.compile(
+    r"(?P<code>`[^`]+`)"
+    r"|\*\*(?P<bold>.+?)\*\*"
+    r"|__(?P<bold2>.+?)__"
+    r"|~~(?P<strike>.+?)~~"
+    r"|\[(?P<label>[^\]]+)\]\((?P<href>[^)\s]+)\)"
+    r"|(?P<url>https?://[^\s<>()\[\]]+[^\s<>()\[\].,;:!?'\"])"
+    r"|(?<![\w*])\*(?P<italic>[^*\s](?:[^*]*[^*\s])?)\*(?![\w*])"
+    r"|(?<![\w_])_(?P<italic2>[^_\s](?:[^_]*[^_\s])?)_(?![\w_])"
+)
+
+
+def _text_run(content: str, style: dict) -> dict:
+    run = {"content": content}
+    if style:
+        run["text_element_style"] = dict(style)
+    return {"text_run": run}
+
+
+def _parse_inline(text: str, style: dict, elements: list) -> None:
+    position = 0
+    for match in INLINE_RE.finditer(text):
+        if match.start() > position:
+            elements.append(_text_run(text[position : match.start()], style))
+        groups = match.groupdict()
+        if groups["code"]:
+            elements.append(_text_run(groups["code"][1:-1], {**style, "inline_code": True}))
+        elif groups["bold"] or groups["bold2"]:
+            _parse_inline(groups["bold"] or groups["bold2"], {**style, "bold": True}, elements)
+        elif groups["strike"]:
+            _parse_inline(groups["strike"], {**style, "strikethrough": True}, elements)
+        elif groups["label"]:
+            _parse_inline(groups["label"], {**style, "link": {"url": urllib.parse.quote(groups["href"], safe="")}}, elements)
+        elif groups["url"]:
+            url = groups["url"]
+            elements.append(_text_run(url, {**style, "link": {"url": urllib.parse.quote(url, safe="")}}))
+        else:
+            _parse_inline(groups["italic"] or groups["italic2"], {**style, "italic": True}, elements)
+        position = match.end()
+    if position < len(text):
+        elements.append(_text_run(text[position:], style))
+
+
+def inline_elements(text: str) -> list[dict]:
+    """行内 Markdown -> text_run 元素列表，相邻且样式相同的片段合并。"""
+    elements: list[dict] = []
+    _parse_inline(text, {}, elements)
+    merged: list[dict] = []
+    for element in elements:
+        run = element["text_run"]
+        previous = merged[-1]["text_run"] if merged else None
+        if previous is not None and previous.get("text_element_style") == run.get("text_element_style"):
+            previous["content"] += run["content"]
+        else:
+            merged.append(element)
+    return merged or [_text_run("", {})]
+
+
+def _text_block(block_type: int, key: str, text: str) -> dict:
+    return {"block_type": block_type, key: {"elements": inline_elements(text)}}
+
+
+def _split_row(line: str) -> list[str]:
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|") and not line.endswith("\\|"):
+        line = line[:-1]
+    cells = re.split(r"(?<!\\)\|", line)
+    return [cell.strip().replace("\\|", "|") for cell in cells]
+
+
+def _table_block(rows: list[list[str]]) -> dict:
+    columns = max(len(row) for row in rows)
+    cells = []
+    for row in rows:
+        for cell in row + [""] * (columns - len(row)):
+            cells.append({"block_type": TABLE_CELL, "table_cell": {}, "children": [_text_block(TEXT, "text", cell)]})
+    return {
+        "block_type": TABLE,
+        "table": {"property": {"row_size": len(rows), "column_size": columns, "header_row": True}},
+        "children": cells,
+    }
+
+
+def markdown_to_blocks(markdown: str) -> list[dict]:
+    """将 Markdown 转换为 docx 块树 (顶层块列表)。"""
+    lines = markdown.splitlines()
+    blocks: list[dict] = []
+    # 列表嵌套栈: (缩进, 列表块)
+    list_stack: list[tuple[int, dict]] = []
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+
+        fence = FENCE_RE.match(line)
+        if fence:
+            code_lines = []
+            i += 1
+            while i < len(lines) and not lines[i].strip().startswith(fence.group(1)):
+                code_lines.append(lines[i])
+                i += 1
+            blocks.append(
+                {
+                    "block_type": CODE,
+                    "code": {
+                        "elements": [_text_run("\n".join(code_lines), {})],
+                        "style": {"language": CODE_LANGUAGE_PLAIN, "wrap": False},
+                    },
+                }
+            )
+            list_stack = []
+            i += 1
+            continue
+
+        if not line.strip():
+            list_stack = []
+            i += 1
+            continue
+
+        heading = HEADING_RE.match(line)
+        if heading:
+            level = len(heading.group(1))
+            blocks.append(_text_block(HEADING_BASE + level, f"heading{level}", heading.group(2)))
+            list_stack = []
+            i += 1
+            continue
+
+        if DIVIDER_RE.match(line):
+            blocks.append({"block_type": DIVIDER, "divider": {}})
+            list_stack = []
+            i += 1
+            continue
+
+        if "|" in line and i + 1 < len(lines) and TABLE_SEPARATOR_RE.match(lines[i + 1]):
+            rows = [_split_row(line)]
+            i += 2
+            while i < len(lines) and "|" in lines[i] and lines[i].strip():
+                rows.append(_split_row(lines[i]))
+                i += 1
+            blocks.append(_table_block(rows))
+            list_stack = []
+            continue
+
+        item = LIST_RE.match(line)
+        if item:
+            indent = len(item.group(1).expandtabs(4))
+            ordered = item.group(2)[0].isdigit()
+            block = _text_block(ORDERED if ordered else BULLET, "ordered" if ordered else "bullet", item.group(3))
+            while list_stack and list_stack[-1][0] >= indent:
+                list_stack.pop()
+            if list_stack:
+                list_stack[-1][1].setdefault("children", []).append(block)
+            else:
+                blocks.append(block)
+            list_stack.append((indent, block))
+            i += 1
+            continue
+
+        quote = QUOTE_RE.match(line)
+        if quote:
+            blocks.append(_text_block(QUOTE, "quote", quote.group(1)))
+        else:
+            blocks.append(_text_block(TEXT, "text", line.strip()))
+        list_stack = []
+        i += 1
+    return blocks
+
+
+def count_blocks(blocks: list[dict]) -> int:
+    """块树中的块总数 (含所有子块)。"""
+    return sum(1 + count_blocks(block.get("children") or []) for block in blocks)
+
+
+def has_nested(blocks: list[dict]) -> bool:
+    return any(isinstance(child, dict) for block in blocks for child in block.get("children") or [])
+
+
+def flatten_blocks(blocks: list[dict], prefix: str = "tmp") -> tuple[list[str], list[dict]]:
+    """块树 -> (顶层临时 block_id 列表, 所有块的扁平列表)，即创建嵌套块接口的 children_id 与 descendants。"""
+    counter = itertools.count(1)
+    descendants: list[dict] = []
+
+    def visit(block: dict) -> str:
+        temp_id = f"{prefix}{next(counter)}"
+        node = {key: value for key, value in block.items() if key not in ("children", "block_id", "parent_id")}
+        node["block_id"] = temp_id
+        descendants.append(node)
+        node["children"] = [visit(child) for child in block.get("children") or []]
+        return temp_id
+
+    return [visit(block) for block in blocks], descendants
+
+
+def blocks_from_flat(blocks: list[dict], first_level_block_ids: Optional[list[str]] = None) -> list[dict]:
+    """
+    转换接口返回的扁平块 (子块以 ID 引用) -> 块树。没有 `first_level_block_ids` 时
+    以未被任何块引用的块作为顶层块。
+    """
+    by_id = {block.get("block_id"): block for block in blocks if block.get("block_id")}
+    if not by_id:
+        return [dict(block) for block in blocks]
+    if first_level_block_ids is None:
+        referenced = {child for block in blocks for child in block.get("children") or [] if isinstance(child, str)}
+        first_level_block_ids = [block.get("block_id") for block in blocks if block.get("block_id") not in referenced]
+
+    def build(block_id: str) -> dict:
+        block = by_id[block_id]
+        node = {key: value for key, value in block.items() if key not in ("children", "block_id", "parent_id")}
+        children = [build(child) for child in block.get("children") or [] if child in by_id]
+        if children:
+            node["children"] = children
+        return node
+
+    return [build(block_id) for block_id in first_level_block_ids if block_id in by_id]
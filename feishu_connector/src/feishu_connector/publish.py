@@ -0,0 +1,79 @@
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+@dataclass
+class PublishResult:
+    """一次发布的结果。报告过大被拆分时，`sub_documents` 为后续各部分 (主文档为第 1 部分)。"""
+
+    document_id: str
+    url: str
+    title: str
+    share_url: Optional[str] = None
+    block_count: int = 0
+    sub_documents: List["PublishResult"] = field(default_factory=list)
+
+    @property
+    def urls(self) -> List[str]:
+        return [self.url] + [doc.url for doc in self.sub_documents]
+
+
+class PublishGraph:
+    """
+    按依赖关系并发执行发布步骤。
+
+    每个步骤以名称注册，`fn` 按 `deps` 的顺序接收各依赖步骤的返回值；依赖全部完成后
+    立即提交到线程池。步骤运行中可以继续 `add` 新步骤 (例如文档数量在转换完成后才确定)。
+    任一步骤抛出异常时不再提交新步骤，等待已运行的步骤结束后抛出该异常。
+    """
+
+    def __init__(self, max_workers: int = 4) -> None:
+        self.max_workers = max(max_workers, 1)
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Tuple[Callable[..., Any], Tuple[str, ...]]] = {}
+        self._results: Dict[str, Any] = {}
+
+    def add(self, name: str, fn: Callable[..., Any], *deps: str) -> None:
+        with self._lock:
+            if name in self._pending or name in self._results:
+                raise ValueError(f"Duplicate publish step: {name}")
+            self._pending[name] = (fn, deps)
+
+    def run(self) -> Dict[str, Any]:
+        running: Dict[Future, str] = {}
+        error: Optional[BaseException] = None
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while True:
+                if error is None:
+                    for name, fn, args in self._ready(set(running.values())):
+                        running[pool.submit(fn, *args)] = name
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        result = future.result()
+                    except BaseException as exc:  # noqa: BLE001 - re-raised below
+                        error = error or exc
+                        continue
+                    with self._lock:
+                        self._results[name] = result
+                        self._pending.pop(name, None)
+
+        if error is not None:
+            raise error
+        with self._lock:
+            if self._pending:
+                raise RuntimeError(f"Publish steps with unmet dependencies: {', '.join(sorted(self._pending))}")
+            return dict(self._results)
+
+    def _ready(self, running: set) -> List[Tuple[str, Callable[..., Any], List[Any]]]:
+        with self._lock:
+            ready = []
+            for name, (fn, deps) in self._pending.items():
+                if name not in running and all(dep in self._results for dep in deps):
+                    ready.append((name, fn, [self._results[dep] for dep in deps]))
+            return ready
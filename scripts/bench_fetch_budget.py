@@ -0,0 +1,123 @@
+"""
+Fetch budget simulation: one uniform `--limit` for every account vs. planned caps.
+
+Simulates daily crawls of accounts whose posting rates span two orders of magnitude
+(log-normal). The fake actor returns new posts search term by search term until
+`maxItems` is reached, and the client keeps each account's newest posts up to its
+limit (`--limit`, or the plan's `max_cap`). Posts older than what was kept are never seen again, since the
+next crawl starts from the newest stored ID. Reports, per strategy, the `maxItems`
+requested, items the actor returned (what a pay-per-result actor bills) and posts lost.
+
+    python scripts/bench_fetch_budget.py --accounts 100 --days 21 --limit 20
+"""
+import argparse
+import math
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from apify_pipeline.fetch_budget import FetchBudgetPlanner
+from apify_pipeline.models import Post
+from apify_pipeline.storage import PostStore
+
+
+def make_timeline(accounts: int, days: int, start: float, seed: int = 7):
+    rng = random.Random(seed)
+    handles = [f"account{i}" for i in range(accounts)]
+    timeline = {}
+    for handle in handles:
+        per_day = rng.lognormvariate(math.log(3), 1.2)
+        stamps, t = [], start
+        while True:
+            t += rng.expovariate(per_day / 86400)
+            if t >= start + days * 86400:
+                break
+            stamps.append(int(t))
+        timeline[handle] = stamps
+    return handles, timeline
+
+
+def crawl(handles, timeline, latest, now, max_items):
+    """One actor run: the new post timestamps returned per handle (newest first) and the item count."""
+    returned, result = 0, {}
+    for handle in handles:
+        new = [ts for ts in timeline[handle] if latest.get(handle, 0) < ts <= now]
+        remaining = max(max_items - returned, 0)
+        if remaining < len(new):
+            new = new[len(new) - remaining :]
+        returned += len(new)
+        result[handle] = new[::-1]
+    return result, returned
+
+
+def simulate(handles, timeline, start, days, limit, max_total_limit, planned: bool):
+    latest = {}
+    requested = returned = kept = 0
+    store = PostStore(Path(tempfile.mkdtemp()) / "budget.db") if planned else None
+    planner = FetchBudgetPlanner(store.conn) if planned else None
+    for day in range(1, days + 1):
+        now = start + day * 86400
+        since_ts = {h: time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(latest[h])) for h in latest}
+        if planned:
+            plan = planner.plan(handles, since_ts, limit, max_total_limit, now=now)
+            order, keep, max_items = plan.ordered(handles), plan.max_cap, plan.max_items()
+        else:
+            plan = None
+            order, keep, max_items = handles, limit, min(limit * len(handles), max_total_limit)
+        result, run_items = crawl(order, timeline, latest, now, max_items)
+        requested += max_items
+        returned += run_items
+        # Like the client: count everything returned, keep the newest `keep`
+        fetched = {h: len(stamps) for h, stamps in result.items()}
+        result = {h: stamps[:keep] for h, stamps in result.items()}
+        for handle, stamps in result.items():
+            kept += len(stamps)
+            if stamps:
+                latest[handle] = stamps[0]
+        if planned:
+            store.ingest(
+                Post(id=f"{h}-{ts}", author=h, created_at=time.strftime("%Y-%m-%dT%H:%M:%S+00:00", time.gmtime(ts)), created_ts=ts)
+                for h, stamps in result.items()
+                for ts in stamps
+            )
+            with store.conn:
+                planner.record(plan, fetched, handles if run_items >= max_items else (), now=now)
+    total = sum(len(stamps) for stamps in timeline.values())
+    return requested, returned, kept, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--days", type=int, default=21)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--max-total-limit", type=int, default=2000)
+    args = parser.parse_args()
+
+    start = time.time() - (args.days + 1) * 86400
+    handles, timeline = make_timeline(args.accounts, args.days, start)
+    per_day = sorted(len(stamps) / args.days for stamps in timeline.values())
+    print(
+        f"{args.accounts} accounts, {args.days} daily crawls, posts/day per account "
+        f"min {per_day[0]:.1f} median {per_day[len(per_day) // 2]:.1f} max {per_day[-1]:.1f}"
+    )
+    for label, planned in (("uniform --limit", False), ("fetch budget", True)):
+        started = time.perf_counter()
+        requested, returned, kept, total = simulate(
+            handles, timeline, start, args.days, args.limit, args.max_total_limit, planned
+        )
+        print(
+            f"{label:<16} maxItems requested {requested:>7}  items returned {returned:>6}  "
+            f"posts kept {kept:>6}/{total}  lost {total - kept:>5} ({(total - kept) / total:.1%})  "
+            f"[{time.perf_counter() - started:.2f}s]"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Ingest throughput benchmark: legacy store_posts path vs. PostStore.
+
+"before" replays the original write path: default rollback-journal connection,
+INSERT OR IGNORE via executemany and a commit per call, with no signal about which
+posts were new. "after" uses PostStore (WAL + tuned pragmas, one transaction per
+batch, INSERT ... RETURNING for new-post detection).
+
+    python scripts/bench_ingest.py --posts 50000 --batch 200
+"""
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from apify_pipeline.storage import PostStore, init_db
+
+
+def make_posts(count: int):
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for i in range(count):
+        post_id = str(1_800_000_000_000_000_000 + i)
+        media = [{"id": f"{post_id}-m", "type": "photo", "url": f"https://pbs.twimg.com/{i}.jpg"}] if i % 5 == 0 else []
+        yield {
+            "id": post_id,
+            "author": f"account{i % 40}",
+            "created_at": (start + timedelta(seconds=37 * i)).isoformat(),
+            "text": f"Benchmark post {i} about $CCJ uranium supply and AI capex #{i % 97}",
+            "url": f"https://x.com/account{i % 40}/status/{post_id}",
+            "media": media,
+        }
+
+
+def legacy_store_posts(conn: sqlite3.Connection, posts) -> None:
+    accounts = set()
+    media_rows = []
+    rows = []
+    for post in posts:
+        accounts.add(post["author"])
+        rows.append(
+            {
+                "id": post["id"],
+                "author": post["author"],
+                "created_at": post["created_at"],
+                "text": post["text"],
+                "url": post["url"],
+            }
+        )
+        for idx, media in enumerate(post["media"]):
+            media_rows.append(
+                (media.get("id") or f"{post['id']}-media-{idx}", post["id"], media.get("type"), media.get("url"), None, None, None, None)
+            )
+    conn.executemany(
+        "INSERT INTO accounts(handle, platform) VALUES(?, 'x') ON CONFLICT(handle) DO NOTHING",
+        [(a,) for a in accounts],
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO posts(id, author, created_at, text, url) VALUES(:id, :author, :created_at, :text, :url)",
+        rows,
+    )
+    if media_rows:
+        conn.executemany(
+            "INSERT OR REPLACE INTO media(id, post_id, type, url, preview_url, width, height, description) VALUES(?, ?, ?, ?, ?, ?, ?, ?)",
+            media_rows,
+        )
+    conn.commit()
+
+
+def batches(posts, size):
+    for start in range(0, len(posts), size):
+        yield posts[start : start + size]
+
+
+def run(label: str, fn, posts, batch: int) -> float:
+    started = time.perf_counter()
+    for chunk in batches(posts, batch):
+        fn(chunk)
+    elapsed = time.perf_counter() - started
+    rate = len(posts) / elapsed if elapsed else float("inf")
+    print(f"{label:<8} {len(posts):>8} rows  {elapsed:8.2f}s  {rate:>10.0f} rows/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--posts", type=int, default=50000)
+    parser.add_argument("--batch", type=int, default=200, help="Posts per store call (one crawl run)")
+    args = parser.parse_args()
+
+    posts = list(make_posts(args.posts))
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_conn = init_db(Path(tmp) / "before.db")
+        before = run("before", lambda chunk: legacy_store_posts(legacy_conn, chunk), posts, args.batch)
+        legacy_conn.close()
+
+        store = PostStore(Path(tmp) / "after.db")
+        after = run("after", store.ingest, posts, args.batch)
+        # Re-ingesting the same data exercises the duplicate-detection path
+        dupes = store.ingest(posts[: args.batch])
+        store.close()
+
+    print(f"speedup  {after / before:.1f}x  (re-ingest of {args.batch} posts reported {dupes.duplicate_count} duplicates)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Keyword engine benchmark: legacy regex + Counter vs. the multilingual TF-IDF engine.
+
+Generates a synthetic week of mixed English/Chinese posts (plus a background month)
+where a handful of "story" phrases spike during the week. Reports tokenizer
+throughput, TF-IDF scoring time with the scipy sparse path and the pure-Python
+fallback, and how many of the planted stories each approach surfaces in its top terms.
+
+    python scripts/bench_keywords.py --posts-per-day 3000 --background-days 28
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from apify_pipeline import keywords
+from apify_pipeline.keywords import KeywordEngine
+
+LEGACY_STOPWORDS = {
+    "the", "and", "of", "a", "to", "in", "for", "on", "is", "are", "it", "this", "that", "with", "at",
+    "we", "you", "i", "our", "by", "from", "as", "be", "an", "or", "was", "were", "has", "have",
+}  # fmt: skip
+
+EN_FILLER = (
+    "the market is looking at this again today and we think that it will be interesting to see how "
+    "people react when the numbers come out later this week just saying what do you think about it"
+).split()
+ZH_FILLER = "今天市场的情况我们觉得还是需要继续观察一下大家怎么看这个问题"
+STORIES = ["rate cut", "uranium supply", "$NVDA earnings", "稀土出口", "人工智能芯片", "#ETF inflows"]
+
+
+def make_corpus(days: int, posts_per_day: int, seed: int = 11):
+    rng = random.Random(seed)
+    vocab = [f"term{i}" for i in range(4000)]
+
+    def post(story=None):
+        if rng.random() < 0.3:
+            start = rng.randrange(len(ZH_FILLER) - 12)
+            text = ZH_FILLER[start : start + rng.randint(8, 12)]
+        else:
+            text = " ".join(rng.choice(EN_FILLER + vocab) for _ in range(rng.randint(12, 30)))
+        return f"{text} {story}" if story else text
+
+    background = [post() for _ in range(days * posts_per_day)]
+    week = [post(rng.choice(STORIES) if rng.random() < 0.05 else None) for _ in range(7 * posts_per_day)]
+    return week, background
+
+
+def legacy_keywords(texts, top_n: int):
+    counter: Counter = Counter()
+    for text in texts:
+        counter.update(t for t in re.findall(r"[A-Za-z\d_]+", text.lower()) if t not in LEGACY_STOPWORDS and len(t) > 2)
+    return [term for term, _ in counter.most_common(top_n)]
+
+
+def found(terms, top_n: int) -> int:
+    joined = " | ".join(terms[:top_n]).lower()
+    return sum(any(part in joined for part in story.lower().lstrip("$#").split()[:1]) for story in STORIES)
+
+
+def timed(label: str, count: int, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<22} {elapsed:8.2f}s  {count / elapsed:>10.0f} posts/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--posts-per-day", type=int, default=3000)
+    parser.add_argument("--background-days", type=int, default=28)
+    parser.add_argument("--top", type=int, default=12)
+    args = parser.parse_args()
+
+    week, background = make_corpus(args.background_days, args.posts_per_day)
+    print(f"{len(week)} posts this week, {len(background)} background posts, scipy={keywords.HAS_SCIPY}")
+    engine = KeywordEngine()
+
+    legacy = timed("legacy regex+Counter", len(week), lambda: legacy_keywords(week, args.top))
+    timed("engine tokenize", len(week), lambda: [engine.tokenize(text) for text in week])
+    total = len(week) + len(background)
+    ranked = timed("tf-idf (sparse)", total, lambda: engine.distinctive_terms(week, background, args.top))
+    if keywords.HAS_SCIPY:
+        keywords.HAS_SCIPY = False
+        try:
+            fallback = timed("tf-idf (pure python)", total, lambda: engine.distinctive_terms(week, background, args.top))
+        finally:
+            keywords.HAS_SCIPY = True
+        assert fallback == ranked, "sparse and fallback rankings differ"
+
+    themes = [term for term, _ in ranked]
+    print(f"legacy top {args.top}: {', '.join(legacy)}")
+    print(f"themes top {args.top}: {', '.join(themes)}")
+    print(f"planted stories surfaced: legacy {found(legacy, args.top)}/{len(STORIES)}, themes {found(themes, args.top)}/{len(STORIES)}")
+
+
+if __name__ == "__main__":
+    main()
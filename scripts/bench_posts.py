@@ -0,0 +1,158 @@
+"""
+Post model benchmark: legacy dict posts vs. slotted `Post` objects.
+
+Builds synthetic posts the way the Apify client does, then times the hot paths that
+used to re-parse `created_at`: the per-handle sort and since-filter, the
+latest-post-per-author loop, and report line formatting. Memory is measured with
+tracemalloc for the whole batch of posts.
+
+    python scripts/bench_posts.py --posts 100000
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from apify_pipeline.analyzer import format_post, parse_timestamp
+from apify_pipeline.apify_client import ApifyTweetScraperClient
+from apify_pipeline.models import Post
+
+
+def make_items(count: int, accounts: int, seed: int = 5):
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "id": str(1_800_000_000_000_000_000 + i),
+            "author": f"Account{rng.randrange(accounts)}",
+            "createdAt": (start + timedelta(seconds=rng.randrange(7 * 86400))).strftime("%a %b %d %H:%M:%S +0000 %Y"),
+            "text": " ".join(f"w{rng.randrange(5000)}" for _ in range(rng.randint(10, 40))),
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_dict(post: Post) -> dict:
+    """The dict the client used to build for each item."""
+    return {
+        "id": post.id,
+        "author": post.author,
+        "created_at": post.created_at,
+        "text": post.text,
+        "url": post.url,
+        "media": [],
+        "conversation_id": None,
+        "in_reply_to_id": None,
+        "in_reply_to_user": None,
+        "is_reply": False,
+    }
+
+
+def legacy_collect(buckets, since_ts_map, limit):
+    posts = []
+    for handle, author_posts in buckets.items():
+        sorted_posts = sorted(
+            author_posts,
+            key=lambda p: (
+                ApifyTweetScraperClient._parse_timestamp(p.get("created_at")) or datetime.min.replace(tzinfo=timezone.utc),
+                str(p.get("id", "")),
+            ),
+            reverse=True,
+        )
+        since_ts = ApifyTweetScraperClient._parse_timestamp(since_ts_map.get(handle))
+        for appended, post in enumerate(sorted_posts, 1):
+            created_ts = ApifyTweetScraperClient._parse_timestamp(post.get("created_at"))
+            if since_ts and created_ts and created_ts <= since_ts:
+                break
+            posts.append(post)
+            if appended >= limit:
+                break
+    return posts
+
+
+def legacy_latest(posts):
+    latest = {}
+    for post in posts:
+        author = str(post.get("author", "")).lower()
+        created_at = post.get("created_at")
+        created_ts = parse_timestamp(created_at) if created_at else None
+        existing = latest.get(author)
+        existing_ts = parse_timestamp(existing["created_at"]) if existing and existing.get("created_at") else None
+        if not existing or (created_ts and (not existing_ts or existing_ts < created_ts)):
+            latest[author] = {"id": post["id"], "created_at": created_at or ""}
+    return latest
+
+
+def legacy_format(post) -> str:
+    created_at = parse_timestamp(post["created_at"]).strftime("%Y-%m-%d %H:%M UTC")
+    text = post.get("text", "").strip().replace("\n", " ")
+    return f"- {created_at} — {text} ({post.get('url', '')})"
+
+
+def new_latest(posts):
+    latest = {}
+    for post in posts:
+        existing = latest.get(post.author)
+        if existing is None or (post.created_ts is not None and (existing.created_ts or 0) < post.created_ts):
+            latest[post.author] = post
+    return latest
+
+
+def timed(label: str, count: int, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed:8.3f}s  {count / elapsed:>12.0f} posts/s")
+    return result
+
+
+def measure(label: str, build):
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {current / 2**20:8.1f} MiB  {current / len(result):>8.0f} B/post")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--accounts", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=200, help="Posts kept per account by the since-filter")
+    args = parser.parse_args()
+
+    items = make_items(args.posts, args.accounts)
+    client = ApifyTweetScraperClient(token=None)
+    handles = [f"account{i}" for i in range(args.accounts)]
+    since = (datetime(2026, 1, 4, tzinfo=timezone.utc)).isoformat()
+    since_map = {h: None for h in handles}
+    since_ts_map = {h: since for h in handles}
+
+    print(f"{args.posts} posts, {args.accounts} accounts")
+    posts = timed("normalize -> Post", args.posts, lambda: [client._normalize_item(item) for item in items])
+    posts = measure("Post objects", lambda: [Post(**{n: getattr(p, n) for n in Post.__slots__}) for p in posts])
+    dicts = measure("legacy dicts", lambda: [legacy_dict(p) for p in posts])
+
+    buckets = client._bucket_items(items, handles)
+    dict_buckets = {h: [legacy_dict(p) for p in bucket] for h, bucket in buckets.items()}
+    timed("sort+since (legacy dicts)", args.posts, lambda: legacy_collect(dict_buckets, since_ts_map, args.limit))
+    timed("sort+since (Post)", args.posts, lambda: client._collect_sorted_posts(handles, buckets, since_map, since_ts_map, args.limit))
+    old = timed("latest/author (legacy)", args.posts, lambda: legacy_latest(dicts))
+    new = timed("latest/author (Post)", args.posts, lambda: new_latest(posts))
+    assert {a: v["id"] for a, v in old.items()} == {a: p.id for a, p in new.items()}
+    old_lines = timed("format_post (legacy)", args.posts, lambda: [legacy_format(p) for p in dicts])
+    new_lines = timed("format_post (Post)", args.posts, lambda: [format_post(p) for p in posts])
+    assert old_lines == new_lines
+    timed("format_post (dict adapter)", args.posts, lambda: [format_post(p) for p in dicts])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Local fake of the Apify REST endpoints used by ApifyTweetScraperClient.
+
+Serves actor runs, run status, run abort and paginated dataset items, generating a
+few tweets for every `from:<handle>` search term. Tweet IDs are snowflakes derived
+from their creation time, and the `since_id:`, `since_time:`/`until_time:` and
+`since:`/`until:` operators filter them like the real search does. Useful for exercising sharded fetches offline:
+
+    python scripts/fake_apify_server.py --port 8765 --fail-first 1 --run-seconds 2
+    python apify_pipeline/pipeline.py --mode apify --token fake \\
+        --base-url http://127.0.0.1:8765/v2 --shards 4 --summary-model ""
+
+`make_server()` can also be started in a background thread from other scripts.
+"""
+import argparse
+import itertools
+import json
+import re
+import sys
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from apify_pipeline.snowflake import make_id
+
+
+class FakeApifyState:
+    def __init__(self, tweets_per_handle: int = 5, run_seconds: float = 0.0, fail_first: int = 0):
+        self.tweets_per_handle = tweets_per_handle
+        self.run_seconds = run_seconds
+        self.fail_first = fail_first
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.runs: Dict[str, Dict] = {}
+        self.datasets: Dict[str, List[Dict]] = {}
+        self.requests: List[str] = []
+
+    def start_run(self, payload: Dict, options: Dict[str, int] = None) -> Dict:
+        with self.lock:
+            run_no = next(self.ids)
+            run_id = f"run{run_no}"
+            dataset_id = f"ds{run_no}"
+            failing = self.fail_first > 0
+            if failing:
+                self.fail_first -= 1
+        now = datetime.now(timezone.utc)
+        items = []
+        for term in payload.get("searchTerms") or []:
+            match = re.search(r"from:(\w+)", term)
+            if not match:
+                continue
+            handle = match.group(1)
+            since_id = re.search(r"since_id:(\d+)", term)
+            window = search_window(term)
+            for i in range(self.tweets_per_handle):
+                created = now - timedelta(minutes=10 * i)
+                tweet_id = str(make_id(created, run_no * 64 + len(items)))
+                if since_id and int(tweet_id) <= int(since_id.group(1)):
+                    continue
+                if not window[0] <= created.timestamp() < window[1]:
+                    continue
+                items.append(
+                    {
+                        "id": tweet_id,
+                        "author": {"userName": handle},
+                        "createdAt": created.strftime("%a %b %d %H:%M:%S +0000 %Y"),
+                        "text": f"Fake tweet {i} from {handle}",
+                        "url": f"https://x.com/{handle}/status/{tweet_id}",
+                    }
+                )
+        items = items[: int(payload.get("maxItems") or len(items))]
+        run = {
+            "id": run_id,
+            "status": "RUNNING",
+            "defaultDatasetId": dataset_id,
+            "startedAt": now.isoformat(),
+            "options": {
+                "memoryMbytes": (options or {}).get("memory", 1024),
+                "timeoutSecs": (options or {}).get("timeout", 0),
+            },
+            "_finish_at": time.time() + self.run_seconds,
+            "_final": "FAILED" if failing else "SUCCEEDED",
+        }
+        with self.lock:
+            self.runs[run_id] = run
+            self.datasets[dataset_id] = items
+        return self.run_view(run_id)
+
+    def run_view(self, run_id: str) -> Dict:
+        with self.lock:
+            run = self.runs[run_id]
+            if run["status"] == "RUNNING" and time.time() >= run["_finish_at"]:
+                run["status"] = run["_final"]
+                run["finishedAt"] = datetime.now(timezone.utc).isoformat()
+            return {k: v for k, v in run.items() if not k.startswith("_")}
+
+
+def search_window(term: str) -> Tuple[float, float]:
+    """`[start, end)` in epoch seconds from the term's time operators (dates are UTC days)."""
+    start, end = float("-inf"), float("inf")
+    for name, value in re.findall(r"\b(since_time|until_time|since|until):(\S+)", term):
+        if name.endswith("_time"):
+            moment = float(value)
+        else:
+            moment = datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+        if name.startswith("since"):
+            start = max(start, moment)
+        else:
+            end = min(end, moment)
+    return start, end
+
+
+def make_handler(state: FakeApifyState):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):  # keep test output quiet
+            pass
+
+        def _send(self, status: int, body, headers: Dict[str, str] = None) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _wait(self, run_id: str, query: Dict[str, List[str]]) -> Dict:
+            wait = float((query.get("waitForFinish") or ["0"])[0] or 0)
+            deadline = time.time() + min(wait, 60)
+            view = state.run_view(run_id)
+            while view["status"] == "RUNNING" and time.time() < deadline:
+                time.sleep(0.05)
+                view = state.run_view(run_id)
+            return view
+
+        def do_POST(self):
+            parsed = urllib.parse.urlparse(self.path)
+            query = urllib.parse.parse_qs(parsed.query)
+            state.requests.append(f"POST {parsed.path}")
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if re.fullmatch(r"/v2/acts/[^/]+/runs", parsed.path):
+                options = {k: int(query[k][0]) for k in ("memory", "timeout") if k in query}
+                view = state.start_run(payload, options)
+                self._send(201, {"data": self._wait(view["id"], query)})
+                return
+            match = re.fullmatch(r"/v2/actor-runs/([^/]+)/abort", parsed.path)
+            if match and match.group(1) in state.runs:
+                with state.lock:
+                    state.runs[match.group(1)]["status"] = "ABORTED"
+                self._send(200, {"data": state.run_view(match.group(1))})
+                return
+            self._send(404, {"error": {"message": "not found"}})
+
+        def do_GET(self):
+            parsed = urllib.parse.urlparse(self.path)
+            query = urllib.parse.parse_qs(parsed.query)
+            state.requests.append(f"GET {parsed.path}")
+            match = re.fullmatch(r"/v2/(?:actor-)?runs/([^/]+)", parsed.path)
+            if match and match.group(1) in state.runs:
+                self._send(200, {"data": self._wait(match.group(1), query)})
+                return
+            match = re.fullmatch(r"/v2/datasets/([^/]+)/items", parsed.path)
+            if match and match.group(1) in state.datasets:
+                items = state.datasets[match.group(1)]
+                offset = int((query.get("offset") or ["0"])[0])
+                limit = int((query.get("limit") or [str(len(items))])[0])
+                fields = (query.get("fields") or [""])[0]
+                page = items[offset : offset + limit]
+                if fields:
+                    keep = set(fields.split(","))
+                    page = [{k: v for k, v in item.items() if k in keep} for item in page]
+                self._send(200, page, {"X-Apify-Pagination-Total": str(len(items))})
+                return
+            self._send(404, {"error": {"message": "not found"}})
+
+    return Handler
+
+
+def make_server(port: int = 0, **state_kwargs) -> ThreadingHTTPServer:
+    state = FakeApifyState(**state_kwargs)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.state = state
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Apify API for local testing")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tweets-per-handle", type=int, default=5)
+    parser.add_argument("--run-seconds", type=float, default=0.0, help="Simulated actor run duration")
+    parser.add_argument("--fail-first", type=int, default=0, help="Number of initial runs that end FAILED")
+    args = parser.parse_args()
+
+    server = make_server(
+        args.port,
+        tweets_per_handle=args.tweets_per_handle,
+        run_seconds=args.run_seconds,
+        fail_first=args.fail_first,
+    )
+    print(f"Fake Apify API listening on http://127.0.0.1:{server.server_address[1]}/v2")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Local fake of the Feishu Open API endpoints used by FeishuClient.
+
+Serves the tenant token, docx create/convert, list/append/batch-delete children,
+nested-block (descendant) creation, permission member, public permission (share) settings and chat messages. Every request waits
+`--latency` seconds, and appending children to one document more than `--doc-rps`
+times a second is answered with HTTP 429 / code 99991400 like the real frequency
+limit. Appends with more than 50 children are rejected. Useful for timing the
+publish pipeline offline:
+
+    python scripts/fake_feishu_server.py --port 8766 --latency 0.1
+    FEISHU_APP_ID=x FEISHU_APP_SECRET=y FEISHU_TARGET_CHAT_ID=oc_1 \\
+        FEISHU_BASE_URL=http://127.0.0.1:8766 python apify_pipeline/pipeline.py --send-feishu ...
+
+`make_server()` can also be started in a background thread from other scripts.
+"""
+import argparse
+import itertools
+import json
+import re
+import threading
+import time
+import urllib.parse
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+MAX_CHILDREN = 50
+MAX_DESCENDANTS = 1000
+RATE_LIMIT_CODE = 99991400
+
+
+class FakeFeishuState:
+    def __init__(self, latency: float = 0.0, doc_rps: float = 3.0):
+        self.latency = latency
+        self.doc_rps = doc_rps
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.documents: Dict[str, Dict] = {}
+        self.appends: Dict[str, deque] = defaultdict(deque)
+        self.requests: List[str] = []
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def create_document(self, title: str) -> Dict:
+        with self.lock:
+            document_id = f"doxcn{next(self.ids):06d}"
+            self.documents[document_id] = {"title": title, "blocks": [], "members": [], "public": None}
+        return {"document_id": document_id, "title": title, "revision_id": 1}
+
+    def allow_append(self, document_id: str) -> bool:
+        """Sliding one-second window per document."""
+        now = time.monotonic()
+        with self.lock:
+            window = self.appends[document_id]
+            while window and now - window[0] >= 1.0:
+                window.popleft()
+            if len(window) >= self.doc_rps:
+                self.rate_limited += 1
+                return False
+            window.append(now)
+            return True
+
+
+def convert_markdown(markdown: str) -> List[Dict]:
+    blocks = []
+    for line in markdown.splitlines():
+        heading = re.match(r"(#{1,9})\s+(.*)", line)
+        if heading:
+            level = len(heading.group(1))
+            key = f"heading{level}"
+            blocks.append({"block_type": 2 + level, key: {"elements": [{"text_run": {"content": heading.group(2)}}]}})
+        elif line.startswith("- "):
+            blocks.append({"block_type": 12, "bullet": {"elements": [{"text_run": {"content": line[2:]}}]}})
+        elif line.strip():
+            blocks.append({"block_type": 2, "text": {"elements": [{"text_run": {"content": line}}]}})
+    return blocks
+
+
+def make_handler(state: FakeFeishuState):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):  # keep test output quiet
+            pass
+
+        def _send(self, status: int, body, headers: Dict[str, str] = None) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _ok(self, data=None) -> None:
+            self._send(200, {"code": 0, "msg": "success", "data": data or {}})
+
+        def _payload(self) -> Dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def _handle(self, method: str) -> None:
+            parsed = urllib.parse.urlparse(self.path)
+            path = parsed.path
+            with state.lock:
+                state.requests.append(f"{method} {path}")
+                state.in_flight += 1
+                state.max_in_flight = max(state.max_in_flight, state.in_flight)
+            try:
+                time.sleep(state.latency)
+                query = urllib.parse.parse_qs(parsed.query)
+                self._route(method, path, query, self._payload() if method in ("POST", "PATCH", "DELETE") else {})
+            finally:
+                with state.lock:
+                    state.in_flight -= 1
+
+        def _route(self, method: str, path: str, query: Dict, payload: Dict) -> None:
+            if path == "/open-apis/auth/v3/tenant_access_token/internal":
+                self._send(200, {"code": 0, "tenant_access_token": "t-fake", "expire": 7200})
+                return
+            if method == "POST" and path == "/open-apis/docx/v1/documents":
+                self._ok({"document": state.create_document(payload.get("title", ""))})
+                return
+            if method == "POST" and path == "/open-apis/docx/v1/document/convert":
+                self._ok({"blocks": convert_markdown(payload.get("source_content", ""))})
+                return
+            if method == "POST" and path == "/open-apis/im/v1/messages":
+                self._ok({"message_id": f"om_{next(state.ids)}"})
+                return
+
+            match = re.fullmatch(r"/open-apis/docx/v1/documents/([^/]+)/blocks/([^/]+)/children", path)
+            if method == "POST" and match:
+                document = state.documents.get(match.group(1))
+                if document is None:
+                    self._send(404, {"code": 1770002, "msg": "document not found"})
+                    return
+                children = payload.get("children") or []
+                if len(children) > MAX_CHILDREN:
+                    self._send(400, {"code": 1770001, "msg": "invalid param: too many children"})
+                    return
+                if not state.allow_append(match.group(1)):
+                    self._send(429, {"code": RATE_LIMIT_CODE, "msg": "request trigger frequency limit"}, {"x-ogw-ratelimit-reset": "1"})
+                    return
+                with state.lock:
+                    children = [dict(child, block_id=f"blk{next(state.ids):08d}") for child in children]
+                    index = payload.get("index", -1)
+                    blocks = document["blocks"]
+                    position = len(blocks) if index is None or index < 0 else min(index, len(blocks))
+                    blocks[position:position] = children
+                self._ok({"children": children, "document_revision_id": len(blocks)})
+                return
+            descendant = re.fullmatch(r"/open-apis/docx/v1/documents/([^/]+)/blocks/([^/]+)/descendant", path)
+            if method == "POST" and descendant:
+                document = state.documents.get(descendant.group(1))
+                if document is None:
+                    self._send(404, {"code": 1770002, "msg": "document not found"})
+                    return
+                descendants = {block.get("block_id"): block for block in payload.get("descendants") or []}
+                children_id = payload.get("children_id") or []
+                if len(descendants) > MAX_DESCENDANTS or any(cid not in descendants for cid in children_id):
+                    self._send(400, {"code": 1770001, "msg": "invalid param: descendants"})
+                    return
+                if not state.allow_append(descendant.group(1)):
+                    self._send(429, {"code": RATE_LIMIT_CODE, "msg": "request trigger frequency limit"}, {"x-ogw-ratelimit-reset": "1"})
+                    return
+                with state.lock:
+                    relations = {temp_id: f"blk{next(state.ids):08d}" for temp_id in descendants}
+
+                    def build(temp_id):
+                        block = {k: v for k, v in descendants[temp_id].items() if k != "children"}
+                        block["block_id"] = relations[temp_id]
+                        children = [build(child) for child in descendants[temp_id].get("children") or []]
+                        if children:
+                            block["children"] = children
+                        return block
+
+                    children = [build(temp_id) for temp_id in children_id]
+                    index = payload.get("index", -1)
+                    blocks = document["blocks"]
+                    position = len(blocks) if index is None or index < 0 else min(index, len(blocks))
+                    blocks[position:position] = children
+                self._ok(
+                    {
+                        "children": children,
+                        "block_id_relations": [{"temporary_block_id": t, "block_id": b} for t, b in relations.items()],
+                        "document_revision_id": len(blocks),
+                    }
+                )
+                return
+            if method == "GET" and match and match.group(1) in state.documents:
+                blocks = state.documents[match.group(1)]["blocks"]
+                start = int((query.get("page_token") or ["0"])[0] or 0)
+                end = start + int((query.get("page_size") or ["500"])[0])
+                has_more = end < len(blocks)
+                self._ok({"items": blocks[start:end], "has_more": has_more, "page_token": str(end) if has_more else ""})
+                return
+
+            match = re.fullmatch(r"/open-apis/docx/v1/documents/([^/]+)/blocks/([^/]+)/children/batch_delete", path)
+            if method == "DELETE" and match and match.group(1) in state.documents:
+                start, end = payload.get("start_index", 0), payload.get("end_index", 0)
+                with state.lock:
+                    blocks = state.documents[match.group(1)]["blocks"]
+                    if not 0 <= start < end <= len(blocks):
+                        self._send(400, {"code": 1770001, "msg": "invalid param: index out of range"})
+                        return
+                    del blocks[start:end]
+                self._ok({"document_revision_id": len(blocks)})
+                return
+
+            match = re.fullmatch(r"/open-apis/drive/v1/permissions/([^/]+)/members", path)
+            if method == "POST" and match and match.group(1) in state.documents:
+                with state.lock:
+                    state.documents[match.group(1)]["members"].append(payload)
+                self._ok({"member": payload})
+                return
+
+            match = re.fullmatch(r"/open-apis/drive/v2/permissions/([^/]+)/public", path)
+            if match and match.group(1) in state.documents:
+                document = state.documents[match.group(1)]
+                if method == "PATCH":
+                    with state.lock:
+                        document["public"] = payload
+                    self._ok({"permission_public": payload})
+                    return
+                if method == "GET":
+                    self._ok({"permission_public": document["public"], "share_url": f"https://fake.feishu.cn/docx/{match.group(1)}?share=1"})
+                    return
+
+            self._send(404, {"code": 404, "msg": "page not found"})
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+        def do_PATCH(self):
+            self._handle("PATCH")
+
+        def do_DELETE(self):
+            self._handle("DELETE")
+
+    return Handler
+
+
+def make_server(port: int = 0, **state_kwargs) -> ThreadingHTTPServer:
+    state = FakeFeishuState(**state_kwargs)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.state = state
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every request")
+    parser.add_argument("--doc-rps", type=float, default=3.0, help="Appends per second allowed per document")
+    args = parser.parse_args()
+    server = make_server(args.port, latency=args.latency, doc_rps=args.doc_rps)
+    print(f"Fake Feishu API on http://127.0.0.1:{server.server_address[1]}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()